@@ -67,7 +67,7 @@ def main():
 
         # print(f"Total shape: {segment.shape}")
 
-        eeg_segment = segment[1:9, :]  # Slice EEG data from the segment
+        eeg_segment = segment[board.channel_map.eeg]  # EEG rows of the board (a view, no copy)
         print(f"Segment Shape: {eeg_segment.shape}")
         
         filtered_segment = filter_obj.bandpass_filter(eeg_segment,
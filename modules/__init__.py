@@ -1,7 +1,72 @@
-from modules.brainflow_stream import *
-from modules.filtering import *
-from modules.brainflow_filtering import *
-# from modules.segmentation import *
-from modules.classification import *
-from modules.ssvep_stim import *
-from modules.visualization import *
\ No newline at end of file
+"""
+BCItoolkit modules.
+
+Submodules are imported lazily: `import modules` is cheap, and a name such as `modules.SSVEPClassifier`
+(or `from modules import SSVEPClassifier`) only imports the submodule that defines it. A headless
+classifier process therefore never pays for psychopy, pyglet, mne or matplotlib unless it uses them.
+`python testing/import_time_benchmark.py` reports the import cost of each entry point.
+"""
+import importlib
+
+# Public names exported from each submodule (what `from modules import *` used to pull in eagerly)
+_SUBMODULE_EXPORTS = {
+    "brainflow_stream": ["BrainFlowBoardSetup", "BoardShim", "BoardIds", "BrainFlowInputParams", "BrainFlowError"],
+    "filtering": ["Filtering"],
+    "brainflow_filtering": ["BF_Filtering", "DataFilter", "FilterTypes"],
+    "classification": ["SSVEPClassifier", "PowerSSVEPClassifier", "TRCAClassifier"],
+    "ssvep_stim": ["SSVEPStimulus", "start_ssvep_stimulus", "SSVEPStimulusRunner"],
+    "visualization": ["plot_eeg_time_series", "plot_psd", "plot_topomap", "compare_eeg_time_series", "compare_psd",
+                      "compare_psd_side_by_side", "compare_psd_stacked", "compute_snr", "compute_variance",
+                      "plot_signal_quality", "browse_eeg"],
+    "stimulus_control": ["SharedStimulusState"],
+    "calibration": ["CalibrationCache"],
+    "references": ["harmonic_list", "generate_reference_signals"],
+    "frequency_planner": ["plan_frequencies", "save_plan", "load_plan"],
+    "pipeline": ["OnlinePipeline", "RingBuffer"],
+    "psd": ["compute_psd", "compute_psds"],
+    "decimation": ["minmax_decimate"],
+    "live_viewer": ["LiveEEGViewer"],
+    "pyramid": ["MinMaxPyramid"],
+    "signal_quality": ["StreamingSignalQuality"],
+    "dynamic_stopping": ["DynamicStopping", "information_transfer_rate"],
+    "evaluation": ["run_sweep", "sweep_configs", "events_from_segments"],
+    "synthetic": ["SyntheticSSVEP"],
+    "channel_map": ["ChannelMap"],
+    "packet_loss": ["PacketLossMonitor", "find_gaps"],
+    "clock_alignment": ["ClockAligner"],
+    "artifacts": ["StreamingArtifactRejection", "regression_projection"],
+    "spatial_filter": ["SpatialFilter", "WhiteningFilter"],
+    "replay_board": ["ReplayBoard"],
+    "session_server": ["SessionServer", "serve"],
+}
+
+_SUBMODULES = ["brainflow_stream", "filtering", "brainflow_filtering", "segmentation", "classification", "ssvep_stim",
+               "visualization", "stimulus_control", "calibration", "references", "frequency_planner", "get_freqs",
+               "psychopy_monitor_manager", "pipeline", "classification_worker", "psd", "decimation",
+               "live_viewer", "pyramid", "signal_quality",
+               "dynamic_stopping", "evaluation", "synthetic", "channel_map", "packet_loss", "clock_alignment", "artifacts", "spatial_filter",
+               "replay_board", "session_server"]
+
+_EXPORTS = {name: module for module, names in _SUBMODULE_EXPORTS.items() for name in names}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """
+    Imports a submodule, or the submodule that defines `name`, on first access.
+    """
+    if name in _SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(f"{__name__}.{module_name}"), name)
+    globals()[name] = value  # Cache so later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
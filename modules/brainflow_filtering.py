@@ -132,45 +132,83 @@ class BF_Filtering:
         DataFilter.perform_bandstop(data, self.sampling_rate, lowcut, highcut, order, FilterTypes.BUTTERWORTH.value, 0)
         return data
 
-    def filter_data(self, data, filter_type="bandpass", **kwargs):
+    def _row_filter(self, filter_type, kwargs):
+        """
+        Returns a function filtering one contiguous float64 row in place with the given filter type and arguments.
+        """
+        if filter_type == "bandpass":
+            lowcut, highcut, order = kwargs["lowcut"], kwargs["highcut"], kwargs.get("order", 4)
+            return lambda row: self.bandpass_filter(row, lowcut, highcut, order)
+        elif filter_type == "highpass":
+            lowcut, order = kwargs["lowcut"], kwargs.get("order", 4)
+            return lambda row: self.highpass_filter(row, lowcut, order)
+        elif filter_type == "lowpass":
+            highcut, order = kwargs["highcut"], kwargs.get("order", 4)
+            return lambda row: self.lowpass_filter(row, highcut, order)
+        elif filter_type == "notch":
+            notch_freq, quality_factor = kwargs["notch_freq"], kwargs.get("quality_factor", 30.0)
+            return lambda row: self.notch_filter(row, notch_freq, quality_factor)
+        elif filter_type == "bandstop":
+            lowcut, highcut, order = kwargs["lowcut"], kwargs["highcut"], kwargs.get("order", 4)
+            return lambda row: self.bandstop_filter(row, lowcut, highcut, order)
+        else:
+            raise ValueError("Invalid filter type. Options are 'bandpass', 'highpass', 'lowpass', 'notch', 'bandstop'.")
+
+    def filter_data(self, data, filter_type="bandpass", out=None, inplace=False, channels=None, **kwargs):
         """
         Applies the specified filter to the EEG data using BrainFlow.
 
+        Copy semantics are explicit; `data` is only modified with `inplace=True`:
+        - default: the (selected) rows are copied once into a new array, which is filtered and returned,
+        - `out=array`: the rows are copied into `out` (shape (n_rows, n_samples)), which is filtered and returned,
+        - `inplace=True`: the rows of `data` itself are filtered and `data` is returned - e.g. the EEG rows of
+          BrainFlow's (n_rows, n_samples) board array, without any allocation.
+        BrainFlow filters contiguous float64 rows directly; other rows (strided views, other dtypes) go through
+        a one-row scratch copy.
+
         Args:
-            data (np.ndarray): The EEG data to be filtered.
+            data (np.ndarray): The EEG data to be filtered, shape (n_rows, n_samples).
             filter_type (str): The type of filter to apply. Options are "bandpass", "highpass", "lowpass", "notch", "bandstop".
+            out (np.ndarray, optional): Array the filtered rows are written to.
+            inplace (bool): Whether to filter the rows of `data` in place.
+            channels (list, optional): Rows of `data` to filter (e.g. the board's EEG channels). Defaults to all rows.
             kwargs: Additional arguments for the filters, such as 'lowcut', 'highcut', 'order', 'notch_freq', and 'quality_factor'.
 
         Returns:
-            np.ndarray: The filtered EEG data.
+            np.ndarray: The filtered EEG data (`data` if inplace, `out` if given, otherwise a new array of the
+                        selected rows).
 
         Raises:
-            ValueError: If required filter parameters are missing or invalid.
+            ValueError: If required filter parameters are missing or invalid, or `out` and `inplace` are combined.
         """
-        if filter_type == "bandpass":
-            return np.apply_along_axis(self.bandpass_filter, 1, data, 
-                                       kwargs["lowcut"], 
-                                       kwargs["highcut"], 
-                                       kwargs.get("order", 4))
-        elif filter_type == "highpass":
-            return np.apply_along_axis(self.highpass_filter, 1, data, 
-                                       kwargs["lowcut"], 
-                                       kwargs.get("order", 4))
-        elif filter_type == "lowpass":
-            return np.apply_along_axis(self.lowpass_filter, 1, data, 
-                                       kwargs["highcut"], 
-                                       kwargs.get("order", 4))
-        elif filter_type == "notch":
-            return np.apply_along_axis(self.notch_filter, 1, data, 
-                                       kwargs["notch_freq"], 
-                                       kwargs.get("quality_factor", 30.0))
-        elif filter_type == "bandstop":
-            return np.apply_along_axis(self.bandstop_filter, 1, data, 
-                                       kwargs["lowcut"], 
-                                       kwargs["highcut"], 
-                                       kwargs.get("order", 4))
+        filter_row = self._row_filter(filter_type, kwargs)
+        rows = range(data.shape[0]) if channels is None else list(channels)
+        if inplace:
+            if out is not None:
+                raise ValueError("Use either out= or inplace=True, not both.")
+            target, target_rows = data, rows
         else:
-            raise ValueError("Invalid filter type. Options are 'bandpass', 'highpass', 'lowpass', 'notch', 'bandstop'.")
+            shape = (len(rows), data.shape[1])
+            if out is None:
+                out = np.empty(shape, dtype=np.float64)
+            elif out.shape != shape:
+                raise ValueError(f"out has shape {out.shape}, expected {shape}.")
+            for index, row in enumerate(rows):
+                out[index] = data[row]
+            target, target_rows = out, range(len(rows))
+
+        scratch = None
+        for row in target_rows:
+            view = target[row]
+            if view.flags.c_contiguous and view.dtype == np.float64:
+                filter_row(view)
+            else:
+                if scratch is None:
+                    scratch = np.empty(view.shape, dtype=np.float64)
+                scratch[...] = view
+                filter_row(scratch)
+                view[...] = scratch
+        return target
 
 
 if __name__ == "__main__":
@@ -204,6 +242,10 @@ if __name__ == "__main__":
     lowcut = 48.0  # Low cut frequency in Hz
     highcut = 52.0  # High cut frequency in Hz
     filtered_data_bandstop = filtering.filter_data(eeg_data, filter_type="bandstop", lowcut=lowcut, highcut=highcut)
+
+    # Filter the EEG rows of a board array (here rows 1-8 of 24) in place, without any allocation
+    board_data = np.random.randn(24, 1000)
+    filtering.filter_data(board_data, filter_type="bandpass", inplace=True, channels=range(1, 9), lowcut=1.0, highcut=50.0)
     
     # Print the shapes of the filtered data to verify the filtering process
     print("Original Data (first 10 samples of channel 0):", eeg_data[0, :10])
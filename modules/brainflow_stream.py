@@ -1,6 +1,7 @@
 import brainflow
 from brainflow.board_shim import BoardShim, BrainFlowInputParams, BrainFlowError, BoardIds
-import serial.tools.list_ports
+
+from modules.channel_map import ChannelMap
 
 class BrainFlowBoardSetup:
     """
@@ -17,6 +18,8 @@ class BrainFlowBoardSetup:
         session_prepared (bool): Flag indicating if the session has been prepared.
         streaming (bool): Flag indicating if the board is actively streaming data.
         eeg_channels (list): List of EEG channel indices for the board (empty if not applicable).
+        channel_map (ChannelMap): Row selectors of every channel group (EEG, accelerometer, timestamp, marker, ...),
+                                  e.g. `data[board.channel_map.eeg]`. None if the board info is unavailable.
         sampling_rate (int): Sampling rate of the board.
     """
 
@@ -53,6 +56,7 @@ class BrainFlowBoardSetup:
             print(f"Error getting board info for board {self.board_id}: {e}")
             self.eeg_channels = []
             self.sampling_rate = None
+            self.channel_map = None
         
         # Set additional parameters if provided
         for key, value in kwargs.items():
@@ -88,7 +92,7 @@ class BrainFlowBoardSetup:
     
     def get_board_info(self):
         """
-        Retrieves the EEG channels and sampling rate for the board.
+        Retrieves the EEG channels and sampling rate for the board, and builds its `channel_map`.
 
         If the board_id is not PLAYBACK_FILE_BOARD or SYNTHETIC_BOARD and a master_board is provided, 
         it will raise an error since master_board is only needed for these special cases.
@@ -108,7 +112,8 @@ class BrainFlowBoardSetup:
         
         board_to_use = self.master_board if self.master_board is not None else self.board_id
         board_descr = BoardShim.get_board_descr(board_to_use)
-        
+        self.channel_map = ChannelMap(board_descr)
+
         eeg_channels = board_descr.get("eeg_channels", [])
         sampling_rate = BoardShim.get_sampling_rate(board_to_use)
         
@@ -125,6 +130,8 @@ class BrainFlowBoardSetup:
             list: A list of dictionaries containing 'port', 'serial_number', and 'description' for each compatible device.
                     Returns an empty list if no devices are found.
         """
+        import serial.tools.list_ports  # Only needed when auto-detecting devices
+
         # Suppress logs from BrainFlow using internal logging level control
         BoardShim.disable_board_logger()  # Disable all logs
 
@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import numpy as np
+
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.expanduser("~"), ".bcitoolkit", "display_calibration.json")
+DEFAULT_MAX_AGE = 7 * 24 * 3600  # Re-measure a display once a week (seconds)
+
+
+def profile_key(monitor_name, resolution, display_index):
+    """
+    Builds the key a calibration profile is stored under.
+
+    Args:
+        monitor_name (str): Name of the PsychoPy monitor configuration.
+        resolution (tuple or None): Display resolution in pixels (width, height), None if unknown.
+        display_index (int): Index of the display screen.
+
+    Returns:
+        str: Key of the form 'monitor|WIDTHxHEIGHT|display'.
+    """
+    resolution_str = f"{int(resolution[0])}x{int(resolution[1])}" if resolution is not None else "unknown"
+    return f"{monitor_name}|{resolution_str}|{int(display_index)}"
+
+
+def possible_frequencies(refresh_rate):
+    """
+    Lists every flicker frequency a display can show exactly (refresh_rate / k), rounded to 2 decimal places.
+
+    Args:
+        refresh_rate (float): Refresh rate of the display in Hz.
+
+    Returns:
+        list: Frequencies in Hz, from highest to lowest.
+    """
+    return [round(refresh_rate / frames_per_cycle, 2) for frames_per_cycle in range(1, int(refresh_rate) + 1)]
+
+
+def window_resolution(win):
+    """
+    Returns the size of an open PsychoPy window, i.e. the display mode actually in use (the resolution stored in
+    the monitor configuration may differ from it).
+
+    Args:
+        win (psychopy.visual.Window): The open (fullscreen) window.
+
+    Returns:
+        tuple: (width, height) in pixels.
+    """
+    return tuple(int(size) for size in win.size)
+
+
+def matches_refresh_rate(win, refresh_rate, n_frames=60, tolerance=0.05):
+    """
+    Checks a stored refresh rate against the median frame interval of a short run of flips, so a display
+    whose refresh mode changed since it was calibrated is noticed.
+
+    Args:
+        win (psychopy.visual.Window): The open (fullscreen) window.
+        refresh_rate (float): Stored refresh rate in Hz.
+        n_frames (int): Frames to flip for the check.
+        tolerance (float): Allowed relative difference between the stored and the observed rate.
+
+    Returns:
+        bool: False if the observed rate differs from `refresh_rate` by more than `tolerance`, True otherwise
+              (also when no intervals could be recorded).
+    """
+    win.recordFrameIntervals = True
+    for _ in range(n_frames):
+        win.flip()
+    win.recordFrameIntervals = False
+    intervals = np.asarray(win.frameIntervals[1:])
+    win.frameIntervals = []
+    if not intervals.size:
+        return True
+    return abs(1.0 / np.median(intervals) - refresh_rate) <= tolerance * refresh_rate
+
+
+def measure_display(win, num_measurements=2, n_warmup_frames=200, n_jitter_frames=120):
+    """
+    Measures the refresh rate and the frame-time jitter of an open PsychoPy window.
+
+    Args:
+        win (psychopy.visual.Window): The window to measure (should be fullscreen).
+        num_measurements (int): Number of refresh rate measurements to average.
+        n_warmup_frames (int): Frames to flip before each refresh rate measurement.
+        n_jitter_frames (int): Frames to record for the frame-time jitter estimate.
+
+    Returns:
+        dict: 'refresh_rate' (Hz, rounded to a whole number) and 'frame_jitter_ms' (standard deviation of the
+              frame intervals in milliseconds, None if it could not be measured).
+    """
+    from psychopy import core
+
+    refresh_rates = []
+    for _ in range(num_measurements):
+        refresh_rate = win.getActualFrameRate(nIdentical=80, nWarmUpFrames=n_warmup_frames, threshold=1)
+        if refresh_rate is not None:
+            refresh_rates.append(refresh_rate)
+        core.wait(0.1)
+
+    if refresh_rates:
+        refresh_rate = round(np.mean(refresh_rates), 0)
+    else:
+        print("Warning: Could not measure a consistent refresh rate. Using default value of 60 Hz.")
+        refresh_rate = 60
+
+    win.recordFrameIntervals = True
+    for _ in range(n_jitter_frames):
+        win.flip()
+    win.recordFrameIntervals = False
+    intervals = np.asarray(win.frameIntervals[1:])
+    win.frameIntervals = []
+    frame_jitter_ms = round(float(np.std(intervals) * 1000), 3) if intervals.size else None
+
+    return {"refresh_rate": refresh_rate, "frame_jitter_ms": frame_jitter_ms}
+
+
+class CalibrationCache:
+    """
+    Persists display calibration profiles so the refresh rate is not re-measured on every launch.
+
+    Profiles are keyed by monitor name, resolution (of the open window, see `window_resolution`) and display
+    index and stored in a small JSON file. Each profile holds the measured refresh rate, the frame-time jitter,
+    the frequencies the display can show and the time it was measured. A profile is only returned while it is
+    younger than `max_age` and, when a window is given, its refresh rate still matches the display; otherwise
+    (or after `invalidate`) the caller measures the display again.
+    """
+
+    def __init__(self, path=None, max_age=DEFAULT_MAX_AGE):
+        """
+        Initializes the CalibrationCache.
+
+        Args:
+            path (str, optional): JSON file to store the profiles in. Defaults to ~/.bcitoolkit/display_calibration.json.
+            max_age (float, optional): Age in seconds after which a profile is considered stale. None never expires.
+        """
+        self.path = path or DEFAULT_CALIBRATION_PATH
+        self.max_age = max_age
+
+    def get(self, monitor_name, resolution, display_index, win=None):
+        """
+        Returns the stored profile for a display, or None if it is missing or stale.
+
+        Args:
+            monitor_name (str): Name of the PsychoPy monitor configuration.
+            resolution (tuple or None): Display resolution in pixels.
+            display_index (int): Index of the display screen.
+            win (psychopy.visual.Window, optional): Open window on the display. If given, the stored refresh rate
+                                                    is checked against it (`matches_refresh_rate`).
+
+        Returns:
+            dict or None: Profile with 'refresh_rate', 'frame_jitter_ms', 'possible_frequencies' and 'measured_at'.
+        """
+        profile = self._load().get(profile_key(monitor_name, resolution, display_index))
+        if profile is None:
+            return None
+        if self.max_age is not None and time.time() - profile.get("measured_at", 0) > self.max_age:
+            return None
+        if win is not None and not matches_refresh_rate(win, profile["refresh_rate"]):
+            print(f"Warning: The refresh rate of '{monitor_name}' (display {display_index}) no longer matches its "
+                  f"calibration ({profile['refresh_rate']} Hz). Measuring again.")
+            return None
+        return profile
+
+    def save(self, monitor_name, resolution, display_index, refresh_rate, frame_jitter_ms=None):
+        """
+        Stores a freshly measured profile for a display.
+
+        Args:
+            monitor_name (str): Name of the PsychoPy monitor configuration.
+            resolution (tuple or None): Display resolution in pixels.
+            display_index (int): Index of the display screen.
+            refresh_rate (float): Measured refresh rate in Hz.
+            frame_jitter_ms (float, optional): Standard deviation of the frame intervals in milliseconds.
+
+        Returns:
+            dict: The stored profile.
+        """
+        profile = {
+            "refresh_rate": float(refresh_rate),
+            "frame_jitter_ms": frame_jitter_ms,
+            "possible_frequencies": possible_frequencies(refresh_rate),
+            "measured_at": time.time(),
+        }
+        profiles = self._load()
+        profiles[profile_key(monitor_name, resolution, display_index)] = profile
+        self._write(profiles)
+        return profile
+
+    def invalidate(self, monitor_name=None, resolution=None, display_index=0):
+        """
+        Removes a stored profile so the display is measured again on the next launch.
+
+        Args:
+            monitor_name (str, optional): Monitor to invalidate. If None, all profiles are removed.
+            resolution (tuple or None): Display resolution in pixels.
+            display_index (int): Index of the display screen.
+        """
+        if monitor_name is None:
+            self._write({})
+            return
+        profiles = self._load()
+        if profiles.pop(profile_key(monitor_name, resolution, display_index), None) is not None:
+            self._write(profiles)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, profiles):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, self.path)  # Atomic, so a crashed launch never leaves a half-written file
+
+
+if __name__ == "__main__":
+    cache = CalibrationCache()
+    print(f"Calibration profiles in {cache.path}:")
+    for key, profile in cache._load().items():
+        age_h = (time.time() - profile["measured_at"]) / 3600
+        print(f"{key}: {profile['refresh_rate']} Hz, jitter {profile['frame_jitter_ms']} ms, measured {age_h:.1f} h ago")
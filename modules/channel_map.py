@@ -0,0 +1,118 @@
+import numpy as np
+
+
+def row_selector(indices):
+    """
+    Returns the cheapest way to index a set of rows: a slice if they are consecutive (basic indexing returns a
+    view of the board array, no copy), otherwise an index array.
+
+    Args:
+        indices (list or slice): Row indices.
+
+    Returns:
+        slice or np.ndarray: The selector, used as `data[selector]`.
+    """
+    if isinstance(indices, slice):
+        return indices
+    indices = np.asarray(indices, dtype=np.intp).ravel()
+    if len(indices) == 0:
+        return slice(0, 0)
+    if len(indices) == 1 or np.all(np.diff(indices) == 1):
+        return slice(int(indices[0]), int(indices[-1]) + 1)
+    return indices
+
+
+class ChannelMap:
+    """
+    Row layout of a BrainFlow board's data array, looked up once from the board descriptor.
+
+    Every channel group of the descriptor ('eeg', 'accel', 'gyro', 'ppg', ...) is available as a precomputed
+    row selector (`eeg`, `accel`, ... or `rows[group]`), a slice whenever the rows are consecutive, so
+    `data[channel_map.eeg]` is a view rather than a fancy-indexing copy. Single rows (`timestamp`, `marker`,
+    `package_num`, `battery`) are plain ints.
+    """
+
+    def __init__(self, descr):
+        """
+        Initializes the ChannelMap from a board descriptor (`BoardShim.get_board_descr`).
+
+        Args:
+            descr (dict): The board descriptor.
+        """
+        self.name = descr.get("name")
+        self.num_rows = descr.get("num_rows")
+        self.sampling_rate = descr.get("sampling_rate")
+        self.indices = {key[:-len("_channels")]: np.asarray(value, dtype=np.intp)
+                        for key, value in descr.items() if key.endswith("_channels")}
+        self.rows = {group: row_selector(indices) for group, indices in self.indices.items()}
+
+        self.timestamp = descr.get("timestamp_channel")
+        self.marker = descr.get("marker_channel")
+        self.package_num = descr.get("package_num_channel")
+        self.battery = descr.get("battery_channel")
+        self.eeg_names = descr["eeg_names"].split(",") if descr.get("eeg_names") else None
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Builds the ChannelMap of a board.
+
+        Args:
+            board (int or BrainFlowBoardSetup): Board id, or a board setup (its master board is used for
+                                                playback/streaming boards).
+        """
+        from brainflow.board_shim import BoardShim  # Only needed when looking up a descriptor
+
+        if not isinstance(board, (int, np.integer)):
+            master_board = getattr(board, "master_board", None)
+            board = master_board if master_board is not None else board.board_id
+        return cls(BoardShim.get_board_descr(int(board)))
+
+    def __getattr__(self, name):
+        # Channel groups as attributes: channel_map.eeg, channel_map.accel, ...
+        rows = self.__dict__.get("rows", {})
+        if name in rows:
+            return rows[name]
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    def channels(self, group):
+        """
+        Returns the row indices of a channel group as a list (e.g. for `OnlinePipeline(eeg_channels=...)`).
+        """
+        return self.indices[group].tolist()
+
+    def select(self, data, group, channels=None):
+        """
+        Extracts the rows of a channel group from board data (n_rows, n_samples).
+
+        Args:
+            data (np.ndarray): Board data.
+            group (str): Channel group, e.g. 'eeg' or 'accel'.
+            channels (list, optional): Positions within the group to keep (e.g. [0, 1, 2] for the first three EEG
+                                       channels). Defaults to the whole group.
+
+        Returns:
+            np.ndarray: The rows - a view of `data` when they are consecutive.
+        """
+        if channels is None:
+            return data[self.rows[group]]
+        return data[row_selector(self.indices[group][list(channels)])]
+
+
+if __name__ == "__main__":
+    import time
+    from brainflow.board_shim import BoardIds
+
+    channel_map = ChannelMap.from_board(BoardIds.CYTON_BOARD.value)
+    print(f"{channel_map.name}: EEG rows {channel_map.eeg}, accel rows {channel_map.accel}, "
+          f"timestamp row {channel_map.timestamp}, marker row {channel_map.marker}")
+    print(f"EEG names: {channel_map.eeg_names}")
+
+    data = np.random.randn(channel_map.num_rows, 250)  # 1 s chunk
+    eeg_list = channel_map.channels("eeg")
+    for name, function in (("fancy indexing (list)", lambda: data[eeg_list]),
+                           ("ChannelMap.eeg (slice)", lambda: data[channel_map.eeg])):
+        start = time.perf_counter()
+        for _ in range(100000):
+            function()
+        print(f"{name:24s} {(time.perf_counter() - start) * 10:.2f} us per chunk")
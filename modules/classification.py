@@ -281,51 +281,146 @@
 
 # # #         return target_freq, max_corr
 
+from functools import lru_cache
+
 import numpy as np
 from sklearn.cross_decomposition import CCA
 from sklearn.preprocessing import StandardScaler
-from scipy.signal import butter, filtfilt
-import matplotlib.pyplot as plt
+from scipy.linalg import eigh
+from modules.filtering import Filtering
+from modules.references import harmonic_list, generate_reference_signals
+from modules.frequency_planner import load_plan
+from modules.pipeline import RingBuffer
+
+
+def _label_indices(labels, frequencies):
+    """
+    Converts labels given as target frequencies (or already as target indices) to target indices.
+    """
+    labels = np.asarray(labels)
+    if np.issubdtype(labels.dtype, np.integer) and set(labels.tolist()) <= set(range(len(frequencies))):
+        return labels
+    return np.array([list(frequencies).index(label) for label in labels.tolist()])
+
+
+def _center(data):
+    return data - data.mean(axis=-2, keepdims=True)
+
+
+def _row_correlation(a, b):
+    """
+    Pearson correlation of matching rows of a and b, shape (..., n_samples) -> (...).
+    """
+    a = a - a.mean(axis=-1, keepdims=True)
+    b = b - b.mean(axis=-1, keepdims=True)
+    denominator = np.sqrt((a ** 2).sum(axis=-1) * (b ** 2).sum(axis=-1))
+    return (a * b).sum(axis=-1) / np.maximum(denominator, np.finfo(float).tiny)
+
+
+def _orthonormal_basis(data):
+    """
+    QR decomposition of centred data (..., n_samples, n_features) -> (Q, pinv(R)).
+    """
+    q, r = np.linalg.qr(_center(data))
+    return q, np.linalg.pinv(r)
+
+
+@lru_cache(maxsize=64)
+def _shared_reference_bases(frequencies, harmonics, sampling_rate, n_samples, dtype):
+    # Shared by every classifier of the process with the same targets and window (e.g. all sessions of a SessionServer)
+    references = np.stack(generate_reference_signals(frequencies, harmonics, sampling_rate, n_samples)).astype(dtype)
+    bases = _orthonormal_basis(references)[0]
+    bases.setflags(write=False)
+    return bases
+
+
+def _canonical(q_x, r_x_inv, q_y):
+    """
+    First canonical correlation between the spans of q_x and every q_y (QR-based CCA).
+
+    Args:
+        q_x (np.ndarray): Orthonormal basis of X, shape (n_samples, n_x).
+        r_x_inv (np.ndarray): Pseudo-inverse of X's R factor, shape (n_x, n_x).
+        q_y (np.ndarray): Orthonormal bases of the Y's, shape (n_targets, n_samples, n_y).
+
+    Returns:
+        tuple: (canonical correlations (n_targets,), X-side canonical weights (n_x, n_targets)).
+    """
+    u, s, _ = np.linalg.svd(np.einsum('nx,kny->kxy', q_x, q_y), full_matrices=False)
+    return s[:, 0], r_x_inv @ u[:, :, 0].T
+
 
 class SSVEPClassifier:
     """
     A class for SSVEP classification using Canonical Correlation Analysis (CCA), Filter Bank CCA (FBCCA), or Frequency-Optimized CCA (foCCA).
+
+    With calibration data (`fit`), the template-based methods 'ITCCA' (individual template CCA) and 'eCCA'
+    (extended CCA, combining reference- and template-based correlations) are also available.
     """
 
-    def __init__(self, frequencies, harmonics, sampling_rate, n_samples, method='CCA', num_subbands=5, stack_harmonics=True):
+    def __init__(self, frequencies, harmonics, sampling_rate, n_samples, method='CCA', num_subbands=5, stack_harmonics=True,
+                 dtype=np.float64, solver=None):
         """
         Initializes the SSVEPClassifier.
 
         Args:
             frequencies (list): List of target frequencies.
-            harmonics (list): List of harmonics to generate for each frequency.
+            harmonics (int or list): Number of harmonics (3 -> 1st, 2nd & 3rd) or the list of harmonics to generate for each frequency.
             sampling_rate (float): The sampling rate of the EEG data.
             n_samples (int): The number of samples in the time window for analysis.
-            method (str): The method to use ('CCA', 'FBCCA', or 'foCCA').
+            method (str): The method to use ('CCA', 'FBCCA', 'foCCA', or the template-based 'ITCCA' / 'eCCA', which require `fit`).
             num_subbands (int): The number of subbands for filtering the data (used only for FBCCA).
             stack_harmonics (bool): Whether to stack harmonics for reference signals.
+            dtype (np.dtype): Precision of the scoring (and of the cached references and templates).
+            solver (str, optional): How reference-based CCA is computed: 'sklearn' (sklearn's iterative CCA, which
+                                    always computes in float64) or 'qr' (first canonical correlation from a QR of
+                                    the window and an SVD against cached reference bases, in `dtype`). Defaults to
+                                    'sklearn' for float64 and 'qr' otherwise.
         """
         self.frequencies = frequencies
-        self.harmonics = harmonics
+        self.harmonics = harmonic_list(harmonics)
         self.sampling_rate = sampling_rate
         self.n_samples = n_samples
         self.method = method
         self.num_subbands = num_subbands
         self.stack_harmonics = stack_harmonics
         self.reference_signals = self._generate_reference_signals()
+        self.templates = None
+        self.dtype = np.dtype(dtype)
+        self.solver = solver or ('sklearn' if self.dtype == np.float64 else 'qr')
+        if self.solver not in ('sklearn', 'qr'):
+            raise ValueError(f"Invalid solver '{self.solver}'. Use 'sklearn' or 'qr'.")
+        if self.solver == 'sklearn' and self.dtype != np.float64:
+            raise ValueError("sklearn's CCA computes in float64; use solver='qr' for other dtypes.")
+        self._template_cache = {}  # n_samples -> precomputed template-side projections
+        self._reference_cache = {}  # n_samples -> orthonormal reference bases in self.dtype
+        self.rest_scores = None    # Sorted best-target scores of rest windows (see calibrate_rest)
+        self.abstain_threshold = None
+
+    @classmethod
+    def from_plan(cls, plan, sampling_rate=None, n_samples=None, **kwargs):
+        """
+        Creates a classifier for the targets of a frequency plan (see `frequency_planner.plan_frequencies`).
+
+        Args:
+            plan (str or dict): Path to a saved plan, or the plan itself.
+            sampling_rate (float, optional): Sampling rate of the EEG data. Defaults to the plan's sampling rate.
+            n_samples (int, optional): Samples per analysis window. Defaults to the plan's window length.
+            **kwargs: Additional arguments for the classifier (e.g. method).
+
+        Returns:
+            SSVEPClassifier: The classifier.
+        """
+        plan = load_plan(plan)
+        sampling_rate = sampling_rate or plan["sampling_rate"]
+        n_samples = n_samples or int(round(plan["window"] * sampling_rate))
+        return cls(plan["frequencies"], plan["harmonics"], sampling_rate, n_samples, **kwargs)
 
     def _generate_reference_signals(self):
         """
         Generates reference signals (sine and cosine waves) for each target frequency and its harmonics.
         """
-        Yn_list = []
-        time = np.linspace(0, self.n_samples / self.sampling_rate, self.n_samples, endpoint=False)
-
-        for freq in self.frequencies:
-            Yn = np.vstack([np.sin(2 * np.pi * harmon * freq * time) for harmon in range(self.harmonics)] + 
-                           [np.cos(2 * np.pi * harmon * freq * time) for harmon in range(self.harmonics)])
-            Yn_list.append(Yn.T)  # Stacking both sine and cosine components
-        return Yn_list
+        return generate_reference_signals(self.frequencies, self.harmonics, self.sampling_rate, self.n_samples)
 
     def _scale_signals(self, eeg_data, reference_signal):
         """
@@ -354,10 +449,201 @@ class SSVEPClassifier:
         corr = np.corrcoef(Xs_scores[0][:, 0], Xs_scores[1][:, 0])[0, 1]
         return corr
 
+    def fit(self, epochs, labels):
+        """
+        Stores per-target averaged templates for the template-based methods ('ITCCA', 'eCCA').
+
+        Args:
+            epochs (np.ndarray): Calibration epochs of shape (n_trials, n_channels, n_samples), aligned to stimulus onset.
+            labels (array-like): Target frequency (or target index) of each epoch.
+
+        Returns:
+            SSVEPClassifier: self
+        """
+        epochs = np.asarray(epochs, dtype=float)
+        labels = _label_indices(labels, self.frequencies)
+        missing = [self.frequencies[k] for k in range(len(self.frequencies)) if not np.any(labels == k)]
+        if missing:
+            raise ValueError(f"No calibration epochs for target(s) {missing} Hz.")
+        self.templates = np.stack([epochs[labels == k].mean(axis=0) for k in range(len(self.frequencies))])
+        self._template_cache = {}
+        return self
+
+    def _template_projections(self, n_samples):
+        """
+        Template-side quantities for windows of `n_samples` samples, computed once and cached:
+        orthonormal bases of the references and templates, and the template x reference CCA spatial filters
+        with the templates projected onto them.
+        """
+        if n_samples not in self._template_cache:
+            if self.templates is None:
+                raise RuntimeError(f"Method '{self.method}' needs calibration templates. Call fit() first.")
+            if n_samples > min(self.templates.shape[-1], self.n_samples):
+                raise ValueError(f"Window of {n_samples} samples is longer than the templates/references.")
+            templates = _center(self.templates[..., :n_samples].transpose(0, 2, 1).astype(self.dtype))  # (n_targets, n, n_channels)
+            q_ref = self._reference_bases(n_samples)
+            q_template, r_template_inv = _orthonormal_basis(templates)
+
+            # CCA(template, reference) spatial filters, one per target
+            svd_u = np.linalg.svd(np.einsum('knx,kny->kxy', q_template, q_ref), full_matrices=False)[0]
+            template_filters = np.einsum('kxy,ky->kx', r_template_inv, svd_u[:, :, 0])  # (n_targets, n_channels)
+            self._template_cache[n_samples] = {
+                "templates": templates,
+                "q_ref": q_ref,
+                "q_template": q_template,
+                "template_filters": template_filters,
+                "template_projection": np.einsum('knc,kc->kn', templates, template_filters),
+            }
+        return self._template_cache[n_samples]
+
+    def _template_scores(self, eeg_segment):
+        """
+        ITCCA / eCCA scores of all targets. Only the EEG-side products are computed here: one QR of the window,
+        then small batched SVDs and projections against the cached template-side quantities.
+        """
+        cache = self._template_projections(eeg_segment.shape[1])
+        eeg = _center(np.asarray(eeg_segment, dtype=self.dtype).T)  # (n, n_channels)
+        q_eeg, r_eeg_inv = _orthonormal_basis(eeg)
+        templates = cache["templates"]
+
+        # r2: CCA(EEG, template) - X-side weights applied to both EEG and template (ITCCA uses the canonical correlation)
+        rho_template, w_template = _canonical(q_eeg, r_eeg_inv, cache["q_template"])
+        if self.method == 'ITCCA':
+            return rho_template
+        r2 = _row_correlation((eeg @ w_template).T, np.einsum('knc,ck->kn', templates, w_template))
+
+        # r1 / r3: CCA(EEG, reference) weights, correlating the EEG with the reference and with the template
+        r1, w_ref = _canonical(q_eeg, r_eeg_inv, cache["q_ref"])
+        r3 = _row_correlation((eeg @ w_ref).T, np.einsum('knc,ck->kn', templates, w_ref))
+
+        # r4: precomputed CCA(template, reference) spatial filters
+        r4 = _row_correlation(cache["template_filters"] @ eeg.T, cache["template_projection"])
+
+        correlations = np.stack((r1, r2, r3, r4))
+        return np.nan_to_num((np.sign(correlations) * correlations ** 2).sum(axis=0))
+
+    def _reference_bases(self, n_samples):
+        """
+        Orthonormal bases of the centred reference signals for windows of `n_samples` samples, shape
+        (n_targets, n_samples, 2 * n_harmonics), computed once in `self.dtype`.
+        """
+        if n_samples not in self._reference_cache:
+            if n_samples > self.n_samples:
+                raise ValueError(f"Window of {n_samples} samples is longer than the references ({self.n_samples}).")
+            self._reference_cache[n_samples] = _shared_reference_bases(
+                tuple(float(f) for f in self.frequencies), tuple(self.harmonics), float(self.sampling_rate),
+                int(n_samples), self.dtype.str)
+        return self._reference_cache[n_samples]
+
+    def _reference_scores(self, eeg_segment):
+        """
+        First canonical correlation of the window with every target's references (QR-based CCA in `self.dtype`).
+        """
+        q_ref = self._reference_bases(eeg_segment.shape[1])
+        q_eeg, _ = np.linalg.qr(_center(np.asarray(eeg_segment, dtype=self.dtype).T))
+        return np.linalg.svd(np.einsum('nx,kny->kxy', q_eeg, q_ref), compute_uv=False)[:, 0]
+
+    def score(self, eeg_segment):
+        """
+        Returns the score of every target for an EEG window (n_channels, n_samples), shape (n_targets,).
+        """
+        if self.method in ('ITCCA', 'eCCA'):
+            return self._template_scores(eeg_segment)
+        if self.solver == 'qr':
+            return self._reference_scores(eeg_segment)
+        return np.array([self._cca_analysis(eeg_segment, ref) for ref in self.reference_signals])
+
+    def calibrate_rest(self, rest_data, false_positive_rate=0.05, step=None):
+        """
+        Learns the abstain ("no control") threshold from rest data recorded without attending any target.
+
+        The best-target score of every rest window forms the null distribution: the threshold is its
+        (1 - false_positive_rate) quantile, and `classify` reports the confidence of a window as the fraction
+        of rest windows it outscores.
+
+        Args:
+            rest_data (np.ndarray): Rest windows (n_windows, n_channels, n_samples), or a continuous rest
+                                    recording (n_channels, n_total_samples) that is cut into windows.
+            false_positive_rate (float): Fraction of rest windows allowed above the threshold.
+            step (int, optional): Step in samples between windows cut from a continuous recording (default: half a window).
+
+        Returns:
+            float: The abstain threshold.
+        """
+        rest_data = np.asarray(rest_data, dtype=float)
+        if rest_data.ndim == 2:
+            step = step or max(self.n_samples // 2, 1)
+            starts = range(0, rest_data.shape[1] - self.n_samples + 1, step)
+            rest_data = np.stack([rest_data[:, start:start + self.n_samples] for start in starts])
+        if len(rest_data) < 2:
+            raise ValueError("At least 2 rest windows are needed to calibrate the abstain threshold.")
+
+        self.rest_scores = np.sort([np.max(self.score(window)) for window in rest_data])
+        self.abstain_threshold = float(np.quantile(self.rest_scores, 1 - false_positive_rate))
+        return self.abstain_threshold
+
+    def confidence(self, best_score):
+        """
+        Calibrated confidence that a window is not idle: the fraction of rest windows scoring below `best_score`.
+        Returns None before `calibrate_rest`.
+        """
+        if self.rest_scores is None:
+            return None
+        return float(np.searchsorted(self.rest_scores, best_score, side='left') / len(self.rest_scores))
+
+    def classify(self, eeg_segment, quality=None, max_bad_fraction=0.5, n_electrodes=None):
+        """
+        Classifies an EEG window and reports the full result, including an explicit abstain state.
+
+        Args:
+            eeg_segment (np.ndarray): The EEG data (n_channels, n_samples).
+            quality (dict, optional): Latest signal-quality report (`StreamingSignalQuality`). If more than
+                                      `max_bad_fraction` of the channels are bad, scoring is skipped; otherwise
+                                      bad channels are left out of reference-based CCA.
+            max_bad_fraction (float): Fraction of bad channels above which the window is not scored.
+            n_electrodes (int, optional): Number of electrodes the quality report refers to, when the window is
+                                          spatially filtered. Bad channels are then only counted against it; they
+                                          have to be left out by the spatial filter (`SpatialFilter.exclude`), since
+                                          the rows of the window no longer correspond to electrodes.
+
+        Returns:
+            dict: 'frequency' (None when abstaining), 'score', 'scores' (all targets), 'confidence'
+                  (None before `calibrate_rest`), 'abstain' (bool) and 'reason' ('quality', 'rest' or None).
+        """
+        bad_channels = quality["bad_channels"] if quality is not None else []
+        n_channels = n_electrodes if n_electrodes is not None else eeg_segment.shape[0]
+        if bad_channels and len(bad_channels) > max_bad_fraction * n_channels:
+            return {"frequency": None, "score": None, "scores": None, "confidence": None, "abstain": True, "reason": "quality"}
+        if bad_channels and n_electrodes is None and self.method not in ('ITCCA', 'eCCA'):  # Templates need every channel
+            eeg_segment = np.delete(eeg_segment, bad_channels, axis=0)
+
+        scores = np.nan_to_num(self.score(eeg_segment))
+        best = int(np.argmax(scores))
+        abstain = self.abstain_threshold is not None and scores[best] <= self.abstain_threshold
+        return {
+            "frequency": None if abstain else self.frequencies[best],
+            "score": float(scores[best]),
+            "scores": scores,
+            "confidence": self.confidence(scores[best]),
+            "abstain": bool(abstain),
+            "reason": "rest" if abstain else None,
+        }
+
     def __call__(self, eeg_segment):
         """
-        Classifies the EEG data using CCA.
+        Classifies the EEG data using CCA (or ITCCA / eCCA after `fit`).
+
+        After `calibrate_rest`, windows scoring at rest level return (None, score) instead of a frequency.
         """
+        if self.abstain_threshold is not None:
+            result = self.classify(eeg_segment)
+            return result["frequency"], result["score"]
+
+        if self.method in ('ITCCA', 'eCCA') or self.solver == 'qr':
+            scores = self.score(eeg_segment)
+            best = int(np.argmax(scores))
+            return self.frequencies[best], float(scores[best])
+
         max_corr, target_freq = 0, None
 
         for freq_idx, ref in enumerate(self.reference_signals):
@@ -376,6 +662,8 @@ class SSVEPClassifier:
             channel_idx (int): The channel index of the EEG data to plot.
             freq_idx (int): The index of the frequency to generate and plot reference signals for.
         """
+        import matplotlib.pyplot as plt  # Imported here so headless classifier processes never load matplotlib
+
         time = np.linspace(0, self.n_samples / self.sampling_rate, self.n_samples, endpoint=False)
         eeg_signal = eeg_segment[channel_idx, :]
         reference_signals = self.reference_signals[freq_idx]
@@ -397,6 +685,324 @@ class SSVEPClassifier:
         plt.grid(True)
         plt.show()
 
+class PowerSSVEPClassifier:
+    """
+    Low-cost SSVEP detector based on spectral power at the target frequencies and harmonics.
+
+    Instead of CCA, a sliding DFT keeps one complex bin per target harmonic and per neighbouring frequency
+    (+/- k * sampling_rate / n_samples). Each new sample adds its contribution and removes the one of the
+    sample leaving the window, using phasors of the absolute sample index, so updates cost O(1) per sample and
+    bin (one small matmul per chunk) and a decision only combines the bin powers. The score of a target is its
+    harmonic power relative to the mean power of the neighbouring bins (SNR), summed over channels.
+
+    The window mean is removed from the bins (a running sum per channel), so raw board data with electrode DC
+    offsets can be classified without high-pass filtering: otherwise the offset leaks into every bin.
+    """
+
+    def __init__(self, frequencies, harmonics, sampling_rate, n_samples, n_neighbours=2, resync_interval=64):
+        """
+        Initializes the PowerSSVEPClassifier.
+
+        Args:
+            frequencies (list): List of target frequencies.
+            harmonics (int or list): Number of harmonics (3 -> 1st, 2nd & 3rd) or the list of harmonics.
+            sampling_rate (float): The sampling rate of the EEG data.
+            n_samples (int): The number of samples in the sliding window.
+            n_neighbours (int): Neighbouring bins on each side used to estimate the noise floor.
+            resync_interval (int): Recompute the bins from the window every `resync_interval` windows to stop
+                                   rounding errors of the add/remove updates from accumulating.
+        """
+        self.frequencies = frequencies
+        self.harmonics = harmonic_list(harmonics)
+        self.sampling_rate = sampling_rate
+        self.n_samples = n_samples
+        self.n_neighbours = n_neighbours
+        self.resync_interval = resync_interval
+
+        # Bin layout: for every (target, harmonic) the centre bin followed by its neighbours
+        resolution = sampling_rate / n_samples
+        offsets = np.concatenate(([0], np.arange(1, n_neighbours + 1), -np.arange(1, n_neighbours + 1))) * resolution
+        centres = np.outer(frequencies, self.harmonics)  # (n_targets, n_harmonics)
+        self.bin_frequencies = (centres[:, :, None] + offsets[None, None, :]).ravel()
+        self.bin_shape = centres.shape + (len(offsets),)
+        self.omega = 2 * np.pi * self.bin_frequencies / sampling_rate
+
+        self._window_phasors = self._phasors(0, n_samples)
+        self._phasor_sums = self._window_phasors.sum(axis=0)  # DFT of a constant window, per bin
+        self.reset()
+
+    @classmethod
+    def from_plan(cls, plan, sampling_rate=None, n_samples=None, **kwargs):
+        """
+        Creates a detector for the targets of a frequency plan (see `SSVEPClassifier.from_plan`).
+        """
+        plan = load_plan(plan)
+        sampling_rate = sampling_rate or plan["sampling_rate"]
+        n_samples = n_samples or int(round(plan["window"] * sampling_rate))
+        return cls(plan["frequencies"], plan["harmonics"], sampling_rate, n_samples, **kwargs)
+
+    def reset(self):
+        """
+        Clears the streaming state.
+        """
+        self.buffer = None
+        self.bins = None
+        self.sums = None
+        self.samples_seen = 0
+        self._last_resync = 0
+
+    def _phasors(self, start, n):
+        return np.exp(-1j * np.outer(np.arange(start, start + n), self.omega))  # (n, n_bins)
+
+    def update(self, chunk):
+        """
+        Adds a chunk of streaming samples (n_channels, n_samples) to the sliding DFT.
+        """
+        n_new = chunk.shape[1]
+        if n_new == 0:
+            return
+        if self.buffer is None:
+            self.buffer = RingBuffer(chunk.shape[0], self.n_samples)
+            self.bins = np.zeros((chunk.shape[0], len(self.omega)), dtype=complex)
+            self.sums = np.zeros(chunk.shape[0])
+
+        if n_new >= self.n_samples:
+            self.buffer.write(chunk)
+            self.samples_seen += n_new
+            self._resync()
+            return
+
+        n_leaving = max(0, min(n_new, min(self.samples_seen, self.n_samples) + n_new - self.n_samples))
+        self.bins += chunk @ self._phasors(self.samples_seen, n_new)
+        self.sums += chunk.sum(axis=1)
+        if n_leaving:
+            leaving_start = self.samples_seen - min(self.samples_seen, self.n_samples)
+            leaving = self.buffer.oldest(n_leaving)
+            self.bins -= leaving @ self._phasors(leaving_start, n_leaving)
+            self.sums -= leaving.sum(axis=1)
+        self.buffer.write(chunk)
+        self.samples_seen += n_new
+
+        if self.samples_seen - self._last_resync >= self.resync_interval * self.n_samples:
+            self._resync()
+
+    def _resync(self):
+        n_held = min(self.samples_seen, self.n_samples)
+        window = self.buffer.latest(n_held)
+        self.bins = window @ self._phasors(self.samples_seen - n_held, n_held)
+        self.sums = window.sum(axis=1)
+        self._last_resync = self.samples_seen
+
+    def _snr(self, bins):
+        power = (np.abs(bins) ** 2).sum(axis=0).reshape(self.bin_shape)  # Summed over channels
+        noise = power[:, :, 1:].mean(axis=2)
+        return (power[:, :, 0] / np.maximum(noise, np.finfo(float).tiny)).mean(axis=1)
+
+    def score(self, eeg_segment=None):
+        """
+        Returns the SNR of every target, shape (n_targets,).
+
+        Args:
+            eeg_segment (np.ndarray, optional): A complete window (n_channels, n_samples) to score. If None, the
+                                                current streaming window is scored (None until it is full).
+        """
+        if eeg_segment is not None:
+            n = eeg_segment.shape[1]
+            centred = eeg_segment - eeg_segment.mean(axis=1, keepdims=True)
+            return self._snr(centred @ (self._window_phasors if n == self.n_samples else self._phasors(0, n)))
+        if self.samples_seen < self.n_samples:
+            return None
+        # Bins of the mean-removed window: the mean times the DFT of a constant window starting at the oldest sample
+        start = self.samples_seen - self.n_samples
+        constant = np.exp(-1j * self.omega * start) * self._phasor_sums
+        return self._snr(self.bins - np.outer(self.sums / self.n_samples, constant))
+
+    def decide(self):
+        """
+        Classifies the current sliding window.
+
+        Returns:
+            tuple: The detected frequency and its SNR, or (None, None) until the window is full.
+        """
+        snr = self.score()
+        if snr is None:
+            return None, None
+        best = int(np.argmax(snr))
+        return self.frequencies[best], float(snr[best])
+
+    def __call__(self, eeg_segment):
+        """
+        Classifies a complete EEG window (n_channels, n_samples), like SSVEPClassifier.
+
+        Returns:
+            tuple: The detected frequency and its SNR.
+        """
+        snr = self.score(eeg_segment)
+        best = int(np.argmax(snr))
+        return self.frequencies[best], float(snr[best])
+
+class TRCAClassifier:
+    """
+    Task-related component analysis (TRCA) and ensemble TRCA (eTRCA) classifier for SSVEP.
+
+    Spatial filters that maximise the reproducibility of the response across calibration trials, and the
+    per-target average templates, are learned once with `fit`. The fitted model can be saved to an .npz file
+    and reloaded without refitting. Scoring correlates the spatially filtered window with every target's
+    filtered template in a single matmul per sub-band, so short (0.5-1 s) windows can be classified quickly.
+
+    Windows must be aligned to the stimulus onset like the calibration epochs (templates are phase-locked);
+    windows shorter than the epochs are compared with the first `n` samples of the templates.
+    """
+
+    def __init__(self, frequencies, sampling_rate, ensemble=True, subbands=None, filter_order=4):
+        """
+        Initializes the TRCAClassifier.
+
+        Args:
+            frequencies (list): List of target frequencies (one class per frequency).
+            sampling_rate (float): The sampling rate of the EEG data.
+            ensemble (bool): Whether to use the filters of all targets for every target (eTRCA) or only its own (TRCA).
+            subbands (list, optional): (lowcut, highcut) pairs of a filter bank, e.g. [(6, 90), (14, 90), (22, 90)].
+                                       Sub-band scores are combined with weights m^-1.25 + 0.25. None uses the data as is.
+            filter_order (int): Order of the sub-band bandpass filters.
+        """
+        self.frequencies = list(frequencies)
+        self.sampling_rate = sampling_rate
+        self.ensemble = ensemble
+        self.subbands = [tuple(band) for band in subbands] if subbands else None
+        self.filter_order = filter_order
+
+        n_bands = len(self.subbands) if self.subbands else 1
+        self.subband_weights = np.arange(1, n_bands + 1) ** -1.25 + 0.25
+        self.filters = None    # (n_bands, n_channels, n_targets)
+        self.templates = None  # (n_bands, n_targets, n_channels, n_samples)
+        self._projected = {}   # n_samples -> normalised filtered templates
+
+    def _filter_bank(self, data):
+        """
+        Returns the sub-band versions of `data` (..., n_channels, n_samples) stacked along a new first axis.
+        """
+        if not self.subbands:
+            return data[None]
+        filtering = Filtering(self.sampling_rate)
+        return np.stack([filtering.bandpass_filter(data, low, high, order=self.filter_order) for low, high in self.subbands])
+
+    @staticmethod
+    def _trca_filter(trials):
+        """
+        Leading TRCA spatial filter of one target's trials (n_trials, n_channels, n_samples).
+        """
+        trials = trials - trials.mean(axis=2, keepdims=True)
+        summed = trials.sum(axis=0)
+        # Inter-trial covariance: sum over i != j of X_i X_j^T = (sum X)(sum X)^T - sum X_i X_i^T
+        within = np.einsum('tcn,tdn->cd', trials, trials)
+        between = summed @ summed.T - within
+        eigenvalues, eigenvectors = eigh(between, within)
+        return eigenvectors[:, -1]
+
+    def fit(self, epochs, labels):
+        """
+        Learns the spatial filters and templates from labelled calibration epochs.
+
+        Args:
+            epochs (np.ndarray): Calibration epochs of shape (n_trials, n_channels, n_samples), aligned to stimulus onset.
+            labels (array-like): Target frequency (or target index) of each epoch. Each target needs at least 2 epochs.
+
+        Returns:
+            TRCAClassifier: self
+        """
+        epochs = np.asarray(epochs, dtype=float)
+        labels = _label_indices(labels, self.frequencies)
+
+        bands = self._filter_bank(epochs)  # (n_bands, n_trials, n_channels, n_samples)
+        n_bands, _, n_channels, n_samples = bands.shape
+        self.filters = np.empty((n_bands, n_channels, len(self.frequencies)))
+        self.templates = np.empty((n_bands, len(self.frequencies), n_channels, n_samples))
+        for target in range(len(self.frequencies)):
+            trials = bands[:, labels == target]
+            if trials.shape[1] < 2:
+                raise ValueError(f"Target {self.frequencies[target]} Hz needs at least 2 calibration epochs, got {trials.shape[1]}.")
+            for band in range(n_bands):
+                self.filters[band, :, target] = self._trca_filter(trials[band])
+            self.templates[:, target] = trials.mean(axis=1)
+        self._projected = {}
+        return self
+
+    @staticmethod
+    def _normalise(projected):
+        # Zero mean and unit norm over the last two axes (samples x filters), so a dot product is a correlation
+        projected = projected - projected.mean(axis=-2, keepdims=True)
+        norm = np.sqrt((projected ** 2).sum(axis=(-2, -1), keepdims=True))
+        return projected / np.maximum(norm, np.finfo(float).tiny)
+
+    def _projected_templates(self, n_samples):
+        """
+        Filtered, normalised templates for windows of `n_samples` samples (cached per window length).
+        """
+        if n_samples not in self._projected:
+            if n_samples > self.templates.shape[-1]:
+                raise ValueError(f"Window of {n_samples} samples is longer than the calibration epochs ({self.templates.shape[-1]}).")
+            templates = self.templates[..., :n_samples]
+            # (n_bands, n_targets, n_samples, n_filters)
+            projected = np.einsum('bkcn,bcf->bknf', templates, self.filters)
+            if not self.ensemble:
+                own = np.arange(len(self.frequencies))
+                projected = projected[:, own, :, own].transpose(1, 0, 2)[..., None]
+            self._projected[n_samples] = self._normalise(projected)
+        return self._projected[n_samples]
+
+    def score(self, eeg_segment):
+        """
+        Returns the (sub-band weighted) correlation of the window with every target template, shape (n_targets,).
+        """
+        if self.filters is None:
+            raise RuntimeError("TRCAClassifier is not fitted. Call fit() or TRCAClassifier.load().")
+        n_samples = eeg_segment.shape[-1]
+        templates = self._projected_templates(n_samples)
+        bands = self._filter_bank(np.asarray(eeg_segment, dtype=float))  # (n_bands, n_channels, n_samples)
+        projected = np.einsum('bcn,bcf->bnf', bands, self.filters)       # (n_bands, n_samples, n_filters)
+
+        if self.ensemble:
+            projected = self._normalise(projected)
+            correlations = np.einsum('bknf,bnf->bk', templates, projected)
+        else:
+            projected = self._normalise(projected.transpose(0, 2, 1)[..., None])  # (n_bands, n_targets, n_samples, 1)
+            correlations = (templates * projected).sum(axis=(2, 3))
+        return self.subband_weights @ correlations
+
+    def __call__(self, eeg_segment):
+        """
+        Classifies an EEG window (n_channels, n_samples) aligned to the stimulus onset.
+
+        Returns:
+            tuple: The detected frequency and its correlation score.
+        """
+        scores = self.score(eeg_segment)
+        best = int(np.argmax(scores))
+        return self.frequencies[best], float(scores[best])
+
+    def save(self, path):
+        """
+        Saves the fitted model to an .npz file.
+        """
+        if self.filters is None:
+            raise RuntimeError("TRCAClassifier is not fitted, nothing to save.")
+        np.savez(path, frequencies=self.frequencies, sampling_rate=self.sampling_rate, ensemble=self.ensemble,
+                 subbands=np.array(self.subbands if self.subbands else [], dtype=float).reshape(-1, 2),
+                 filter_order=self.filter_order, filters=self.filters, templates=self.templates)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a model saved with `save`.
+        """
+        with np.load(path) as saved:
+            model = cls(saved["frequencies"].tolist(), float(saved["sampling_rate"]), bool(saved["ensemble"]),
+                        [tuple(band) for band in saved["subbands"].tolist()] or None, int(saved["filter_order"]))
+            model.filters = saved["filters"]
+            model.templates = saved["templates"]
+        return model
+
 # # Example Usage
 # frequencies = [10, 12, 15]  # Example frequencies in Hz
 # harmonics = [1, 2, 3]  # Harmonics to include
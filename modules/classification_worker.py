@@ -0,0 +1,350 @@
+"""
+Headless SSVEP classification worker.
+
+Runs acquisition + preprocessing + SSVEPClassifier from a JSON config file without importing any GUI
+library, so classifier nodes can be deployed separately from the stimulus displays. Decisions are
+written as JSON lines to stdout and/or a UDP/TCP socket; a throughput and latency report is printed
+to stderr on exit.
+
+Usage:
+    bci-classifier-worker config.json [--duration SECONDS] [--quiet]
+
+Example config:
+    {
+        "board": {"board_id": -1},
+        "window": 2.0,
+        "step": 0.5,
+        "filter": {"filter_type": "bandpass", "lowcut": 6.0, "highcut": 30.0, "order": 4},
+        "classifier": {"frequencies": [9.25, 11.25, 13.25, 15.25], "harmonics": 3, "method": "CCA"},
+        "quality": {"line_frequency": 50, "publish_rate": 2},
+        "packet_loss": {"max_fill": 10},
+        "clock": {"half_life": 600, "latency": 0.0},
+        "artifacts": {"max_amplitude": 100, "max_gradient": 50, "max_motion": 0.1, "max_fraction": 0.1},
+        "spatial_filter": {"type": "car"},
+        "output": {"stdout": true, "socket": "udp://127.0.0.1:5005"}
+    }
+
+Instead of a BrainFlow board, "board" can replay a recording - {"replay": "recording.npy", "sampling_rate": 250,
+"loop": true} (optionally "board_id" for the row layout of a board recording) - or stream synthetic data -
+{"synthetic": {"frequencies": [...], "n_channels": 8, "snr_db": -10}} (SyntheticSSVEP arguments) - through a
+ReplayBoard, e.g. for testing without hardware.
+
+A top-level "dtype": "float32" runs buffering, filtering and classification in single precision
+(halving the memory traffic of the online path); the default is "float64". Single precision uses the QR-based
+CCA solver, which "solver": "qr" in the "classifier" section also selects in float64.
+
+The optional "packet_loss" section (PacketLossMonitor arguments) checks the board's package-number row for
+dropped packets: gaps of up to "max_fill" samples are interpolated, decisions whose window spans a longer
+gap are sent with "gap": true, and the loss counters are added to the exit report.
+
+The optional "clock" section (ClockAligner arguments) fits the board's sample index against the host's
+monotonic clock, so "sample_age_ms" is drift-corrected over long sessions; the effective sampling rate, drift
+and arrival jitter are added to the exit report.
+
+The optional "artifacts" section (StreamingArtifactRejection arguments) flags blinks, jaw clenches and electrode
+pops by amplitude/gradient thresholds, and movement from the accelerometer rows when "max_motion" is set.
+Windows with more than "max_fraction" flagged samples are sent with "abstain": true, "reason": "artifact"
+instead of being classified. "asr_data": "rest.npy" (clean EEG, (n_channels, n_samples)) with optional
+"asr_cutoff" also repairs each chunk with the ASR-style reconstruction, and "projection": "matrix.npy" applies a
+precomputed projection (e.g. from `regression_projection`).
+
+The optional "spatial_filter" section applies a spatial filter to every chunk before buffering: {"type": "car"},
+{"type": "laplacian"} (electrode names from the board descriptor or "channel_names", or "positions"; optional
+"n_neighbors") or {"type": "whitening"} (WhiteningFilter arguments, e.g. "half_life", "refresh",
+"n_components"; "reference": "car" puts a common average reference in front).
+
+The optional "quality" section (StreamingSignalQuality arguments) adds signal-quality messages
+({"quality": {...}}) to the decision stream, and windows with too many bad channels are not scored.
+Adding "rest_data": "rest.npy" (a rest recording of shape (n_channels, n_samples)) and optionally
+"false_positive_rate" to the "classifier" section enables the abstain state: idle windows are sent
+with "frequency": null and "abstain": true. The threshold is learned from rest windows preprocessed like
+the live ones (artifact stage, spatial filter, filter).
+"""
+import sys
+import json
+import time
+import socket
+import argparse
+import contextlib
+import numpy as np
+
+from modules.brainflow_stream import BrainFlowBoardSetup
+from modules.replay_board import ReplayBoard
+from modules.filtering import Filtering
+from modules.classification import SSVEPClassifier
+from modules.pipeline import OnlinePipeline
+from modules.signal_quality import StreamingSignalQuality, QUALITY_FIELDS
+from modules.packet_loss import PacketLossMonitor
+from modules.clock_alignment import ClockAligner
+from modules.artifacts import StreamingArtifactRejection
+from modules.spatial_filter import SpatialFilter, WhiteningFilter
+
+
+class DecisionPublisher:
+    """
+    Writes decisions as JSON lines to stdout and/or a socket ('udp://host:port' or 'tcp://host:port').
+    """
+
+    def __init__(self, stdout=True, address=None):
+        """
+        Initializes the DecisionPublisher.
+
+        Args:
+            stdout (bool): Whether to print each decision to stdout.
+            address (str, optional): Socket address to send each decision to.
+        """
+        self.stdout = stdout
+        self.sock = None
+        self.udp_target = None
+        if address:
+            scheme, _, host_port = address.partition("://")
+            host, _, port = host_port.rpartition(":")
+            if scheme == "udp":
+                self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self.udp_target = (host, int(port))
+            elif scheme == "tcp":
+                self.sock = socket.create_connection((host, int(port)))
+            else:
+                raise ValueError(f"Invalid socket address '{address}'. Use 'udp://host:port' or 'tcp://host:port'.")
+
+    def publish(self, decision):
+        line = json.dumps(decision) + "\n"
+        if self.stdout:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+        if self.sock is not None:
+            if self.udp_target is not None:
+                self.sock.sendto(line.encode(), self.udp_target)
+            else:
+                self.sock.sendall(line.encode())
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def load_config(path):
+    """
+    Loads a worker config file (JSON).
+    """
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def quality_message(report, name=None):
+    """
+    Converts a signal-quality report into a JSON-serialisable message.
+    """
+    message = {field: np.asarray(report[field]).tolist() for field in QUALITY_FIELDS}
+    message.update({"time": report["time"], "sample": report["sample"], "bad_channels": report["bad_channels"]})
+    if name is not None:
+        message["name"] = name
+    return {"quality": message}
+
+
+def make_board(board_config):
+    """
+    Creates (without starting) the board described by a worker config's "board" section: a BrainFlowBoardSetup,
+    or a ReplayBoard for "replay"/"synthetic" sections.
+    """
+    board_config = dict(board_config)
+    if "replay" in board_config or "synthetic" in board_config:
+        realtime = board_config.pop("realtime", True)
+        if "synthetic" in board_config:
+            from modules.synthetic import SyntheticSSVEP  # Only needed for synthetic streams
+
+            source = SyntheticSSVEP(**board_config.pop("synthetic"))
+            sampling_rate = source.sampling_rate
+        else:
+            source = board_config.pop("replay")
+            sampling_rate = board_config.pop("sampling_rate")
+        return ReplayBoard(source, sampling_rate, realtime=realtime, **board_config)
+    return BrainFlowBoardSetup(board_config.pop("board_id"), board_config.pop("serial_port", None),
+                               board_config.pop("master_board", None), board_config.pop("name", None),
+                               **board_config.pop("params", {}))
+
+
+def pipeline_report(pipeline):
+    """
+    Returns the throughput/latency report of a pipeline, with the counters of its optional stages.
+    """
+    report = pipeline.stats.summary()
+    if pipeline.packet_monitor is not None:
+        report["packet_loss"] = pipeline.packet_monitor.summary()
+    if pipeline.clock is not None:
+        report["clock"] = pipeline.clock.summary()
+    if pipeline.artifact_stage is not None:
+        report["artifacts"] = pipeline.artifact_stage.summary()
+    return report
+
+
+def build_spatial_filter(config, board, eeg_channels):
+    """
+    Builds the spatial filter described by a worker config's "spatial_filter" section (see module docstring).
+    """
+    spatial_config = dict(config)
+    filter_type = spatial_config.pop("type")
+    n_channels = len(eeg_channels)
+    if filter_type == "car":
+        return SpatialFilter.car(n_channels)
+    if filter_type == "laplacian":
+        channels = spatial_config.pop("positions", None) or spatial_config.pop("channel_names", None)
+        if channels is None:
+            names = board.channel_map.eeg_names
+            if names is None:
+                raise ValueError(f"[{board.name}] The board has no electrode names; give 'channel_names' or 'positions'.")
+            channels = [names[board.eeg_channels.index(channel)] for channel in eeg_channels]
+        return SpatialFilter.laplacian(channels, **spatial_config)
+    if filter_type == "whitening":
+        reference = spatial_config.pop("reference", None)
+        whitening = WhiteningFilter(n_channels, board.sampling_rate, **spatial_config)
+        return SpatialFilter.car(n_channels).then(whitening) if reference == "car" else whitening
+    raise ValueError(f"Invalid spatial filter type '{filter_type}'. Use 'car', 'laplacian' or 'whitening'.")
+
+
+def build_pipeline(config, board, quality_callback=None):
+    """
+    Builds the OnlinePipeline described by a worker config for an already created board.
+
+    Args:
+        config (dict): Worker config (see module docstring).
+        board (BrainFlowBoardSetup): The board to read from.
+        quality_callback (callable, optional): Receives the signal-quality reports if the config has a "quality" section.
+
+    Returns:
+        OnlinePipeline: The pipeline.
+    """
+    sampling_rate = board.sampling_rate
+    window_samples = int(round(config.get("window", 2.0) * sampling_rate))
+    step_samples = int(round(config.get("step", config.get("window", 2.0)) * sampling_rate))
+    dtype = np.dtype(config.get("dtype", "float64"))
+
+    classifier_config = dict(config["classifier"])
+    rest_data = classifier_config.pop("rest_data", None)
+    false_positive_rate = classifier_config.pop("false_positive_rate", 0.05)
+    plan = classifier_config.pop("plan", None)
+    if plan is not None:
+        classifier = SSVEPClassifier.from_plan(plan, sampling_rate=sampling_rate, n_samples=window_samples, dtype=dtype,
+                                               **classifier_config)
+    else:
+        classifier = SSVEPClassifier(classifier_config.pop("frequencies"), classifier_config.pop("harmonics", 3),
+                                     sampling_rate, window_samples, dtype=dtype, **classifier_config)
+    filter_kwargs = config.get("filter")
+    filter_obj = Filtering(sampling_rate, dtype=dtype) if filter_kwargs else None
+
+    eeg_channels = config.get("channels") or board.eeg_channels
+    quality_monitor = None
+    if config.get("quality") is not None:
+        quality_monitor = StreamingSignalQuality(len(eeg_channels), sampling_rate, callback=quality_callback, **config["quality"])
+
+    packet_monitor = None
+    if config.get("packet_loss") is not None:
+        packet_monitor = PacketLossMonitor.from_channel_map(board.channel_map, **config["packet_loss"])
+    clock = ClockAligner(sampling_rate, **config["clock"]) if config.get("clock") is not None else None
+
+    artifact_stage, accel_channels, max_artifact_fraction = None, None, 0.1
+    if config.get("artifacts") is not None:
+        artifact_config = dict(config["artifacts"])
+        max_artifact_fraction = artifact_config.pop("max_fraction", max_artifact_fraction)
+        asr_data = artifact_config.pop("asr_data", None)
+        asr_cutoff = artifact_config.pop("asr_cutoff", 3.0)
+        projection = artifact_config.pop("projection", None)
+        artifact_stage = StreamingArtifactRejection(len(eeg_channels), sampling_rate,
+                                                    projection=None if projection is None else np.load(projection),
+                                                    **artifact_config)
+        if asr_data is not None:
+            artifact_stage.fit_asr(np.load(asr_data), cutoff=asr_cutoff)
+        if artifact_stage.max_motion is not None:
+            accel_channels = board.channel_map.channels("accel")
+
+    spatial_filter = None
+    if config.get("spatial_filter") is not None:
+        spatial_filter = build_spatial_filter(config["spatial_filter"], board, eeg_channels)
+
+    pipeline = OnlinePipeline(board, classifier,
+                              eeg_channels=eeg_channels,
+                              window_samples=window_samples,
+                              step_samples=step_samples,
+                              filter_obj=filter_obj,
+                              filter_kwargs=filter_kwargs,
+                              timestamp_channel=board.channel_map.timestamp,
+                              name=board.name,
+                              quality_monitor=quality_monitor,
+                              dtype=dtype,
+                              packet_monitor=packet_monitor,
+                              clock=clock,
+                              artifact_stage=artifact_stage,
+                              accel_channels=accel_channels,
+                              max_artifact_fraction=max_artifact_fraction,
+                              spatial_filter=spatial_filter)
+    if rest_data is not None:
+        # Calibrated on rest windows preprocessed like the live ones
+        threshold = pipeline.calibrate_rest(np.load(rest_data), false_positive_rate)
+        print(f"[{board.name}] Abstain threshold from rest data: {threshold:.3f}", file=sys.stderr)
+    return pipeline
+
+
+def run(config, duration=None, poll_interval=0.005, quiet=False):
+    """
+    Runs the worker until `duration` has passed, `max_decisions` is reached or it is interrupted (Ctrl+C).
+
+    Args:
+        config (dict): Worker config (see module docstring).
+        duration (float, optional): Run time in seconds (overrides config['duration']).
+        poll_interval (float): Idle time between board polls when no new data is available.
+        quiet (bool): Whether to suppress the stdout decision stream (the socket output is unaffected).
+
+    Returns:
+        dict: The throughput/latency report.
+    """
+    board = make_board(config["board"])
+    output = config.get("output", {})
+    publisher = DecisionPublisher(stdout=output.get("stdout", True) and not quiet, address=output.get("socket"))
+    duration = duration if duration is not None else config.get("duration")
+    max_decisions = config.get("max_decisions")
+
+    # Board status messages go to stderr so stdout only carries decisions
+    with contextlib.redirect_stdout(sys.stderr):
+        board.setup()
+    if isinstance(board, BrainFlowBoardSetup) and board.board is None:
+        raise RuntimeError(f"[{board.name}] Board setup failed, see the message above.")
+    pipeline = build_pipeline(config, board, quality_callback=lambda report: publisher.publish(quality_message(report, board.name)))
+
+    deadline = time.perf_counter() + duration if duration else None
+    try:
+        while deadline is None or time.perf_counter() < deadline:
+            decisions = pipeline.poll()
+            for decision in decisions:
+                publisher.publish(decision)
+            if max_decisions and pipeline.stats.decisions >= max_decisions:
+                break
+            if not decisions:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with contextlib.redirect_stdout(sys.stderr):
+            board.stop()
+        publisher.close()
+
+    report = pipeline_report(pipeline)
+    print(json.dumps({"report": report}), file=sys.stderr)
+    return report
+
+
+def main(argv=None):
+    """
+    Console entry point (`bci-classifier-worker`).
+    """
+    parser = argparse.ArgumentParser(description="Headless SSVEP classification worker.")
+    parser.add_argument("config", help="Path to the worker config (JSON).")
+    parser.add_argument("--duration", type=float, default=None, help="Run time in seconds (default: until Ctrl+C).")
+    parser.add_argument("--quiet", action="store_true", help="Do not print decisions to stdout.")
+    args = parser.parse_args(argv)
+
+    run(load_config(args.config), duration=args.duration, quiet=args.quiet)
+
+
+if __name__ == "__main__":
+    main()
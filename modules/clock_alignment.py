@@ -0,0 +1,195 @@
+import time
+import numpy as np
+
+
+class ClockAligner:
+    """
+    Running linear fit between the board's sample index and the host's monotonic clock (`time.perf_counter`).
+
+    The board's oscillator, its timestamps and the host clock drift relative to one another (tens of ppm, i.e.
+    several samples per hour), so a fixed offset or the nominal sampling rate misplaces events in long sessions.
+    Every acquired chunk adds one point (index of its last sample, host arrival time); the fit is an
+    exponentially weighted least-squares line, updated in O(1) per chunk, so it follows slow drift while
+    averaging out the arrival jitter of bursty wireless transfers. Points far behind the fit (e.g. USB stalls)
+    are skipped; a run of them (the stream really moved, e.g. after an unfilled packet-loss gap) restarts the fit.
+
+    Host times from any process on the machine, e.g. the stimulus' `SharedStimulusState.cue_time`, can then be
+    mapped to fractional sample indices (`time_to_sample`) and samples back to host time (`sample_to_time`).
+    """
+
+    def __init__(self, sampling_rate, half_life=600.0, latency=0.0, min_span=10.0, gate=5.0, max_rejects=20):
+        """
+        Initializes the ClockAligner.
+
+        Args:
+            sampling_rate (float): Nominal sampling rate, used until enough data has been seen to fit the slope.
+            half_life (float): Seconds of data after which a point's weight has halved. Longer values average more
+                               jitter, shorter ones follow faster drift changes.
+            latency (float): Constant transport delay in seconds between a sample's acquisition and its arrival on
+                             the host (not observable from the data itself; measure it once, e.g. with a photodiode).
+            min_span (float): Seconds of data needed before the slope is fitted rather than taken as nominal.
+            gate (float): Points more than `gate` residual standard deviations from the fit are skipped.
+            max_rejects (int): Consecutive skipped points after which the fit is restarted.
+        """
+        self.sampling_rate = float(sampling_rate)
+        self.half_life = half_life
+        self.latency = latency
+        self.min_span = min_span
+        self.gate = gate
+        self.max_rejects = max_rejects
+        self.reset()
+
+    def reset(self):
+        """
+        Discards the fit (e.g. after the stream restarted).
+        """
+        self.points = 0
+        self.rejected = 0
+        self._consecutive_rejects = 0
+        self._weight = 0.0
+        self._mean_x = 0.0
+        self._mean_y = 0.0
+        self._sxx = 0.0
+        self._sxy = 0.0
+        self._residual_var = 0.0
+        self._last_x = None
+
+    @property
+    def fitted(self):
+        """
+        Whether the slope is fitted (enough data has been seen) rather than nominal.
+        """
+        return self.points >= 3 and self._sxx / self._weight * 12 >= (self.min_span * self.sampling_rate) ** 2
+
+    @property
+    def slope(self):
+        """
+        Host seconds per sample.
+        """
+        if self.fitted:
+            return self._sxy / self._sxx
+        return 1.0 / self.sampling_rate
+
+    @property
+    def effective_rate(self):
+        """
+        Sampling rate measured in host-clock time.
+        """
+        return 1.0 / self.slope
+
+    @property
+    def drift_ppm(self):
+        """
+        Deviation of the effective from the nominal sampling rate, in parts per million.
+        """
+        return (self.effective_rate / self.sampling_rate - 1) * 1e6
+
+    @property
+    def residual_std(self):
+        """
+        Standard deviation of the arrival times around the fit, in seconds (the arrival jitter).
+        """
+        return float(np.sqrt(self._residual_var))
+
+    def update(self, sample_index, host_time=None):
+        """
+        Adds one observation: the sample with index `sample_index` (counted from the start of the stream) had
+        arrived by `host_time`.
+
+        Args:
+            sample_index (float): Index of the last sample of the chunk just acquired.
+            host_time (float, optional): `time.perf_counter()` when the chunk arrived. Defaults to now.
+
+        Returns:
+            bool: Whether the point was used (False if it was skipped as an outlier).
+        """
+        if host_time is None:
+            host_time = time.perf_counter()
+        x = float(sample_index)
+        y = host_time - self.latency
+
+        if self.points >= 3:
+            residual = y - self.sample_to_time(x)
+            if self.fitted and abs(residual) > self.gate * self.residual_std + 1.0 / self.sampling_rate:
+                self.rejected += 1
+                self._consecutive_rejects += 1
+                if self._consecutive_rejects < self.max_rejects:
+                    return False
+                self.reset()
+            else:
+                self._residual_var += (residual ** 2 - self._residual_var) / min(self.points, 100)
+        self._consecutive_rejects = 0
+
+        decay = 1.0
+        if self._last_x is not None:
+            decay = 0.5 ** (max(x - self._last_x, 0.0) / (self.half_life * self.sampling_rate))
+        self._last_x = x
+
+        # Exponentially weighted (West) update of the means and co-moments
+        self._weight = decay * self._weight + 1.0
+        dx = x - self._mean_x
+        self._mean_x += dx / self._weight
+        self._mean_y += (y - self._mean_y) / self._weight
+        self._sxx = decay * self._sxx + dx * (x - self._mean_x)
+        self._sxy = decay * self._sxy + dx * (y - self._mean_y)
+        self.points += 1
+        return True
+
+    def sample_to_time(self, sample_index):
+        """
+        Maps sample indices (scalar or array) to the host time at which they were acquired.
+        """
+        if self.points == 0:
+            raise RuntimeError("No observations yet; call update() with acquired chunks first.")
+        return self._mean_y + (np.asarray(sample_index, dtype=float) - self._mean_x) * self.slope
+
+    def time_to_sample(self, host_time):
+        """
+        Maps host times (scalar or array, `time.perf_counter()` of any process on this machine, e.g. a stimulus
+        cue_time) to fractional sample indices of the stream.
+        """
+        if self.points == 0:
+            raise RuntimeError("No observations yet; call update() with acquired chunks first.")
+        return self._mean_x + (np.asarray(host_time, dtype=float) - self._mean_y) / self.slope
+
+    def summary(self):
+        """
+        Returns:
+            dict: Effective sampling rate, drift (ppm), arrival jitter (ms) and the number of used/skipped points.
+        """
+        return {
+            "effective_rate": round(float(self.effective_rate), 6),
+            "drift_ppm": round(float(self.drift_ppm), 3),
+            "jitter_ms": round(self.residual_std * 1000, 3),
+            "fitted": self.fitted,
+            "points": self.points,
+            "rejected": self.rejected,
+        }
+
+
+if __name__ == "__main__":
+    # Simulates 4 h of a 250 Hz board whose oscillator runs 40 ppm fast, read in bursts with 0-30 ms of
+    # arrival jitter and occasional 200 ms stalls, then maps stimulus cue times back to sample indices
+    rng = np.random.default_rng(0)
+    sampling_rate, drift = 250.0, 40e-6
+    chunk, hours = 12, 4
+    indices = np.arange(chunk - 1, int(hours * 3600 * sampling_rate), chunk)
+    acquired = indices / (sampling_rate * (1 + drift))
+    arrivals = acquired + rng.uniform(0, 0.03, len(indices))
+    stalls = rng.random(len(indices)) < 0.001
+    arrivals[stalls] += 0.2
+
+    aligner = ClockAligner(sampling_rate, latency=0.015)  # Mean of the simulated transport delay
+    start = time.perf_counter()
+    for index, arrival in zip(indices, arrivals):
+        aligner.update(index, arrival)
+    elapsed = time.perf_counter() - start
+    print(f"{len(indices)} chunks in {elapsed:.2f} s ({elapsed / len(indices) * 1e6:.1f} us per update): "
+          f"{aligner.summary()}")
+
+    cue_samples = rng.uniform(3.9, 4.0, 20) * 3600 * sampling_rate  # Cues in the last 6 minutes
+    cue_times = cue_samples / (sampling_rate * (1 + drift))
+    error = aligner.time_to_sample(cue_times) - cue_samples
+    nominal_error = cue_times * sampling_rate - cue_samples
+    print(f"Cue -> sample error after {hours} h: {np.abs(error).max():.3f} samples "
+          f"(nominal rate: {np.abs(nominal_error).max():.1f} samples)")
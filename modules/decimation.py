@@ -0,0 +1,39 @@
+import numpy as np
+
+
+def minmax_decimate(data, n_bins):
+    """
+    Reduces each channel to the minimum and maximum of `n_bins` equal-width bins (min/max decimation).
+
+    Drawing the result as a line looks the same as drawing every sample once a bin is narrower than a pixel,
+    since the line then spans exactly the range of the samples it replaces - spikes and rail hits stay visible,
+    unlike plain subsampling.
+
+    Args:
+        data (np.ndarray): Data of shape (n_channels, n_samples) or (n_samples,).
+        n_bins (int): Number of bins, typically the width of the axes in pixels.
+
+    Returns:
+        tuple: (sample positions of shape (n_points,), decimated data of shape (n_channels, n_points)) with
+               n_points = 2 * n_bins. Data that already fits is returned as is, with n_points = n_samples.
+    """
+    data = np.atleast_2d(data)
+    n_channels, n_samples = data.shape
+    n_bins = max(int(n_bins), 1)
+    if n_samples <= 2 * n_bins:
+        return np.arange(n_samples, dtype=float), data
+
+    bin_size = n_samples // n_bins
+    usable = bin_size * n_bins
+    # Bins are aligned to the end of the data so the newest samples always fall in a complete bin
+    start = n_samples - usable
+    blocks = data[:, start:].reshape(n_channels, n_bins, bin_size)
+
+    decimated = np.empty((n_channels, n_bins, 2), dtype=data.dtype)
+    np.min(blocks, axis=2, out=decimated[:, :, 0])
+    np.max(blocks, axis=2, out=decimated[:, :, 1])
+
+    positions = start + np.arange(n_bins) * bin_size
+    positions = np.repeat(positions, 2).astype(float)
+    positions[1::2] += bin_size - 1
+    return positions, decimated.reshape(n_channels, 2 * n_bins)
@@ -0,0 +1,186 @@
+import numpy as np
+
+
+def softmax_posterior(scores, temperature=0.05):
+    """
+    Turns classifier scores into a posterior over targets (uniform prior, softmax likelihood).
+
+    Args:
+        scores (np.ndarray): Scores of all targets, shape (n_targets,).
+        temperature (float): Score difference that corresponds to a factor e in likelihood. Smaller values make
+                             the posterior sharper; fit it to calibration data for calibrated probabilities.
+
+    Returns:
+        np.ndarray: Posterior probabilities, shape (n_targets,).
+    """
+    logits = (np.asarray(scores, dtype=float) - np.max(scores)) / temperature
+    weights = np.exp(logits)
+    return weights / weights.sum()
+
+
+def information_transfer_rate(n_targets, accuracy, seconds_per_selection):
+    """
+    Wolpaw information transfer rate in bits per minute.
+
+    Args:
+        n_targets (int): Number of targets.
+        accuracy (float): Fraction of correct selections.
+        seconds_per_selection (float): Mean time per selection (decision time plus any gaze-shift interval).
+
+    Returns:
+        float: ITR in bits/min.
+    """
+    if seconds_per_selection <= 0 or n_targets < 2:
+        return 0.0
+    p = min(max(accuracy, 0.0), 1.0)
+    bits = np.log2(n_targets)
+    if 0 < p < 1:
+        bits += p * np.log2(p) + (1 - p) * np.log2((1 - p) / (n_targets - 1))
+    elif p == 0:
+        bits += np.log2(1 / (n_targets - 1))
+    return max(float(bits), 0.0) * 60.0 / seconds_per_selection
+
+
+class DynamicStopping:
+    """
+    Early-decision layer on top of a window classifier (SSVEPClassifier, TRCAClassifier, PowerSSVEPClassifier).
+
+    From the start of a trial (stimulus onset), the growing window is scored every `step` seconds once
+    `min_window` seconds are available. The decision is committed as soon as the confidence criterion crosses
+    the threshold and the same target has won `min_consecutive` evaluations in a row, or at `max_window` at
+    the latest:
+    - 'margin': relative margin (best - second best) / best. Relative rather than absolute, since chance
+      correlations of short windows are high and shrink as the window grows,
+    - 'bayes': posterior probability of the best target (`softmax_posterior` of the scores).
+
+    Easy trials therefore end after a fraction of the fixed window, while hard trials still get the full one.
+    """
+
+    def __init__(self, classifier, sampling_rate, step=0.1, min_window=0.5, max_window=None, criterion='margin',
+                 threshold=0.2, temperature=0.05, min_consecutive=3):
+        """
+        Initializes the DynamicStopping layer.
+
+        Args:
+            classifier: Classifier with a `score(eeg_segment)` method returning all target scores and a
+                        `frequencies` list.
+            sampling_rate (float): Sampling rate of the EEG data.
+            step (float): Seconds between evaluations (e.g. 0.1).
+            min_window (float): Shortest window that may be classified, in seconds.
+            max_window (float, optional): Window at which a decision is forced. Defaults to the classifier's
+                                          window (`n_samples`) if it has one.
+            criterion (str): 'margin' or 'bayes'.
+            threshold (float): Score margin (for 'margin') or posterior probability (for 'bayes') needed to stop.
+            temperature (float): Softmax temperature of the 'bayes' criterion.
+            min_consecutive (int): Number of consecutive evaluations the best target must win before stopping.
+        """
+        if criterion not in ('margin', 'bayes'):
+            raise ValueError(f"Invalid criterion '{criterion}'. Use 'margin' or 'bayes'.")
+        self.classifier = classifier
+        self.sampling_rate = sampling_rate
+        self.step_samples = max(int(round(step * sampling_rate)), 1)
+        self.min_samples = int(round(min_window * sampling_rate))
+        if max_window is None:
+            self.max_samples = getattr(classifier, 'n_samples', None)
+            if self.max_samples is None:
+                raise ValueError("max_window is required for classifiers without a fixed window (n_samples).")
+        else:
+            self.max_samples = int(round(max_window * sampling_rate))
+        self.criterion = criterion
+        self.threshold = threshold
+        self.temperature = temperature
+        self.min_consecutive = min_consecutive
+
+        self.trial = None
+        self.trial_samples = 0
+        self.next_check = None
+        self.decision = None
+        self.reset()
+
+    def confidence(self, scores):
+        """
+        Returns the confidence of the best target under the configured criterion.
+        """
+        if self.criterion == 'bayes':
+            return float(np.max(softmax_posterior(scores, self.temperature)))
+        ordered = np.sort(scores)
+        if len(ordered) < 2 or ordered[-1] <= 0:
+            return 0.0
+        return float((ordered[-1] - ordered[-2]) / ordered[-1])
+
+    def reset(self):
+        """
+        Clears the winning streak (start of a new trial).
+        """
+        self.leader = None
+        self.streak = 0
+
+    def evaluate(self, eeg_segment, force=False):
+        """
+        Scores one window from the trial start and decides whether to stop.
+
+        Returns:
+            dict or None: The decision (frequency, score, confidence, window_s, stopped_early) or None to continue.
+        """
+        scores = np.asarray(self.classifier.score(eeg_segment), dtype=float)
+        confidence = self.confidence(scores)
+        n_samples = eeg_segment.shape[1]
+        best = int(np.argmax(scores))
+        self.streak = self.streak + 1 if best == self.leader else 1
+        self.leader = best
+        if (confidence < self.threshold or self.streak < self.min_consecutive) and not force:
+            return None
+        return {
+            "frequency": self.classifier.frequencies[best],
+            "score": float(scores[best]),
+            "confidence": confidence,
+            "window_s": n_samples / self.sampling_rate,
+            "stopped_early": n_samples < self.max_samples,
+        }
+
+    def run_trial(self, eeg_trial):
+        """
+        Simulates the growing-window decision on a recorded trial (n_channels, n_samples) starting at the onset.
+
+        Returns:
+            dict: The decision (always made - forced at max_window or at the end of the data).
+        """
+        self.reset()
+        last = min(eeg_trial.shape[1], self.max_samples)
+        n_samples = min(self.min_samples, last)
+        while True:
+            decision = self.evaluate(eeg_trial[:, :n_samples], force=n_samples >= last)
+            if decision is not None:
+                return decision
+            n_samples = min(n_samples + self.step_samples, last)
+
+    def start_trial(self):
+        """
+        Starts a new online trial (call at stimulus onset); following `update` chunks are accumulated from here.
+        """
+        self.trial = []
+        self.trial_samples = 0
+        self.next_check = self.min_samples
+        self.decision = None
+        self.reset()
+
+    def update(self, chunk):
+        """
+        Adds streaming samples (n_channels, n_samples) of the current trial and evaluates every completed step.
+
+        Returns:
+            dict or None: The decision once committed (the trial then ignores further data until `start_trial`).
+        """
+        if self.trial is None or self.decision is not None:
+            return None
+        self.trial.append(chunk)
+        self.trial_samples += chunk.shape[1]
+        while self.trial_samples >= self.next_check:
+            data = np.concatenate(self.trial, axis=1)
+            self.trial = [data]
+            n_samples = min(self.next_check, self.max_samples)
+            self.decision = self.evaluate(data[:, :n_samples], force=n_samples >= self.max_samples)
+            if self.decision is not None:
+                return self.decision
+            self.next_check += self.step_samples
+        return None
@@ -0,0 +1,394 @@
+import os
+import csv
+import json
+import time
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from modules.filtering import Filtering
+from modules.stimulus_control import attach_shared_memory
+from modules.classification import SSVEPClassifier, PowerSSVEPClassifier, TRCAClassifier
+from modules.dynamic_stopping import information_transfer_rate
+
+REFERENCE_METHODS = ["CCA", "power"]     # No calibration needed (FBCCA/foCCA are not implemented yet)
+TEMPLATE_METHODS = ["ITCCA", "eCCA", "TRCA", "eTRCA"]      # Evaluated with k-fold cross-validation
+RESULT_FIELDS = ["dataset", "filter", "window_s", "harmonics", "method", "n_trials", "accuracy", "itr",
+                 "latency_ms", "latency_p95_ms"]
+_THREAD_VARIABLES = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"]
+
+# Shared memory blocks attached by this (worker) process: name -> (SharedMemory, array). Kept open for the
+# lifetime of the worker so later configurations on the same epochs skip the attach.
+_attached = {}
+
+
+def events_from_segments(frequencies, segment_duration, sampling_rate, trial_duration, step=1.0, start=0.0):
+    """
+    Builds trial events for a recording of consecutive single-target segments (e.g. `simulated_test_SSVEP.npy`:
+    10 s of each target in turn). Trials start every `step` seconds as long as `trial_duration` fits in the segment.
+
+    Returns:
+        list: (onset sample, frequency) pairs.
+    """
+    events = []
+    n_onsets = int(np.floor((segment_duration - trial_duration) / step + 1e-9)) + 1
+    for target, frequency in enumerate(frequencies):
+        for k in range(n_onsets):
+            onset = start + target * segment_duration + k * step
+            events.append((int(round(onset * sampling_rate)), frequency))
+    return events
+
+
+def sweep_configs(filters, windows, harmonics, methods):
+    """
+    Builds the grid of configurations (filter, window, harmonics, method). Harmonics are ignored by TRCA, so
+    those methods get a single entry with harmonics None.
+
+    Args:
+        filters (list): Filter specs - None (raw data), a dict of `Filtering.filter_data` arguments such as
+                        {"filter_type": "bandpass", "lowcut": 6, "highcut": 40}, or a list of such dicts applied in order.
+        windows (list): Window lengths in seconds (from the stimulus onset).
+        harmonics (list): Numbers of harmonics for the reference-based methods.
+        methods (list): Names from REFERENCE_METHODS and TEMPLATE_METHODS.
+
+    Returns:
+        list: Configuration dicts.
+    """
+    unknown = [method for method in methods if method not in REFERENCE_METHODS + TEMPLATE_METHODS]
+    if unknown:
+        raise ValueError(f"Unknown method(s) {unknown}. Options are {REFERENCE_METHODS + TEMPLATE_METHODS}.")
+    configs, seen = [], set()
+    for filter_index, window, n_harmonics, method in itertools.product(range(len(filters)), windows, harmonics, methods):
+        if method in ("TRCA", "eTRCA"):
+            n_harmonics = None
+        key = (filter_index, window, n_harmonics, method)
+        if key not in seen:
+            seen.add(key)
+            configs.append({"filter": filter_index, "window": window, "harmonics": n_harmonics, "method": method})
+    return configs
+
+
+def filter_label(spec):
+    """
+    Returns a readable name of a filter spec that tells every spec apart, e.g.
+    'bandpass(6-40,order=4)+notch(notch_freq=50)'.
+    """
+    if spec is None:
+        return "raw"
+    steps = spec if isinstance(spec, (list, tuple)) else [spec]
+    labels = []
+    for step in steps:
+        arguments = {key: value for key, value in step.items() if key != "filter_type"}
+        details = []
+        if "lowcut" in arguments and "highcut" in arguments:
+            details.append(f"{arguments.pop('lowcut')}-{arguments.pop('highcut')}")
+        details += [f"{key}={arguments[key]}" for key in sorted(arguments)]
+        labels.append(f"{step.get('filter_type', 'bandpass')}({','.join(details)})")
+    return "+".join(labels)
+
+
+def _load(dataset):
+    if dataset.get("data") is not None:
+        return np.asarray(dataset["data"], dtype=np.float64)
+    return np.load(dataset["path"]).astype(np.float64)
+
+
+def _attach(name, shape):
+    if name not in _attached:
+        shm = attach_shared_memory(name)
+        _attached[name] = (shm, np.ndarray(shape, dtype=np.float64, buffer=shm.buf))
+    return _attached[name][1]
+
+
+def _release():
+    # Drops the views before closing, otherwise the buffer is still exported
+    for name in list(_attached):
+        shm, _ = _attached.pop(name)
+        shm.close()
+
+
+def _preprocess(job):
+    """
+    Worker task: filters one dataset with one filter spec and writes its epochs into the output block.
+    """
+    raw = _attach(job["raw"], job["raw_shape"])
+    epochs = _attach(job["epochs"], job["epochs_shape"])
+    spec = job["spec"]
+    data = raw
+    if spec is not None:
+        filtering = Filtering(job["sampling_rate"])
+        for step in (spec if isinstance(spec, (list, tuple)) else [spec]):
+            arguments = dict(step)
+            data = filtering.filter_data(data, arguments.pop("filter_type", "bandpass"), **arguments)
+    n_samples = epochs.shape[2]
+    for trial, onset in enumerate(job["onsets"]):
+        epochs[trial] = data[:, onset:onset + n_samples]
+    if job["cache_path"]:
+        # Written under a temporary name and renamed, so a concurrent sweep never loads a partial file
+        temporary = f"{job['cache_path']}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.save(file, epochs)
+        os.replace(temporary, job["cache_path"])
+
+
+def _make_classifier(config, frequencies, sampling_rate, n_samples):
+    method = config["method"]
+    if method == "power":
+        return PowerSSVEPClassifier(frequencies, config["harmonics"], sampling_rate, n_samples)
+    if method in ("TRCA", "eTRCA"):
+        return TRCAClassifier(frequencies, sampling_rate, ensemble=method == "eTRCA")
+    return SSVEPClassifier(frequencies, config["harmonics"], sampling_rate, n_samples, method=method)
+
+
+def _folds(labels, n_folds):
+    # Stratified round-robin assignment: every fold holds a share of each target's trials
+    folds = np.empty(len(labels), dtype=int)
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        folds[members] = np.arange(len(members)) % n_folds
+    return folds
+
+
+def _evaluate(job):
+    """
+    Worker task: scores one configuration on its dataset's cached epochs.
+
+    Returns:
+        dict: The result row.
+    """
+    config = job["config"]
+    epochs = _attach(job["epochs"], job["epochs_shape"])
+    n_samples = int(round(config["window"] * job["sampling_rate"]))
+    windows = epochs[:, :, :n_samples]
+    labels = np.asarray(job["labels"])
+    frequencies = job["frequencies"]
+
+    predictions, latencies = [None] * len(labels), []
+    if config["method"] in TEMPLATE_METHODS:
+        folds = _folds(labels, job["n_folds"])
+        splits = [(np.flatnonzero(folds != fold), np.flatnonzero(folds == fold)) for fold in range(job["n_folds"])]
+    else:
+        splits = [(None, np.arange(len(labels)))]
+
+    for train, test in splits:
+        classifier = _make_classifier(config, frequencies, job["sampling_rate"], n_samples)
+        if train is not None:
+            classifier.fit(windows[train], labels[train])
+        for trial in test:
+            start = time.perf_counter()
+            predictions[trial], _ = classifier(windows[trial])
+            latencies.append(time.perf_counter() - start)
+
+    accuracy = float(np.mean([predicted == label for predicted, label in zip(predictions, labels)]))
+    latencies = np.array(latencies) * 1000
+    return {
+        "dataset": job["dataset"],
+        "filter": job["filter_label"],
+        "window_s": config["window"],
+        "harmonics": config["harmonics"],
+        "method": config["method"],
+        "n_trials": len(labels),
+        "accuracy": accuracy,
+        "itr": information_transfer_rate(len(frequencies), accuracy, config["window"] + job["gaze_shift"]),
+        "latency_ms": float(latencies.mean()),
+        "latency_p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def _source_key(dataset, raw):
+    # Identifies the recording: path, size and modification time of a file, or a digest of in-memory data
+    if dataset.get("data") is None:
+        stat = os.stat(dataset["path"])
+        return [os.path.abspath(dataset["path"]), stat.st_size, stat.st_mtime_ns]
+    return hashlib.sha1(np.ascontiguousarray(raw).view(np.uint8)).hexdigest()
+
+
+def _cache_path(cache_dir, dataset, source_key, spec, onsets, n_samples):
+    if not cache_dir:
+        return None
+    # Keyed on everything that determines the epochs, so differing filters, onsets or recordings never share a file
+    key = json.dumps({"source": source_key, "spec": spec, "onsets": [int(onset) for onset in onsets],
+                      "sampling_rate": float(dataset["sampling_rate"]), "n_samples": n_samples}, sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    name = f"{dataset['name']}_{n_samples}_{digest}".replace("/", "_").replace(" ", "")
+    return os.path.join(cache_dir, f"{name}.epochs.npy")
+
+
+def _run(executor, function, jobs):
+    if executor is None:
+        return [function(job) for job in jobs]
+    return list(executor.map(function, jobs))
+
+
+def run_sweep(datasets, filters, windows, harmonics, methods, workers=None, n_folds=4, gaze_shift=0.5,
+              cache_dir=None, output=None, verbose=True):
+    """
+    Evaluates every configuration of the sweep on every dataset, in parallel on a process pool.
+
+    Each recording is copied once into shared memory, so workers attach to it instead of receiving a copy.
+    Preprocessing runs once per (dataset, filter): the filtered epochs (onset to the longest window) are written
+    into a shared block that all configurations of that filter then crop, and optionally saved to `cache_dir`
+    so later sweeps skip the filtering. Workers run single-threaded BLAS, so the sweep scales with the number
+    of processes rather than oversubscribing cores.
+
+    Args:
+        datasets (list): Dicts with 'name', 'data' (n_channels, n_samples) or 'path' (.npy), 'sampling_rate',
+                         'frequencies' and 'events' ((onset sample, frequency) pairs, see `events_from_segments`).
+        filters (list): Filter specs (see `sweep_configs`).
+        windows (list): Window lengths in seconds.
+        harmonics (list): Numbers of harmonics.
+        methods (list): Classifier methods (see REFERENCE_METHODS and TEMPLATE_METHODS).
+        workers (int, optional): Number of worker processes (default: all cores). 1 runs in this process.
+        n_folds (int): Cross-validation folds for the template-based methods.
+        gaze_shift (float): Seconds added to each selection for the ITR.
+        cache_dir (str, optional): Directory for cached preprocessed epochs.
+        output (str, optional): Path of a CSV file for the results.
+        verbose (bool): Whether to print progress and the results table.
+
+    Returns:
+        list: One result dict per (dataset, configuration), with the RESULT_FIELDS keys.
+    """
+    workers = workers or os.cpu_count() or 1
+    configs = sweep_configs(filters, windows, harmonics, methods)
+    max_window = max(windows)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    blocks = []
+    saved_environment = {name: os.environ.get(name) for name in _THREAD_VARIABLES}
+    executor = None
+    try:
+        # Inherited by the spawned workers
+        for name in _THREAD_VARIABLES:
+            os.environ[name] = "1"
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+
+        def share(array):
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(shm)
+            view = np.ndarray(array.shape, dtype=np.float64, buffer=shm.buf)
+            view[...] = array
+            return shm.name
+
+        # Stage 1: filtered epochs per (dataset, filter)
+        start = time.perf_counter()
+        prepared, preprocess_jobs = [], []
+        for dataset in datasets:
+            sampling_rate = dataset["sampling_rate"]
+            n_samples = int(round(max_window * sampling_rate))
+            raw = _load(dataset)
+            events = [(onset, frequency) for onset, frequency in dataset["events"] if onset + n_samples <= raw.shape[1]]
+            if len(events) < len(dataset["events"]):
+                print(f"{dataset['name']}: dropped {len(dataset['events']) - len(events)} trial(s) shorter than {max_window} s.")
+            raw_name = share(raw)
+            epochs_shape = (len(events), raw.shape[0], n_samples)
+            onsets = [onset for onset, _ in events]
+            source_key = _source_key(dataset, raw) if cache_dir else None
+            for filter_index, spec in enumerate(filters):
+                cache_path = _cache_path(cache_dir, dataset, source_key, spec, onsets, n_samples)
+                epochs_name = share(np.zeros(epochs_shape))
+                prepared.append({"dataset": dataset, "filter": filter_index, "epochs": epochs_name,
+                                 "epochs_shape": epochs_shape, "labels": [frequency for _, frequency in events]})
+                if cache_path and os.path.exists(cache_path):
+                    cached = np.load(cache_path)
+                    if cached.shape == epochs_shape:
+                        np.ndarray(epochs_shape, dtype=np.float64, buffer=blocks[-1].buf)[...] = cached
+                        continue
+                preprocess_jobs.append({"raw": raw_name, "raw_shape": raw.shape, "epochs": epochs_name,
+                                        "epochs_shape": epochs_shape, "spec": spec, "sampling_rate": sampling_rate,
+                                        "onsets": onsets, "cache_path": cache_path})
+            del raw
+        _run(executor, _preprocess, preprocess_jobs)
+        if verbose:
+            print(f"Preprocessed {len(preprocess_jobs)} (dataset, filter) pair(s) "
+                  f"({len(prepared) - len(preprocess_jobs)} cached) in {time.perf_counter() - start:.2f} s")
+
+        # Stage 2: every configuration on its cached epochs
+        start = time.perf_counter()
+        evaluate_jobs = []
+        for entry in prepared:
+            dataset = entry["dataset"]
+            for config in configs:
+                if config["filter"] != entry["filter"]:
+                    continue
+                evaluate_jobs.append({"config": config, "epochs": entry["epochs"], "epochs_shape": entry["epochs_shape"],
+                                      "labels": entry["labels"], "frequencies": list(dataset["frequencies"]),
+                                      "sampling_rate": dataset["sampling_rate"], "dataset": dataset["name"],
+                                      "filter_label": filter_label(filters[entry["filter"]]),
+                                      "n_folds": n_folds, "gaze_shift": gaze_shift})
+        results = _run(executor, _evaluate, evaluate_jobs)
+        if verbose:
+            print(f"Evaluated {len(evaluate_jobs)} configuration(s) on {workers} worker(s) "
+                  f"in {time.perf_counter() - start:.2f} s\n")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        _release()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+        for name, value in saved_environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    if output:
+        write_results(results, output)
+    if verbose:
+        print_results(results)
+    return results
+
+
+def write_results(results, path):
+    """
+    Writes sweep results to a CSV file.
+    """
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def print_results(results, sort_by="itr"):
+    """
+    Prints sweep results as a table, best first.
+    """
+    header = f"{'dataset':12s} {'filter':24s} {'window':>6s} {'harm':>4s} {'method':>6s} {'acc':>7s} {'ITR':>7s} {'ms':>8s} {'p95 ms':>8s}"
+    print(header)
+    print("-" * len(header))
+    for row in sorted(results, key=lambda row: row[sort_by], reverse=True):
+        harmonics = "-" if row["harmonics"] is None else row["harmonics"]
+        print(f"{row['dataset']:12s} {row['filter']:24s} {row['window_s']:6.2f} {harmonics:>4} {row['method']:>6s} "
+              f"{row['accuracy']:7.1%} {row['itr']:7.1f} {row['latency_ms']:8.2f} {row['latency_p95_ms']:8.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parallel offline sweep on simulated_test_SSVEP.npy.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores).")
+    parser.add_argument("--noise", type=float, default=8.0, help="Std of the noise added to the noisy variant.")
+    parser.add_argument("--output", default=None, help="CSV file for the results.")
+    parser.add_argument("--cache-dir", default=None, help="Directory for cached preprocessed epochs.")
+    args = parser.parse_args()
+
+    data_path = os.path.join(os.path.dirname(__file__), "..", "testing", "simulated_test_SSVEP.npy")
+    frequencies = [9.25, 11.25, 13.25, 15.25]
+    clean = np.load(data_path)
+    noisy = clean + args.noise * np.random.default_rng(0).standard_normal(clean.shape)
+    # Onsets 4 s apart hold whole cycles of every x.25 Hz target, so trials are phase-locked for the template methods
+    events = events_from_segments(frequencies, 10, 250, trial_duration=2, step=4)
+    datasets = [{"name": name, "data": data, "sampling_rate": 250, "frequencies": frequencies, "events": events}
+                for name, data in (("clean", clean), ("noisy", noisy))]
+
+    run_sweep(datasets,
+              filters=[None, {"filter_type": "bandpass", "lowcut": 6, "highcut": 40}],
+              windows=[0.5, 1.0, 2.0],
+              harmonics=[2, 3],
+              methods=["CCA", "power", "eCCA", "TRCA"],
+              n_folds=3, workers=args.workers, cache_dir=args.cache_dir, output=args.output)
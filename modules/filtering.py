@@ -1,9 +1,50 @@
+from functools import lru_cache
+
 import numpy as np
-from scipy.signal import butter, lfilter, iirnotch, filtfilt
+from scipy.signal import butter, lfilter, iirnotch, filtfilt, sosfiltfilt, tf2sos
+
+
+def _read_only(*arrays):
+    for array in arrays:
+        array.setflags(write=False)
+    return arrays
+
+
+@lru_cache(maxsize=128)
+def _butter_design(order, wn, btype, output, dtype):
+    # Shared by every Filtering instance of the process (e.g. all sessions of a SessionServer), so read-only
+    if output == 'sos':
+        return _read_only(butter(order, wn, btype=btype, output='sos').astype(dtype))
+    return _read_only(*butter(order, wn, btype=btype))
+
+
+@lru_cache(maxsize=32)
+def _notch_design(w0, quality_factor, output, dtype):
+    b, a = iirnotch(w0, quality_factor)
+    return _read_only(tf2sos(b, a).astype(dtype)) if output == 'sos' else _read_only(b, a)
+
 
 class Filtering:
-    def __init__(self, sampling_rate):
+    def __init__(self, sampling_rate, dtype=np.float64):
+        """
+        Initializes the Filtering class.
+
+        Args:
+            sampling_rate (float): The sampling rate of the EEG data.
+            dtype (np.dtype): Precision the filters run and return in. float64 uses transfer-function filtfilt;
+                              float32 uses second-order sections (stable in single precision) and halves the
+                              memory traffic.
+        """
         self.sampling_rate = sampling_rate
+        self.dtype = np.dtype(dtype)
+
+    def _filtfilt(self, data, order, wn, btype):
+        wn = tuple(np.atleast_1d(wn).tolist()) if np.ndim(wn) else float(wn)
+        if self.dtype == np.float64:
+            b, a = _butter_design(order, wn, btype, 'ba', self.dtype.str)
+            return filtfilt(b, a, data)
+        sos, = _butter_design(order, wn, btype, 'sos', self.dtype.str)
+        return sosfiltfilt(sos.copy(), np.asarray(data, dtype=self.dtype))  # sosfiltfilt needs a writable sos
 
     def bandpass_filter(self, data, lowcut, highcut, order=6):
         """
@@ -21,8 +62,7 @@ class Filtering:
         nyquist = 0.5 * self.sampling_rate
         low = lowcut / nyquist
         high = highcut / nyquist
-        b, a = butter(order, [low, high], btype='band')
-        y = filtfilt(b, a, data)
+        y = self._filtfilt(data, order, [low, high], 'band')
         return y
 
     def highpass_filter(self, data, lowcut, order=5):
@@ -39,8 +79,7 @@ class Filtering:
         """
         nyquist = 0.5 * self.sampling_rate
         low = lowcut / nyquist
-        b, a = butter(order, low, btype='high')
-        y = filtfilt(b, a, data)
+        y = self._filtfilt(data, order, low, 'high')
         return y
 
     def lowpass_filter(self, data, highcut, order=5):
@@ -57,8 +96,7 @@ class Filtering:
         """
         nyquist = 0.5 * self.sampling_rate
         high = highcut / nyquist
-        b, a = butter(order, high, btype='low')
-        y = filtfilt(b, a, data)
+        y = self._filtfilt(data, order, high, 'low')
         return y
 
     def notch_filter(self, data, notch_freq, quality_factor=30.0):
@@ -75,8 +113,12 @@ class Filtering:
         """
         nyquist = 0.5 * self.sampling_rate
         w0 = notch_freq / nyquist
-        b, a = iirnotch(w0, quality_factor)
-        y = filtfilt(b, a, data)
+        if self.dtype == np.float64:
+            b, a = _notch_design(float(w0), float(quality_factor), 'ba', self.dtype.str)
+            y = filtfilt(b, a, data)
+        else:
+            sos, = _notch_design(float(w0), float(quality_factor), 'sos', self.dtype.str)
+            y = sosfiltfilt(sos.copy(), np.asarray(data, dtype=self.dtype))
         return y
 
     def bandstop_filter(self, data, lowcut, highcut, order=5):
@@ -95,43 +137,57 @@ class Filtering:
         nyquist = 0.5 * self.sampling_rate
         low = lowcut / nyquist
         high = highcut / nyquist
-        b, a = butter(order, [low, high], btype='bandstop')
-        y = filtfilt(b, a, data)
+        y = self._filtfilt(data, order, [low, high], 'bandstop')
         return y
 
-    def filter_data(self, data, filter_type="bandpass", **kwargs):
+    def filter_data(self, data, filter_type="bandpass", out=None, inplace=False, channels=None, **kwargs):
         """
         Applies the specified filter to the EEG data.
 
+        Follows the same copy contract as `BF_Filtering.filter_data`: a new array by default, the rows written to
+        `out` if given, or `data`'s rows overwritten with `inplace=True` (SciPy's filtfilt still allocates its
+        own result internally).
+
         Args:
             data (np.ndarray): The EEG data to be filtered.
             filter_type (str): The type of filter to apply. Options are "bandpass", "highpass", "lowpass", "notch", "bandstop".
+            out (np.ndarray, optional): Array the filtered rows are written to.
+            inplace (bool): Whether to overwrite the rows of `data` with the filtered data.
+            channels (list, optional): Rows of `data` to filter. Defaults to all rows.
             kwargs: Additional arguments for the filters, such as 'lowcut', 'highcut', 'order', 'notch_freq', and 'quality_factor'.
 
         Returns:
             np.ndarray: The filtered EEG data.
         """
+        if inplace and out is not None:
+            raise ValueError("Use either out= or inplace=True, not both.")
+        rows = data if channels is None else data[list(channels)]
+        filtered = self._filter_rows(rows, filter_type, **kwargs)
+        if inplace:
+            if channels is None:
+                data[...] = filtered
+            else:
+                data[list(channels)] = filtered
+            return data
+        if out is not None:
+            out[...] = filtered
+            return out
+        return filtered
+
+    def _filter_rows(self, data, filter_type="bandpass", **kwargs):
+        """
+        Filters every row of `data` into a new array (see `filter_data`). The filters run along the last axis,
+        so all rows are filtered in one call.
+        """
         if filter_type == "bandpass":
-            return np.apply_along_axis(self.bandpass_filter, 1, data, 
-                                       kwargs.get("lowcut", 0.5), 
-                                       kwargs.get("highcut", 30.0), 
-                                       kwargs.get("order", 5))
+            return self.bandpass_filter(data, kwargs.get("lowcut", 0.5), kwargs.get("highcut", 30.0), kwargs.get("order", 5))
         elif filter_type == "highpass":
-            return np.apply_along_axis(self.highpass_filter, 1, data, 
-                                       kwargs.get("lowcut", 0.5), 
-                                       kwargs.get("order", 5))
+            return self.highpass_filter(data, kwargs.get("lowcut", 0.5), kwargs.get("order", 5))
         elif filter_type == "lowpass":
-            return np.apply_along_axis(self.lowpass_filter, 1, data, 
-                                       kwargs.get("highcut", 30.0), 
-                                       kwargs.get("order", 5))
+            return self.lowpass_filter(data, kwargs.get("highcut", 30.0), kwargs.get("order", 5))
         elif filter_type == "notch":
-            return np.apply_along_axis(self.notch_filter, 1, data, 
-                                       kwargs.get("notch_freq", 50.0), 
-                                       kwargs.get("quality_factor", 30.0))
+            return self.notch_filter(data, kwargs.get("notch_freq", 50.0), kwargs.get("quality_factor", 30.0))
         elif filter_type == "bandstop":
-            return np.apply_along_axis(self.bandstop_filter, 1, data, 
-                                       kwargs.get("lowcut", 48.0), 
-                                       kwargs.get("highcut", 52.0), 
-                                       kwargs.get("order", 5))
+            return self.bandstop_filter(data, kwargs.get("lowcut", 48.0), kwargs.get("highcut", 52.0), kwargs.get("order", 5))
         else:
             raise ValueError("Invalid filter type. Options are 'bandpass', 'highpass', 'lowpass', 'notch', 'bandstop'.")
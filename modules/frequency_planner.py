@@ -0,0 +1,260 @@
+import json
+import numpy as np
+from modules.references import harmonic_list, reference_time
+
+FREQUENCY_DECIMALS = 4  # Frequencies are rounded to this many decimals wherever they are planned or published
+
+
+def candidate_frequencies(refresh_rate, band=(8.0, 16.0), step=None):
+    """
+    Lists the flicker frequencies the planner may choose from.
+
+    Args:
+        refresh_rate (float): Refresh rate of the stimulus display in Hz.
+        band (tuple): (low, high) frequency band in Hz.
+        step (float, optional): If None, only frame-exact frequencies (refresh_rate / k) are used. Otherwise a
+                                regular grid with this spacing (Hz) is used, which the stimulus renders with
+                                non-integer frame periods.
+
+    Returns:
+        np.ndarray: Candidate frequencies in Hz, ascending.
+    """
+    low, high = band
+    if step is None:
+        frames_per_cycle = np.arange(max(int(np.floor(refresh_rate / high)), 2), int(np.ceil(refresh_rate / low)) + 1)
+        freqs = refresh_rate / frames_per_cycle
+    else:
+        freqs = np.arange(low, high + step / 2, step)
+    freqs = np.round(freqs[(freqs >= low) & (freqs <= high)], FREQUENCY_DECIMALS)
+    return np.unique(freqs)
+
+
+def subspace_similarity(frequencies, harmonics, sampling_rate, n_samples):
+    """
+    Computes the largest canonical correlation between the harmonic reference subspaces of every pair of frequencies.
+
+    This is the correlation CCA would report for target j when the EEG contains a clean response to target i,
+    so the lower it is the easier the two targets are to tell apart within the window.
+
+    Args:
+        frequencies (array-like): Frequencies in Hz, shape (n_freqs,).
+        harmonics (int or iterable): Harmonics used by the classifier (see `references.harmonic_list`).
+        sampling_rate (float): Sampling rate of the EEG in Hz.
+        n_samples (int): Number of samples in the classification window.
+
+    Returns:
+        np.ndarray: Symmetric similarity matrix of shape (n_freqs, n_freqs) with ones on the diagonal.
+    """
+    freqs = np.asarray(frequencies, dtype=float)
+    harmonics = np.asarray(harmonic_list(harmonics), dtype=float)
+    time = reference_time(sampling_rate, n_samples)
+
+    # Reference signals of all candidates at once: (n_freqs, n_samples, 2 * n_harmonics)
+    angles = 2 * np.pi * freqs[:, None, None] * time[None, :, None] * harmonics[None, None, :]
+    references = np.concatenate([np.sin(angles), np.cos(angles)], axis=2)
+    references -= references.mean(axis=1, keepdims=True)
+    bases, _ = np.linalg.qr(references)  # Orthonormal basis of each subspace
+
+    # All pairwise basis products in one matmul, then the largest singular value of each block
+    n_freqs, _, n_dims = bases.shape
+    flat = bases.transpose(0, 2, 1).reshape(n_freqs * n_dims, -1)
+    gram = (flat @ flat.T).reshape(n_freqs, n_dims, n_freqs, n_dims).transpose(0, 2, 1, 3)
+    similarity = np.linalg.norm(gram, ord=2, axis=(2, 3))
+    np.fill_diagonal(similarity, 1.0)
+    return similarity
+
+
+def _set_cost(similarity, selected):
+    """
+    Returns (worst pairwise similarity, mean pairwise similarity) of a set - lower is better.
+    """
+    block = similarity[np.ix_(selected, selected)]
+    off_diagonal = block[~np.eye(len(selected), dtype=bool)]
+    return off_diagonal.max(), off_diagonal.mean()
+
+
+def select_frequencies(similarity, n_targets, max_iter=200):
+    """
+    Picks the subset of candidates that minimises the worst pairwise similarity (maximises the minimum separation).
+
+    A greedy farthest-point pass builds an initial set, then single swaps are applied while they lower the
+    worst similarity (ties broken by the mean similarity). Every swap evaluation is vectorised over all candidates.
+
+    Args:
+        similarity (np.ndarray): Pairwise similarity matrix from `subspace_similarity`.
+        n_targets (int): Number of frequencies to select.
+        max_iter (int): Maximum number of improving swaps.
+
+    Returns:
+        list: Indices of the selected candidates, ascending.
+    """
+    n_candidates = similarity.shape[0]
+    if n_targets > n_candidates:
+        raise ValueError(f"Cannot select {n_targets} targets from {n_candidates} candidate frequencies. Widen the band or use a finer step.")
+    if n_targets == 1:
+        return [0]
+
+    # Greedy: start from the least similar pair, then keep adding the candidate whose worst similarity to the set is lowest
+    masked = np.where(np.eye(n_candidates, dtype=bool), np.inf, similarity)
+    first, second = np.unravel_index(np.argmin(masked), masked.shape)
+    selected = [int(first), int(second)]
+    while len(selected) < n_targets:
+        worst = similarity[:, selected].max(axis=1)
+        worst[selected] = np.inf
+        selected.append(int(np.argmin(worst)))
+
+    # Swap refinement
+    cost = _set_cost(similarity, selected)
+    for _ in range(max_iter):
+        best_swap, best_cost = None, cost
+        for position in range(n_targets):
+            rest = selected[:position] + selected[position + 1:]
+            rest_pairs = similarity[np.ix_(rest, rest)][~np.eye(len(rest), dtype=bool)]
+            to_rest = similarity[:, rest]
+            # Cost of the set with `position` replaced by each candidate
+            worst = np.maximum(to_rest.max(axis=1), rest_pairs.max() if rest_pairs.size else 0.0)
+            mean = (rest_pairs.sum() + 2 * to_rest.sum(axis=1)) / (n_targets * (n_targets - 1))
+            worst[selected] = np.inf
+            candidate = int(np.lexsort((mean, worst))[0])
+            if (worst[candidate], mean[candidate]) < best_cost:
+                best_swap, best_cost = (position, candidate), (worst[candidate], mean[candidate])
+        if best_swap is None:
+            break
+        selected[best_swap[0]] = best_swap[1]
+        cost = best_cost
+
+    return sorted(selected)
+
+
+def assign_phases(frequencies, harmonics, sampling_rate, n_samples, phase_steps=8, n_sweeps=5):
+    """
+    Assigns stimulus phases that decorrelate the phase-locked responses of the selected frequencies.
+
+    CCA with sine/cosine references is phase invariant, but template-based methods (eCCA, TRCA) compare the
+    EEG with phase-locked templates. Each target is modelled as sum_h sin(2*pi*h*f*t + h*phase), and phases
+    are chosen from a regular grid by coordinate descent to minimise the worst absolute template correlation.
+
+    Args:
+        frequencies (array-like): Selected frequencies in Hz.
+        harmonics (int or iterable): Harmonics used by the classifier.
+        sampling_rate (float): Sampling rate of the EEG in Hz.
+        n_samples (int): Number of samples in the classification window.
+        phase_steps (int): Number of phases on the grid over [0, 2*pi).
+        n_sweeps (int): Number of coordinate-descent sweeps.
+
+    Returns:
+        tuple: (phases in radians as a list, worst absolute template correlation).
+    """
+    freqs = np.asarray(frequencies, dtype=float)
+    harmonics = np.asarray(harmonic_list(harmonics), dtype=float)
+    time = reference_time(sampling_rate, n_samples)
+    grid = 2 * np.pi * np.arange(phase_steps) / phase_steps
+
+    # Templates for every (frequency, grid phase): (n_freqs, phase_steps, n_samples), zero mean and unit norm
+    angles = (2 * np.pi * freqs[:, None, None, None] * harmonics[None, None, :, None] * time[None, None, None, :]
+              + harmonics[None, None, :, None] * grid[None, :, None, None])
+    templates = np.sin(angles).sum(axis=2)
+    templates -= templates.mean(axis=2, keepdims=True)
+    templates /= np.linalg.norm(templates, axis=2, keepdims=True)
+
+    n_freqs = len(freqs)
+    choice = np.arange(n_freqs) % phase_steps  # Start from a linearly increasing phase
+    for _ in range(n_sweeps):
+        changed = False
+        for i in range(n_freqs):
+            others = [j for j in range(n_freqs) if j != i]
+            if not others:
+                break
+            current = templates[others, choice[others]]               # (n_freqs - 1, n_samples)
+            worst = np.abs(templates[i] @ current.T).max(axis=1)      # (phase_steps,)
+            best = int(np.argmin(worst))
+            if worst[best] < worst[choice[i]] - 1e-12:
+                choice[i] = best
+                changed = True
+        if not changed:
+            break
+
+    chosen = templates[np.arange(n_freqs), choice]
+    correlations = np.abs(chosen @ chosen.T)
+    np.fill_diagonal(correlations, 0.0)
+    return [float(grid[c]) for c in choice], float(correlations.max()) if n_freqs > 1 else 0.0
+
+
+def plan_frequencies(refresh_rate, n_targets, harmonics=3, band=(8.0, 16.0), sampling_rate=250, window=1.0, step=None, phase_steps=8):
+    """
+    Searches for the set of target frequencies (and phases) that is easiest to classify on a given display.
+
+    Args:
+        refresh_rate (float): Refresh rate of the stimulus display in Hz (see `get_freqs` / `calibration`).
+        n_targets (int): Number of stimulus boxes.
+        harmonics (int or iterable): Harmonics used by `SSVEPClassifier`.
+        band (tuple): (low, high) frequency band in Hz.
+        sampling_rate (float): Sampling rate of the EEG in Hz.
+        window (float): Classification window in seconds; shorter windows need wider spacing.
+        step (float, optional): Candidate grid spacing in Hz. None restricts the plan to frame-exact frequencies.
+        phase_steps (int): Size of the phase grid (set to 1 to keep all phases at 0).
+
+    Returns:
+        dict: The plan - 'frequencies', 'phases', 'harmonics', 'refresh_rate', 'sampling_rate', 'window', 'band',
+              'frame_exact', 'min_subspace_separation' (1 - worst CCA similarity) and 'min_template_separation'.
+    """
+    n_samples = int(round(window * sampling_rate))
+    candidates = candidate_frequencies(refresh_rate, band, step)
+    similarity = subspace_similarity(candidates, harmonics, sampling_rate, n_samples)
+    selected = select_frequencies(similarity, n_targets)
+    frequencies = candidates[selected]
+    worst_similarity = _set_cost(similarity, selected)[0] if n_targets > 1 else 0.0
+    phases, worst_template = assign_phases(frequencies, harmonics, sampling_rate, n_samples, phase_steps)
+
+    return {
+        "frequencies": [float(f) for f in frequencies],
+        "phases": phases,
+        "harmonics": harmonic_list(harmonics),
+        "refresh_rate": float(refresh_rate),
+        "sampling_rate": float(sampling_rate),
+        "window": float(window),
+        "band": [float(band[0]), float(band[1])],
+        "frame_exact": step is None,
+        "min_subspace_separation": round(1.0 - float(worst_similarity), 4),
+        "min_template_separation": round(1.0 - worst_template, 4),
+    }
+
+
+def save_plan(plan, path):
+    """
+    Writes a frequency plan to a JSON file (loaded by SSVEPStimulusRunner.from_plan and SSVEPClassifier.from_plan).
+    """
+    with open(path, "w") as f:
+        json.dump(plan, f, indent=2)
+
+
+def load_plan(plan):
+    """
+    Loads a frequency plan.
+
+    Args:
+        plan (str or dict): Path to a JSON plan file, or an already loaded plan.
+
+    Returns:
+        dict: The plan.
+    """
+    if isinstance(plan, dict):
+        return plan
+    with open(plan, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    plan = plan_frequencies(refresh_rate=240, n_targets=4, harmonics=3, band=(8, 16), sampling_rate=250, window=1.0)
+    print(f"4 targets (frame-exact) planned in {time.perf_counter() - start:.2f} s")
+    print(f"Frequencies: {plan['frequencies']}")
+    print(f"Phases: {np.round(plan['phases'], 2).tolist()}")
+    print(f"Min subspace separation: {plan['min_subspace_separation']}")
+
+    start = time.perf_counter()
+    plan = plan_frequencies(refresh_rate=60, n_targets=40, harmonics=3, band=(8, 15.9), sampling_rate=250, window=1.0, step=0.1)
+    print(f"40 targets (0.1 Hz grid) planned in {time.perf_counter() - start:.2f} s, min separation {plan['min_subspace_separation']}")
+    # save_plan(plan, 'frequency_plan.json')
@@ -1,21 +1,29 @@
 from psychopy import visual, core, monitors
-import numpy as np
+from modules.calibration import CalibrationCache, measure_display, possible_frequencies, window_resolution
 
-def get_possible_frequencies(display_index=0, num_measurements=2, monitor_name='testMonitor'):
+def get_possible_frequencies(display_index=0, num_measurements=2, monitor_name='testMonitor', use_calibration=True, recalibrate=False):
     """
     Measures the refresh rate of the monitor multiple times, averages the results,
     and returns a list of possible frequencies it can display, rounded to 2 decimal places.
     If you have a lower refresh-rate monitor (60 Hz) you should increase the num_measurements to 3-5.
 
+    The result is stored in the display calibration cache, so later calls for the same monitor, resolution
+    and display only open the window briefly to check the stored refresh rate (until the profile is stale,
+    the display mode has changed or `recalibrate` is set).
+
     Args:
         display_index (int, optional): The index of the display screen to use.
         num_measurements (int, optional): The number of times to measure the refresh rate to reduce variability.
         monitor_name (str, optional): The name of the monitor configuration to use in PsychoPy.
+        use_calibration (bool, optional): Whether to reuse (and store) profiles from the display calibration cache.
+        recalibrate (bool, optional): Whether to re-measure even if a fresh calibration profile exists.
 
     Returns:
-        dict: A dictionary with the average refresh rate and a list of possible frequencies that can be displayed,
-              each rounded to 2 decimal places.
+        dict: A dictionary with the average refresh rate, the frame-time jitter (ms) and a list of possible
+              frequencies that can be displayed, each rounded to 2 decimal places.
     """
+    calibration = CalibrationCache() if use_calibration else None
+
     # Setup monitor and window
     monitor = monitors.Monitor(name=monitor_name)  # Change as appropriate
     
@@ -30,6 +38,18 @@ def get_possible_frequencies(display_index=0, num_measurements=2, monitor_name='
         autoLog=False
     )
 
+    # The profile is keyed on the mode the window actually opened in, not the monitor configuration
+    resolution = window_resolution(win)
+    if calibration is not None and not recalibrate:
+        profile = calibration.get(monitor_name, resolution, display_index, win=win)
+        if profile is not None:
+            win.close()
+            return {
+                "average_refresh_rate": round(profile["refresh_rate"], 2),
+                "frame_jitter_ms": profile["frame_jitter_ms"],
+                "possible_frequencies": profile["possible_frequencies"]
+            }
+
     # Display instructions to the user before measurement
     instruction_text = visual.TextStim(win, text="The script will now measure the refresh rate.\nYour screen will be black for several seconds.", color='white', pos=(0, 0), height=50)
     instruction_text.draw()
@@ -39,26 +59,19 @@ def get_possible_frequencies(display_index=0, num_measurements=2, monitor_name='
     core.wait(3)
 
     # Measure screen refresh rate multiple times and average
-    refresh_rates = []
-    for _ in range(num_measurements):
-        refresh_rate = win.getActualFrameRate(nIdentical=80, nWarmUpFrames=120, threshold=1)
-        refresh_rates.append(refresh_rate)
-        core.wait(0.1)  # Short delay between measurements to ensure variability is captured
-
-    avg_refresh_rate = round(np.mean(refresh_rates), 0)
+    measurement = measure_display(win, num_measurements=num_measurements, n_warmup_frames=120)
+    avg_refresh_rate = measurement["refresh_rate"]
     print(f"Average Measured Refresh Rate: {avg_refresh_rate:.2f} Hz")
 
-    # Calculate all possible frequencies, rounded to 2 decimal places
-    possible_frequencies = []
-    for frames_per_cycle in range(1, int(avg_refresh_rate) + 1):
-        freq = avg_refresh_rate / frames_per_cycle
-        possible_frequencies.append(round(freq, 2))
-
     win.close()
 
+    if calibration is not None:
+        calibration.save(monitor_name, resolution, display_index, avg_refresh_rate, measurement["frame_jitter_ms"])
+
     return {
         "average_refresh_rate": round(avg_refresh_rate, 2),
-        "possible_frequencies": possible_frequencies
+        "frame_jitter_ms": measurement["frame_jitter_ms"],
+        "possible_frequencies": possible_frequencies(avg_refresh_rate)  # All possible frequencies, rounded to 2 decimal places
     }
 
 # Example usage
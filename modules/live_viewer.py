@@ -0,0 +1,256 @@
+import time
+import numpy as np
+import matplotlib.pyplot as plt
+
+from modules.decimation import minmax_decimate
+from modules.pipeline import RingBuffer
+
+
+class LiveEEGViewer:
+    """
+    Real-time scrolling EEG viewer.
+
+    All channels are drawn as persistent, vertically offset line artists on one axes. Each frame only the
+    lines are redrawn over a cached background (blitting), using data min/max decimated to the pixel width
+    of the axes, so the cost of a frame does not grow with the window length or sampling rate. A fixed
+    redraw budget (fraction of the frame interval) lowers the decimation resolution when drawing is too
+    slow; acquisition is never dropped since every chunk is written to the ring buffer before drawing.
+
+    Data either comes from a BrainFlowBoardSetup, read every frame with `get_current_board_data()` (which leaves
+    the samples in BrainFlow's buffer for a pipeline reading the same board; new samples are told apart by their
+    timestamps), or is pushed with `push()`, e.g. by the loop that already reads the board for classification.
+    Samples another reader removes with `get_board_data()` before the next frame are not seen by `poll`, so for a
+    gapless display next to a pipeline, push the pipeline's chunks instead.
+    """
+
+    def __init__(self, board=None, sampling_rate=None, n_channels=None, channels=None, channel_names=None, window=10.0,
+                 fps=30, scale=None, redraw_budget=0.5, pyramid=None, scale_adaptation=0.05):
+        """
+        Initializes the LiveEEGViewer.
+
+        Args:
+            board (BrainFlowBoardSetup, optional): Board to read from. If None, data must be passed to `push()`.
+            sampling_rate (float, optional): Sampling rate in Hz (taken from the board if given).
+            n_channels (int, optional): Number of channels pushed (only needed without a board).
+            channels (list, optional): Rows of the board data to show (default: the board's EEG channels).
+            channel_names (list, optional): Names shown on the y axis.
+            window (float): Seconds of data visible.
+            fps (float): Target frame rate.
+            scale (float, optional): Vertical spacing between channels in data units (uV). If None, it follows the
+                                     signal spread (see `scale_adaptation` and `rescale`).
+            redraw_budget (float): Fraction of the frame interval a redraw may take before the resolution is lowered.
+            pyramid (MinMaxPyramid, optional): Pyramid every pushed chunk is appended to, so the recording can be
+                                               browsed (`visualization.browse_eeg`) without a rebuild.
+            scale_adaptation (float): Fraction by which the automatic scale moves towards the current signal spread
+                                      every frame (a slow running estimate, so offsets or drift appearing later
+                                      do not push the traces off screen).
+        """
+        self.board = board
+        self._timestamp_row = None
+        self._last_timestamp = None
+        if board is not None:
+            sampling_rate = board.sampling_rate
+            channels = list(channels) if channels is not None else list(board.eeg_channels)
+            n_channels = len(channels)
+            self._timestamp_row = board.channel_map.timestamp
+            if self._timestamp_row is None:
+                raise ValueError(f"[{board.name}] The board has no timestamp channel; read it yourself and use push().")
+        if sampling_rate is None or n_channels is None:
+            raise ValueError("Either a board or both sampling_rate and n_channels must be given.")
+
+        self.sampling_rate = sampling_rate
+        self.channels = channels
+        self.n_channels = n_channels
+        self.channel_names = channel_names or [f'Channel {i+1}' for i in range(n_channels)]
+        self.window = window
+        self.frame_interval = 1.0 / fps
+        self.scale = scale
+        self.auto_scale = scale is None
+        self.scale_adaptation = scale_adaptation
+        self.redraw_budget = redraw_budget
+        self.pyramid = pyramid
+
+        self.capacity = int(round(window * sampling_rate))
+        self.buffer = RingBuffer(n_channels, self.capacity)
+        self.resolution = 1.0  # Fraction of the axes pixel width used as decimation bins
+
+        self.frames = 0
+        self.late_frames = 0
+        self.draw_times = []
+        self.run_time = None
+
+        self.fig = None
+        self.ax = None
+        self.lines = []
+        self.background = None
+
+    def setup(self):
+        """
+        Creates the figure and the persistent line artists.
+        """
+        self.fig, self.ax = plt.subplots(figsize=(15, max(4, 0.5 * self.n_channels)))
+        self.ax.set_xlim(-self.window, 0)
+        self.ax.set_ylim(-self.n_channels, 1)
+        self.ax.set_yticks(-np.arange(self.n_channels))
+        self.ax.set_yticklabels(self.channel_names)
+        self.ax.set_xlabel('Time (s)')
+        self.lines = [self.ax.plot([], [], lw=0.8, animated=True)[0] for _ in range(self.n_channels)]
+
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        self.fig.tight_layout()
+        self.fig.canvas.draw()
+
+    def _on_draw(self, event):
+        # The background (axes, ticks, labels) only changes on a full redraw, e.g. after a resize
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for line in self.lines:
+            self.ax.draw_artist(line)
+
+    def push(self, data):
+        """
+        Adds new samples of shape (n_channels, n_samples) to the display buffer.
+        """
+        if data.shape[1]:
+            self.buffer.write(data)
+            if self.pyramid is not None:
+                self.pyramid.append(data)
+
+    def poll(self):
+        """
+        Copies the samples acquired since the previous poll into the display buffer, without removing them from
+        the board's buffer.
+        """
+        if self.board is None:
+            return
+        data = self.board.get_current_board_data(self.capacity)
+        if data is None or data.shape[1] == 0:
+            return
+        timestamps = data[self._timestamp_row]
+        n_new = data.shape[1]
+        if self._last_timestamp is not None:
+            n_new = int(np.count_nonzero(timestamps > self._last_timestamp))
+        if n_new:
+            self._last_timestamp = timestamps[-1]
+            self.push(data[self.channels][:, -n_new:])
+
+    def rescale(self):
+        """
+        Sets the scale from the signal spread at the next redraw (also re-enables the automatic scale).
+        """
+        self.scale = None
+        self.auto_scale = True
+
+    def n_bins(self):
+        """
+        Number of decimation bins for the current axes width and resolution.
+        """
+        width_pixels = self.ax.get_window_extent().width
+        return max(int(width_pixels * self.resolution), 16)
+
+    def redraw(self):
+        """
+        Redraws the lines from the buffer and adapts the resolution to the redraw budget.
+        """
+        n_available = min(self.buffer.total_written, self.capacity)
+        if n_available < 2 or self.fig is None:
+            return
+
+        start = time.perf_counter()
+        positions, decimated = minmax_decimate(self.buffer.latest(n_available), self.n_bins())
+        times = (positions - n_available + 1) / self.sampling_rate
+
+        # Remove each channel's offset, then stack the channels one unit apart
+        decimated = decimated - np.median(decimated, axis=1, keepdims=True)
+        if self.auto_scale:
+            spread = np.median(np.ptp(decimated, axis=1))
+            if self.scale is None:
+                self.scale = spread if spread > 0 else 1.0
+            elif spread > 0:
+                self.scale += self.scale_adaptation * (spread - self.scale)
+        for i, line in enumerate(self.lines):
+            line.set_data(times, decimated[i] / self.scale - i)
+
+        canvas = self.fig.canvas
+        if self.background is None or not getattr(canvas, 'supports_blit', True):
+            canvas.draw_idle()
+        else:
+            canvas.restore_region(self.background)
+            for line in self.lines:
+                self.ax.draw_artist(line)
+            canvas.blit(self.fig.bbox)
+
+        draw_time = time.perf_counter() - start
+        self.draw_times.append(draw_time)
+        budget = self.redraw_budget * self.frame_interval
+        if draw_time > budget:
+            self.resolution = max(self.resolution * 0.8, 0.25)
+        elif draw_time < 0.5 * budget:
+            self.resolution = min(self.resolution * 1.1, 1.0)
+
+    def run(self, duration=None):
+        """
+        Runs the viewer at the target frame rate until the window is closed or `duration` seconds have passed.
+
+        Returns:
+            dict: Frame statistics (see `stats()`).
+        """
+        if self.fig is None:
+            self.setup()
+        plt.show(block=False)
+
+        started = time.perf_counter()
+        next_frame = started
+        while plt.fignum_exists(self.fig.number):
+            now = time.perf_counter()
+            if duration is not None and now - started >= duration:
+                break
+            self.poll()
+            self.redraw()
+            self.fig.canvas.flush_events()
+            self.frames += 1
+
+            next_frame += self.frame_interval
+            remaining = next_frame - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+            else:
+                # Behind schedule: skip the missed frames rather than trying to catch up
+                self.late_frames += 1
+                next_frame = time.perf_counter()
+
+        self.run_time = time.perf_counter() - started
+        return self.stats()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Frames drawn, achieved frame rate, late frames, mean/max redraw time (ms) and current resolution.
+        """
+        run_time = self.run_time
+        draw_ms = np.asarray(self.draw_times) * 1000
+        return {
+            "frames": self.frames,
+            "fps": round(self.frames / run_time, 2) if run_time else None,
+            "late_frames": self.late_frames,
+            "redraw_mean_ms": round(float(draw_ms.mean()), 3) if draw_ms.size else None,
+            "redraw_max_ms": round(float(draw_ms.max()), 3) if draw_ms.size else None,
+            "resolution": round(self.resolution, 3),
+        }
+
+    def close(self):
+        if self.fig is not None:
+            plt.close(self.fig)
+            self.fig = None
+
+
+if __name__ == "__main__":
+    from modules.brainflow_stream import BrainFlowBoardSetup, BoardIds
+
+    # 16-channel synthetic board at 250 Hz
+    board = BrainFlowBoardSetup(BoardIds.SYNTHETIC_BOARD.value, name="Synthetic")
+    board.setup()
+    try:
+        viewer = LiveEEGViewer(board, channels=board.eeg_channels[:16], window=10.0, fps=30)
+        print(viewer.run())
+    finally:
+        board.stop()
@@ -0,0 +1,236 @@
+from collections import deque
+
+import numpy as np
+
+
+def find_gaps(package_numbers, previous=None, modulus=256, step=1):
+    """
+    Finds dropped samples from the package-number row of board data (vectorised, one `np.diff` per chunk).
+
+    Package numbers count up by `step` per sample and wrap at `modulus` (0-255 on the Cyton), so a jump of
+    more than one step means samples were lost in between.
+
+    Args:
+        package_numbers (np.ndarray): Package-number row of a chunk, shape (n_samples,).
+        previous (float, optional): Package number of the last sample of the previous chunk, so a gap at the chunk
+                                    boundary is found too.
+        modulus (int): Value at which the package number wraps.
+        step (int): Package-number increment per sample.
+
+    Returns:
+        tuple: Column indices (np.ndarray) in front of which samples are missing, and the number missing (np.ndarray).
+    """
+    package_numbers = np.asarray(package_numbers)
+    if previous is not None:
+        diffs = np.diff(package_numbers, prepend=previous)
+        offset = 0
+    else:
+        diffs = np.diff(package_numbers)
+        offset = 1
+    missing = (np.rint(diffs).astype(np.int64) % modulus) // step - 1
+    indices = np.flatnonzero(missing > 0)
+    return indices + offset, missing[indices]
+
+
+class PacketLossMonitor:
+    """
+    Detects dropped packets in streamed board data and repairs short gaps.
+
+    Every chunk is checked against the package-number row (or, for boards without one, the timestamps), carried
+    over from the previous chunk so gaps at chunk boundaries are found. Gaps of up to `max_fill` samples are
+    filled by linear interpolation between the neighbouring samples, so the stream keeps its sample clock;
+    longer gaps are left as they are and their position in the repaired stream is recorded, so windows spanning
+    them can be flagged (`spans_gap`). Chunks without loss are returned unchanged, without a copy.
+    """
+
+    def __init__(self, package_channel=None, timestamp_channel=None, sampling_rate=None, marker_channel=None,
+                 package_modulus=256, package_step=1, max_fill=10, history=64):
+        """
+        Initializes the PacketLossMonitor.
+
+        Args:
+            package_channel (int, optional): Row holding the package numbers.
+            timestamp_channel (int, optional): Row holding the timestamps. Used to detect gaps when there is no
+                                               package channel, and to recover whole wrap-arounds of the package
+                                               number (losses of `package_modulus` samples or more).
+            sampling_rate (float, optional): Sampling rate, required for timestamp-based detection.
+            marker_channel (int, optional): Row holding markers; interpolated samples get marker 0 so markers are
+                                            not duplicated.
+            package_modulus (int): Value at which the package number wraps (256 for the Cyton).
+            package_step (int): Package-number increment per sample.
+            max_fill (int): Longest gap, in samples, that is filled by interpolation.
+            history (int): Number of recent long-gap positions kept for `spans_gap`.
+        """
+        if package_channel is None and (timestamp_channel is None or not sampling_rate):
+            raise ValueError("A package channel, or a timestamp channel and sampling rate, is required.")
+        self.package_channel = package_channel
+        self.timestamp_channel = timestamp_channel
+        self.sampling_rate = sampling_rate
+        self.marker_channel = marker_channel
+        self.package_modulus = package_modulus
+        self.package_step = package_step
+        self.max_fill = int(max_fill)
+        self.long_gap_positions = deque(maxlen=history)
+        self.reset()
+
+    @classmethod
+    def from_channel_map(cls, channel_map, **kwargs):
+        """
+        Builds a monitor for a board from its ChannelMap (package, timestamp and marker rows, sampling rate).
+        """
+        kwargs.setdefault("sampling_rate", channel_map.sampling_rate)
+        return cls(package_channel=channel_map.package_num, timestamp_channel=channel_map.timestamp,
+                   marker_channel=channel_map.marker, **kwargs)
+
+    def reset(self):
+        """
+        Clears the counters and the state carried between chunks.
+        """
+        self.received = 0
+        self.lost = 0
+        self.gaps = 0
+        self.filled = 0
+        self.long_gaps = 0
+        self.position = 0  # Samples output so far (the repaired stream's sample clock)
+        self.long_gap_positions.clear()
+        self._last_column = None
+
+    def _missing(self, data):
+        previous = self._last_column
+        if self.package_channel is not None:
+            indices, missing = find_gaps(data[self.package_channel],
+                                         None if previous is None else previous[self.package_channel],
+                                         self.package_modulus, self.package_step)
+            if self.timestamp_channel is not None and self.sampling_rate and len(indices):
+                # Package numbers cannot tell apart losses that differ by whole wrap-arounds; timestamps can
+                timestamps = data[self.timestamp_channel]
+                before = np.where(indices > 0, timestamps[np.maximum(indices - 1, 0)],
+                                  np.nan if previous is None else previous[self.timestamp_channel])
+                expected = (timestamps[indices] - before) * self.sampling_rate - 1
+                cycle = self.package_modulus // self.package_step
+                wraps = np.maximum(np.nan_to_num(np.rint((expected - missing) / cycle)), 0).astype(np.int64)
+                missing = missing + wraps * cycle
+            return indices, missing
+
+        timestamps = data[self.timestamp_channel]
+        if previous is not None:
+            intervals = np.diff(timestamps, prepend=previous[self.timestamp_channel]) * self.sampling_rate
+            offset = 0
+        else:
+            intervals = np.diff(timestamps) * self.sampling_rate
+            offset = 1
+        indices = np.flatnonzero(intervals > 1.5)
+        return indices + offset, np.rint(intervals[indices]).astype(np.int64) - 1
+
+    def update(self, data):
+        """
+        Checks a chunk of board data (n_rows, n_samples) and fills its short gaps.
+
+        Args:
+            data (np.ndarray): Board data in acquisition order.
+
+        Returns:
+            np.ndarray: The chunk with short gaps filled - `data` itself if nothing had to be inserted.
+        """
+        n_samples = data.shape[1]
+        if n_samples == 0:
+            return data
+        indices, missing = self._missing(data)
+        self.received += n_samples
+
+        if len(indices):
+            self.lost += int(missing.sum())
+            self.gaps += len(indices)
+            fill = missing <= self.max_fill
+            if self._last_column is None:
+                fill &= indices > 0
+            inserted = np.zeros(n_samples, dtype=np.int64)
+            inserted[indices[fill]] = missing[fill]
+            positions = np.arange(n_samples) + np.cumsum(inserted)  # Column positions in the repaired chunk
+
+            long_indices = indices[~fill]
+            self.long_gaps += len(long_indices)
+            self.long_gap_positions.extend((self.position + positions[long_indices]).tolist())
+
+            if fill.any():
+                data = self._fill(data, indices[fill], missing[fill], positions)
+
+        self.position += data.shape[1]
+        self._last_column = data[:, -1].copy()
+        return data
+
+    def _fill(self, data, indices, counts, positions):
+        total = int(counts.sum())
+        repaired = np.empty((data.shape[0], data.shape[1] + total), dtype=data.dtype)
+        repaired[:, positions] = data
+
+        gap = np.repeat(np.arange(len(indices)), counts)
+        step = np.arange(1, total + 1) - np.repeat(np.cumsum(counts) - counts, counts)  # 1..k within each gap
+        before = data[:, np.maximum(indices - 1, 0)]
+        if indices[0] == 0:
+            before[:, 0] = self._last_column
+        after = data[:, indices]
+        fraction = step / (counts[gap] + 1)
+        values = before[:, gap] + (after[:, gap] - before[:, gap]) * fraction
+
+        if self.package_channel is not None:
+            values[self.package_channel] = (before[self.package_channel, gap] + step * self.package_step) % self.package_modulus
+        if self.marker_channel is not None:
+            values[self.marker_channel] = 0
+        repaired[:, positions[indices][gap] - counts[gap] + step - 1] = values
+        self.filled += total
+        return repaired
+
+    def spans_gap(self, start, end):
+        """
+        Returns whether a long (unfilled) gap lies within samples [start, end) of the repaired stream.
+        """
+        return any(start < position < end for position in self.long_gap_positions)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Packet-loss counters - samples received and lost, loss fraction, gaps, samples filled and long gaps.
+        """
+        expected = self.received + self.lost
+        return {
+            "received": self.received,
+            "lost": self.lost,
+            "loss_fraction": round(self.lost / expected, 6) if expected else 0.0,
+            "gaps": self.gaps,
+            "filled": self.filled,
+            "long_gaps": self.long_gaps,
+        }
+
+
+if __name__ == "__main__":
+    import time
+    from brainflow.board_shim import BoardIds
+    from modules.channel_map import ChannelMap
+
+    channel_map = ChannelMap.from_board(BoardIds.CYTON_BOARD.value)
+    n_samples = channel_map.sampling_rate * 60
+    stream = np.zeros((channel_map.num_rows, n_samples))
+    stream[channel_map.eeg] = np.random.default_rng(0).standard_normal((8, n_samples)).cumsum(axis=1)
+    stream[channel_map.package_num] = np.arange(n_samples) % 256
+    stream[channel_map.timestamp] = np.arange(n_samples) / channel_map.sampling_rate
+
+    # Drop 1% of the samples in short bursts plus one 2 s outage
+    rng = np.random.default_rng(1)
+    keep = np.ones(n_samples, dtype=bool)
+    for start in rng.choice(n_samples - 10, size=n_samples // 300, replace=False):
+        keep[start:start + rng.integers(1, 5)] = False
+    keep[5000:5500] = False
+    received = stream[:, keep]
+
+    monitor = PacketLossMonitor.from_channel_map(channel_map, max_fill=10)
+    chunk = 25
+    start = time.perf_counter()
+    repaired = [monitor.update(received[:, i:i + chunk]) for i in range(0, received.shape[1], chunk)]
+    elapsed = time.perf_counter() - start
+    repaired = np.concatenate(repaired, axis=1)
+
+    print(f"{received.shape[1]} of {n_samples} samples received: {monitor.summary()}")
+    print(f"Repaired stream: {repaired.shape[1]} samples ({n_samples - 500} expected), long gaps at "
+          f"{list(monitor.long_gap_positions)}")
+    print(f"{elapsed / (received.shape[1] / chunk) * 1e6:.1f} us per {chunk}-sample chunk")
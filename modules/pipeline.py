@@ -0,0 +1,370 @@
+import copy
+import time
+from collections import deque
+import numpy as np
+
+from modules.channel_map import row_selector
+
+
+class RingBuffer:
+    """
+    Fixed-size circular buffer of multichannel samples (n_channels, capacity).
+
+    Writes copy each incoming chunk once into preallocated storage; `latest` returns the newest samples in order.
+    """
+
+    def __init__(self, n_channels, capacity, dtype=np.float64):
+        """
+        Initializes the RingBuffer.
+
+        Args:
+            n_channels (int): Number of channels (rows).
+            capacity (int): Number of samples kept.
+            dtype (np.dtype): Data type of the storage.
+        """
+        self.capacity = capacity
+        self.data = np.zeros((n_channels, capacity), dtype=dtype)
+        self.write_index = 0
+        self.total_written = 0
+
+    def write(self, chunk):
+        """
+        Appends a chunk of shape (n_channels, n_samples).
+        """
+        n_samples = chunk.shape[1]
+        if n_samples >= self.capacity:
+            self.data[:] = chunk[:, -self.capacity:]
+            self.write_index = 0
+        else:
+            end = self.write_index + n_samples
+            if end <= self.capacity:
+                self.data[:, self.write_index:end] = chunk
+            else:
+                split = self.capacity - self.write_index
+                self.data[:, self.write_index:] = chunk[:, :split]
+                self.data[:, :end - self.capacity] = chunk[:, split:]
+            self.write_index = end % self.capacity
+        self.total_written += n_samples
+
+    def latest(self, n_samples):
+        """
+        Returns the newest `n_samples` samples in chronological order, shape (n_channels, n_samples).
+        """
+        if n_samples > min(self.total_written, self.capacity):
+            raise ValueError(f"Only {min(self.total_written, self.capacity)} samples available, {n_samples} requested.")
+        start = (self.write_index - n_samples) % self.capacity
+        if start + n_samples <= self.capacity:
+            return self.data[:, start:start + n_samples]
+        return np.concatenate((self.data[:, start:], self.data[:, :self.write_index]), axis=1)
+
+    def oldest(self, n_samples):
+        """
+        Returns the oldest `n_samples` samples still held (the next ones to be overwritten), shape (n_channels, n_samples).
+        """
+        available = min(self.total_written, self.capacity)
+        if n_samples > available:
+            raise ValueError(f"Only {available} samples available, {n_samples} requested.")
+        start = (self.write_index - available) % self.capacity
+        if start + n_samples <= self.capacity:
+            return self.data[:, start:start + n_samples]
+        return np.concatenate((self.data[:, start:], self.data[:, :start + n_samples - self.capacity]), axis=1)
+
+
+class OnlinePipeline:
+    """
+    Online SSVEP pipeline: board chunks -> ring buffer -> filtering -> classifier.
+
+    Every `poll` drains whatever the board has acquired since the last call; a decision is made each time
+    `step_samples` new samples have arrived and a full window is available. Pacing therefore follows the
+    acquisition itself rather than `time.sleep(segment_duration)`, and the pipeline keeps its own
+    throughput and latency statistics.
+    """
+
+    def __init__(self, board, classifier, eeg_channels, window_samples, step_samples, filter_obj=None, filter_kwargs=None, timestamp_channel=None, name=None, quality_monitor=None,
+                 dtype=np.float64, packet_monitor=None, clock=None,
+                 artifact_stage=None, accel_channels=None, max_artifact_fraction=0.1, spatial_filter=None):
+        """
+        Initializes the OnlinePipeline.
+
+        Args:
+            board: Object with a `get_board_data()` method returning (n_rows, n_new_samples), e.g. BrainFlowBoardSetup.
+            classifier: Callable taking an (n_channels, window_samples) array and returning (frequency, score). If it has a
+                        `classify` method (SSVEPClassifier), its confidence and abstain state are added to each decision
+                        and the latest signal-quality report is passed along.
+            eeg_channels (list): Rows of the board data to classify (consecutive rows are read as a view, without a copy).
+            window_samples (int): Samples per classification window.
+            step_samples (int): New samples between decisions.
+            filter_obj (Filtering, optional): Filter applied to each window before classification.
+            filter_kwargs (dict, optional): Arguments for `filter_obj.filter_data` (filter_type, lowcut, highcut, ...).
+            timestamp_channel (int, optional): Row holding the board timestamps, used to report how old the newest sample is.
+            name (str, optional): Name reported with each decision.
+            quality_monitor (StreamingSignalQuality, optional): Signal-quality monitor updated with every chunk.
+            dtype (np.dtype): Precision the EEG rows are buffered and filtered in (e.g. float32, with the filter and
+                              classifier built with the same dtype). Timestamps are read before the conversion.
+            packet_monitor (PacketLossMonitor, optional): Checks every chunk for dropped packets and fills short gaps
+                                                          before buffering; decisions whose window spans a longer gap
+                                                          get `"gap": true`.
+            clock (ClockAligner, optional): Fitted with (sample index, arrival time) of every chunk; decisions then get
+                                            `sample_age_ms` from it (host monotonic clock, drift-corrected), and
+                                            `sample_at` maps host times such as stimulus cue times to samples.
+            artifact_stage (StreamingArtifactRejection, optional): Flags (and, if configured, repairs) artifacts in
+                                                                   every chunk before buffering. Windows with more than
+                                                                   `max_artifact_fraction` flagged samples are not
+                                                                   classified (`"abstain": true, "reason": "artifact"`).
+            accel_channels (list, optional): Accelerometer rows passed to the artifact stage for motion gating.
+            max_artifact_fraction (float): Largest flagged fraction of a window that is still classified.
+            spatial_filter (SpatialFilter, optional): Spatial filter (CAR, Laplacian, whitening) applied to every
+                                                      chunk with one matmul before buffering; the buffer and the
+                                                      classifier then see its `n_out` output channels. Electrodes
+                                                      the quality monitor reports as bad are left out of the filter.
+        """
+        self.board = board
+        self.classifier = classifier
+        self.eeg_channels = list(eeg_channels)
+        self._eeg_rows = row_selector(self.eeg_channels)
+        self.window_samples = int(window_samples)
+        self.step_samples = int(step_samples)
+        self.filter_obj = filter_obj
+        self.filter_kwargs = filter_kwargs or {}
+        self.timestamp_channel = timestamp_channel
+        self.name = name
+        self.quality_monitor = quality_monitor
+        self.packet_monitor = packet_monitor
+        self.clock = clock
+        self.artifact_stage = artifact_stage
+        self._accel_rows = None if accel_channels is None else row_selector(accel_channels)
+        self.max_artifact_fraction = max_artifact_fraction
+        self.spatial_filter = spatial_filter
+        n_channels = len(self.eeg_channels) if spatial_filter is None else spatial_filter.n_out
+
+        self.dtype = np.dtype(dtype)
+        self.buffer = RingBuffer(n_channels, self.window_samples, dtype=self.dtype)
+        self._filtered = np.empty((n_channels, self.window_samples), dtype=self.dtype)  # Reused filter output
+        self.samples_since_decision = 0
+        self.last_timestamp = None
+        self.stats = PipelineStats()
+
+    def poll(self):
+        """
+        Pulls new data from the board and classifies every completed step.
+
+        Returns:
+            list: Decisions (dicts) made during this call, possibly empty.
+        """
+        data = self.board.get_board_data()
+        if data is None or data.shape[1] == 0:
+            return []
+        return self.process_chunk(data)
+
+    def process_chunk(self, data):
+        """
+        Classifies a chunk of board data that has already been acquired.
+
+        Args:
+            data (np.ndarray): Board data of shape (n_rows, n_samples).
+
+        Returns:
+            list: Decisions (dicts) made for this chunk, possibly empty.
+        """
+        arrival = time.perf_counter()
+        self.stats.samples += data.shape[1]
+        if self.packet_monitor is not None:
+            data = self.packet_monitor.update(data)
+        if self.timestamp_channel is not None:
+            self.last_timestamp = data[self.timestamp_channel, -1]
+
+        decisions = []
+        eeg = data[self._eeg_rows]
+        if self.quality_monitor is not None:
+            self.quality_monitor.update(eeg)  # Per electrode, before any repair or spatial filtering
+            if self.spatial_filter is not None and self.quality_monitor.latest is not None:
+                # Every filtered channel mixes several electrodes, so bad ones are left out of the filter itself
+                self.spatial_filter.exclude(self.quality_monitor.latest["bad_channels"])
+        if self.clock is not None:
+            self.clock.update(self.buffer.total_written + eeg.shape[1] - 1, arrival)
+        if self.artifact_stage is not None:
+            accel = data[self._accel_rows] if self._accel_rows is not None else None
+            eeg, _ = self.artifact_stage.update(eeg, accel)
+        if self.spatial_filter is not None:
+            self.spatial_filter.update(eeg)
+            eeg = self.spatial_filter.apply(eeg)
+        position = 0
+        while position < eeg.shape[1]:
+            take = min(self.step_samples - self.samples_since_decision, eeg.shape[1] - position)
+            self.buffer.write(eeg[:, position:position + take])
+            position += take
+            self.samples_since_decision += take
+
+            if self.samples_since_decision >= self.step_samples and self.buffer.total_written >= self.window_samples:
+                self.samples_since_decision = 0
+                decisions.append(self._decide(arrival))
+            elif self.samples_since_decision >= self.step_samples:
+                self.samples_since_decision = 0  # Window not full yet
+        return decisions
+
+    def sample_at(self, host_time):
+        """
+        Maps a host time (`time.perf_counter()` of any local process, e.g. `SharedStimulusState.cue_time`) to the
+        fractional index of the sample acquired at that time, counted like `decision["sample"]`. Requires a `clock`.
+        """
+        if self.clock is None:
+            raise RuntimeError("OnlinePipeline was created without a clock (ClockAligner).")
+        return float(self.clock.time_to_sample(host_time))
+
+    def calibrate_rest(self, rest_data, false_positive_rate=0.05):
+        """
+        Learns the classifier's abstain threshold (`SSVEPClassifier.calibrate_rest`) from a rest recording passed
+        through the same preprocessing as live windows: artifact stage, spatial filter and filter, windowed every
+        step. The stages run on copies, so the live state is untouched; windows the artifact stage would reject
+        are left out, as they are never scored live either.
+
+        Args:
+            rest_data (np.ndarray): Rest recording of the pipeline's EEG channels (n_channels, n_samples).
+            false_positive_rate (float): Fraction of rest windows allowed above the threshold.
+
+        Returns:
+            float: The abstain threshold.
+        """
+        rest_data = np.asarray(rest_data, dtype=np.float64)
+        artifact_stage = copy.deepcopy(self.artifact_stage)
+        spatial_filter = copy.deepcopy(self.spatial_filter)
+        pieces = []
+        for position in range(0, rest_data.shape[1], self.step_samples):
+            chunk = rest_data[:, position:position + self.step_samples]
+            if artifact_stage is not None:
+                chunk, _ = artifact_stage.update(chunk)
+            if spatial_filter is not None:
+                spatial_filter.update(chunk)
+                chunk = spatial_filter.apply(chunk)
+            pieces.append(chunk)
+        processed = np.concatenate(pieces, axis=1).astype(self.dtype)
+
+        windows = []
+        for end in range(self.window_samples, processed.shape[1] + 1, self.step_samples):
+            start = end - self.window_samples
+            if artifact_stage is not None and artifact_stage.flagged_fraction(start, end) > self.max_artifact_fraction:
+                continue
+            window = processed[:, start:end]
+            if self.filter_obj is not None:
+                window = self.filter_obj.filter_data(window, **self.filter_kwargs)
+            windows.append(window)
+        if len(windows) < 2:
+            raise ValueError("The rest recording yields fewer than 2 usable windows.")
+        return self.classifier.calibrate_rest(np.stack(windows), false_positive_rate)
+
+    def _decide(self, arrival):
+        artifact_fraction = None
+        if self.artifact_stage is not None:
+            end = self.buffer.total_written
+            artifact_fraction = self.artifact_stage.flagged_fraction(end - self.window_samples, end)
+            if artifact_fraction > self.max_artifact_fraction:
+                return self._artifact_decision(arrival, artifact_fraction)
+
+        window = self.buffer.latest(self.window_samples)
+        if self.filter_obj is not None:
+            # Written into a reused array: the window may be a view of the ring buffer, which must stay unfiltered
+            window = self.filter_obj.filter_data(window, out=self._filtered, **self.filter_kwargs)
+        result = None
+        if hasattr(self.classifier, "classify"):
+            quality = self.quality_monitor.latest if self.quality_monitor is not None else None
+            n_electrodes = len(self.eeg_channels) if self.spatial_filter is not None else None
+            result = self.classifier.classify(window, quality=quality, n_electrodes=n_electrodes)
+            frequency, score = result["frequency"], result["score"]
+        else:
+            frequency, score = self.classifier(window)
+
+        latency = time.perf_counter() - arrival
+        self.stats.record(latency)
+        decision = {
+            "frequency": frequency,
+            "score": None if score is None else float(score),
+            "sample": self.buffer.total_written,
+            "time": time.time(),
+            "latency_ms": round(latency * 1000, 3),
+        }
+        if result is not None:
+            decision.update({
+                "confidence": result["confidence"],
+                "abstain": result["abstain"],
+                "reason": result["reason"],
+                "scores": None if result["scores"] is None else [float(s) for s in result["scores"]],
+            })
+        if artifact_fraction is not None:
+            decision["artifact_fraction"] = round(artifact_fraction, 4)
+        return self._annotate(decision)
+
+    def _artifact_decision(self, arrival, artifact_fraction):
+        # Contaminated window: skipped without filtering or scoring
+        latency = time.perf_counter() - arrival
+        self.stats.record(latency)
+        decision = {
+            "frequency": None,
+            "score": None,
+            "sample": self.buffer.total_written,
+            "time": time.time(),
+            "latency_ms": round(latency * 1000, 3),
+            "confidence": None,
+            "abstain": True,
+            "reason": "artifact",
+            "scores": None,
+            "artifact_fraction": round(artifact_fraction, 4),
+        }
+        return self._annotate(decision)
+
+    def _annotate(self, decision):
+        # Fields added to every decision, classified or not
+        if self.packet_monitor is not None:
+            decision["gap"] = self.packet_monitor.spans_gap(decision["sample"] - self.window_samples, decision["sample"])
+        if self.clock is not None:
+            age = time.perf_counter() - self.clock.sample_to_time(decision["sample"] - 1)
+            decision["sample_age_ms"] = round(float(age) * 1000, 3)
+        elif self.last_timestamp is not None:
+            decision["sample_age_ms"] = round((decision["time"] - self.last_timestamp) * 1000, 3)
+        if self.name is not None:
+            decision["name"] = self.name
+        return decision
+
+
+class PipelineStats:
+    """
+    Throughput and latency counters of an OnlinePipeline.
+
+    Only the latest `history` latencies are kept, so a long-running pipeline uses constant memory; the latency
+    mean and percentiles describe those decisions, the maximum covers the whole run.
+    """
+
+    def __init__(self, history=10000):
+        self.started = time.perf_counter()
+        self.samples = 0
+        self.decisions = 0
+        self.latencies = deque(maxlen=history)
+        self.max_latency = 0.0
+
+    def record(self, latency):
+        self.decisions += 1
+        self.latencies.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+
+    def summary(self):
+        """
+        Returns:
+            dict: Run time, decisions and samples per second, and decision latency statistics in milliseconds
+                  (mean and percentiles over the latest `history` decisions).
+        """
+        elapsed = time.perf_counter() - self.started
+        latencies_ms = np.asarray(self.latencies) * 1000
+        summary = {
+            "run_time_s": round(elapsed, 3),
+            "samples": self.samples,
+            "decisions": self.decisions,
+            "samples_per_s": round(self.samples / elapsed, 2) if elapsed > 0 else 0.0,
+            "decisions_per_s": round(self.decisions / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+        if latencies_ms.size:
+            summary.update({
+                "latency_mean_ms": round(float(latencies_ms.mean()), 3),
+                "latency_p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+                "latency_p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+                "latency_max_ms": round(self.max_latency * 1000, 3),
+            })
+        return summary
@@ -0,0 +1,166 @@
+import hashlib
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+from scipy.signal import welch
+
+# Upper bound on the Welch working set (segments x FFT) per block; longer recordings are processed in time chunks
+MAX_BLOCK_BYTES = 64 * 1024 ** 2
+
+_CACHE_SIZE = 32
+_psd_cache = OrderedDict()
+
+
+def _fingerprint(eeg_data):
+    # Digest of the contents, read in time chunks (also for memmaps), so arrays modified in place miss the cache
+    digest = hashlib.blake2b(digest_size=16)
+    row_bytes = max(int(np.prod(eeg_data.shape[:-1])) * eeg_data.dtype.itemsize, 1)
+    step = max(MAX_BLOCK_BYTES // row_bytes, 1)
+    for start in range(0, eeg_data.shape[-1], step):
+        digest.update(np.ascontiguousarray(eeg_data[..., start:start + step]).data)
+    return digest.hexdigest()
+
+
+def _cache_key(eeg_data, sampling_rate, nperseg):
+    interface = eeg_data.__array_interface__
+    return (id(eeg_data), interface["data"][0], eeg_data.shape, interface["strides"], eeg_data.dtype.str,
+            float(sampling_rate), int(nperseg), _fingerprint(eeg_data))
+
+
+def _forget(array_id):
+    for key in [key for key in _psd_cache if key[0] == array_id]:
+        del _psd_cache[key]
+
+
+def clear_psd_cache():
+    """
+    Drops all cached spectra (arrays modified in place are recomputed anyway, as the key includes a content digest).
+    """
+    _psd_cache.clear()
+
+
+def _segments_per_block(n_channels, nperseg, max_block_bytes):
+    # Each segment is held as float64 samples plus its complex spectrum
+    bytes_per_segment = n_channels * nperseg * (8 + 16)
+    return max(1, int(max_block_bytes // bytes_per_segment))
+
+
+def _welch_chunked(eeg_data, sampling_rate, nperseg, max_block_bytes):
+    """
+    Welch PSD over the last axis, computed in time chunks aligned to the Welch segments.
+
+    Each chunk holds a whole number of (50 % overlapping) segments, so the segment-count weighted mean of the
+    chunk spectra equals a single `welch` call over the full recording while only one chunk is in memory.
+    """
+    n_samples = eeg_data.shape[-1]
+    step = nperseg - nperseg // 2
+    n_segments = (n_samples - nperseg) // step + 1
+    per_block = _segments_per_block(int(np.prod(eeg_data.shape[:-1])), nperseg, max_block_bytes)
+
+    if n_segments <= per_block:
+        return welch(eeg_data, fs=sampling_rate, nperseg=nperseg, axis=-1)
+
+    psd_sum = None
+    for first in range(0, n_segments, per_block):
+        count = min(per_block, n_segments - first)
+        start = first * step
+        stop = start + (count - 1) * step + nperseg
+        freqs, psd = welch(np.asarray(eeg_data[..., start:stop]), fs=sampling_rate, nperseg=nperseg, axis=-1)
+        psd_sum = psd * count if psd_sum is None else psd_sum + psd * count
+    return freqs, psd_sum / n_segments
+
+
+def compute_psd(eeg_data, sampling_rate, nperseg=1024, max_block_bytes=MAX_BLOCK_BYTES):
+    """
+    Computes the Welch PSD of every channel in one vectorised call.
+
+    Results are cached per input array and contents (and sampling rate / segment length), so plotting the same
+    recording several times only computes its spectra once; hashing the data is far cheaper than the transform. Recordings too large for one block (e.g. 64 channels x 1 h,
+    or an np.memmap) are processed in segment-aligned time chunks.
+
+    Args:
+        eeg_data (np.ndarray): EEG data of shape (n_channels, n_samples).
+        sampling_rate (float): Sampling rate of the data in Hz.
+        nperseg (int): Welch segment length; shortened to the recording length if needed.
+        max_block_bytes (int): Memory budget of one chunk.
+
+    Returns:
+        tuple: (freqs of shape (n_freqs,), psd of shape (n_channels, n_freqs)).
+    """
+    return compute_psds([eeg_data], sampling_rate, nperseg, max_block_bytes)[0]
+
+
+def compute_psds(datasets, sampling_rate, nperseg=1024, max_block_bytes=MAX_BLOCK_BYTES):
+    """
+    Computes the Welch PSD of several datasets (e.g. before/after filtering), sharing one call where possible.
+
+    Datasets that are not cached yet and have the same length are stacked and transformed together when they
+    fit in one block; larger ones go through the chunked path one at a time.
+
+    Args:
+        datasets (list): EEG arrays of shape (n_channels, n_samples).
+        sampling_rate (float): Sampling rate of the data in Hz.
+        nperseg (int): Welch segment length.
+        max_block_bytes (int): Memory budget of one chunk.
+
+    Returns:
+        list: One (freqs, psd) tuple per dataset.
+    """
+    datasets = [np.asanyarray(eeg_data) for eeg_data in datasets]
+    results = [None] * len(datasets)
+    missing = []
+    for i, eeg_data in enumerate(datasets):
+        key = _cache_key(eeg_data, sampling_rate, min(nperseg, eeg_data.shape[-1]))
+        if key in _psd_cache:
+            _psd_cache.move_to_end(key)
+            results[i] = _psd_cache[key]
+        else:
+            missing.append((i, key))
+
+    if not missing:
+        return results
+
+    # Small datasets of the same length go through welch together
+    lengths = {datasets[i].shape[-1] for i, _ in missing}
+    n_rows = sum(int(np.prod(datasets[i].shape[:-1])) for i, _ in missing)
+    segment = min(nperseg, min(lengths))
+    stack = len(missing) > 1 and len(lengths) == 1 and n_rows * datasets[missing[0][0]].shape[-1] * 8 * 3 <= max_block_bytes
+    if stack:
+        freqs, psd = welch(np.concatenate([datasets[i] for i, _ in missing], axis=0), fs=sampling_rate, nperseg=segment, axis=-1)
+        offset = 0
+        for i, _ in missing:
+            rows = datasets[i].shape[0]
+            results[i] = (freqs, psd[offset:offset + rows])
+            offset += rows
+    else:
+        for i, _ in missing:
+            results[i] = _welch_chunked(datasets[i], sampling_rate, min(nperseg, datasets[i].shape[-1]), max_block_bytes)
+
+    for i, key in missing:
+        for array in results[i]:
+            array.setflags(write=False)  # Shared between callers through the cache
+        _psd_cache[key] = results[i]
+        weakref.finalize(datasets[i], _forget, key[0])
+        while len(_psd_cache) > _CACHE_SIZE:
+            _psd_cache.popitem(last=False)
+    return results
+
+
+if __name__ == "__main__":
+    import time
+
+    sampling_rate = 250
+    eeg_data = np.random.randn(64, 3600 * sampling_rate).astype(np.float32)  # 64 channels, 1 hour
+
+    start = time.perf_counter()
+    freqs, psd = compute_psd(eeg_data, sampling_rate)
+    print(f"64 channels x 1 h: {time.perf_counter() - start:.2f} s (chunked)")
+
+    start = time.perf_counter()
+    compute_psd(eeg_data, sampling_rate)
+    print(f"Cached: {(time.perf_counter() - start) * 1000:.3f} ms")
+
+    start = time.perf_counter()
+    loop = np.array([welch(eeg_data[i], fs=sampling_rate, nperseg=1024)[1] for i in range(eeg_data.shape[0])])
+    print(f"Per-channel welch loop: {time.perf_counter() - start:.2f} s, max relative difference {np.max(np.abs(loop - psd) / loop):.2e}")
@@ -0,0 +1,234 @@
+import os
+import numpy as np
+
+from modules.decimation import minmax_decimate
+
+
+def pyramid_path(data_path):
+    """
+    Returns the path the pyramid of a recording is saved to (next to the data: 'recording.npy.pyramid.npz').
+    """
+    return f"{data_path}.pyramid.npz"
+
+
+def _reduce(pending, new, factor):
+    """
+    Combines `factor` consecutive bins (min, max, mean) into one, carrying incomplete bins over to the next call.
+
+    Args:
+        pending (np.ndarray): Leftover bins from the previous call, shape (3, n_channels, n_pending).
+        new (np.ndarray): New bins, shape (3, n_channels, n_new).
+        factor (int): Number of bins combined into one.
+
+    Returns:
+        tuple: (reduced bins of shape (3, n_channels, n_reduced), new pending bins).
+    """
+    if pending.shape[2]:
+        new = np.concatenate((pending, new), axis=2)
+    n_reduced = new.shape[2] // factor
+    used = n_reduced * factor
+    blocks = new[:, :, :used].reshape(3, new.shape[1], n_reduced, factor)
+    reduced = np.stack((blocks[0].min(axis=2), blocks[1].max(axis=2), blocks[2].mean(axis=2)))
+    return reduced, new[:, :, used:]
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max/mean summary of a recording for fast zooming.
+
+    Level k holds the min, max and mean of every 2**k samples, for k = `min_level` ... as long as a level has at
+    least two bins. Each level is built from the one below, so the whole pyramid costs about as much as one pass
+    over the data and takes 3 / 2**(min_level - 1) times the memory of the raw data (float32: ~0.4x for
+    min_level=3). It can be built incrementally while recording (`append`) or lazily from a saved recording
+    (`MinMaxPyramid.open`), and is saved next to the data.
+
+    A view then only fetches the level whose bin size matches the screen: drawing a multi-hour overview touches
+    about one bin per pixel instead of every sample.
+    """
+
+    def __init__(self, n_channels, sampling_rate, min_level=3, dtype=np.float32):
+        """
+        Initializes an empty MinMaxPyramid.
+
+        Args:
+            n_channels (int): Number of channels.
+            sampling_rate (float): Sampling rate in Hz.
+            min_level (int): Finest level (bins of 2**min_level samples); finer views use the raw data.
+            dtype (np.dtype): Data type of the stored bins.
+        """
+        self.n_channels = n_channels
+        self.sampling_rate = sampling_rate
+        self.min_level = min_level
+        self.dtype = np.dtype(dtype)
+        self.n_samples = 0
+        self.levels = []    # levels[i] holds level min_level + i: (3, n_channels, capacity)
+        self.lengths = []   # Number of valid bins per level
+        self.pending = [np.empty((3, n_channels, 0), dtype=self.dtype)]  # Incomplete bins feeding each level
+
+    def append(self, chunk):
+        """
+        Adds new samples of shape (n_channels, n_samples) to the pyramid.
+        """
+        if chunk.shape[1] == 0:
+            return
+        self.n_samples += chunk.shape[1]
+        chunk = np.asarray(chunk, dtype=self.dtype)
+        bins, self.pending[0] = _reduce(self.pending[0], np.broadcast_to(chunk, (3,) + chunk.shape), 2 ** self.min_level)
+
+        level = 0
+        while bins.shape[2]:
+            if level == len(self.levels):
+                self.levels.append(np.empty((3, self.n_channels, max(bins.shape[2], 16)), dtype=self.dtype))
+                self.lengths.append(0)
+                self.pending.append(np.empty((3, self.n_channels, 0), dtype=self.dtype))
+            self._store(level, bins)
+            if self.lengths[level] < 2:
+                # A level is only worth building on once it holds more than one bin
+                self.pending[level + 1] = np.concatenate((self.pending[level + 1], bins), axis=2)
+                break
+            bins, self.pending[level + 1] = _reduce(self.pending[level + 1], bins, 2)
+            level += 1
+
+    def _store(self, level, bins):
+        length = self.lengths[level]
+        needed = length + bins.shape[2]
+        if needed > self.levels[level].shape[2]:
+            grown = np.empty((3, self.n_channels, max(needed, 2 * self.levels[level].shape[2])), dtype=self.dtype)
+            grown[:, :, :length] = self.levels[level][:, :, :length]
+            self.levels[level] = grown
+        self.levels[level][:, :, length:needed] = bins
+        self.lengths[level] = needed
+
+    @property
+    def max_level(self):
+        return self.min_level + len(self.levels) - 1
+
+    def get_level(self, level):
+        """
+        Returns the (min, max, mean) arrays of a level, each of shape (n_channels, n_bins).
+        """
+        index = level - self.min_level
+        data = self.levels[index][:, :, :self.lengths[index]]
+        return data[0], data[1], data[2]
+
+    def level_for(self, n_samples, n_pixels):
+        """
+        Returns the coarsest level with at most one bin per `n_samples / n_pixels` samples, or None if the raw
+        data should be used (view finer than `min_level`).
+        """
+        samples_per_pixel = n_samples / max(n_pixels, 1)
+        if samples_per_pixel < 2 ** self.min_level or not self.levels:
+            return None
+        return min(int(np.log2(samples_per_pixel)), self.max_level)
+
+    def fetch(self, start, stop, n_pixels, raw=None, mean=False):
+        """
+        Fetches the samples [start, stop) at the resolution of `n_pixels` screen pixels.
+
+        Args:
+            start (int): First sample.
+            stop (int): Sample after the last one.
+            n_pixels (int): Width of the view in pixels.
+            raw (np.ndarray, optional): Raw data (n_channels, n_samples), e.g. a memmap; used for views finer than
+                                        `min_level`. Without it the finest level is returned instead.
+            mean (bool): Whether to return the bin means instead of interleaved min/max values.
+
+        Returns:
+            tuple: (sample positions, values of shape (n_channels, n_points)) - drawn as lines like the output of
+                   `decimation.minmax_decimate`.
+        """
+        start, stop = max(int(start), 0), min(int(stop), self.n_samples)
+        level = self.level_for(stop - start, n_pixels)
+        if level is None and raw is not None:
+            positions, values = minmax_decimate(np.asarray(raw[:, start:stop]), n_pixels)
+            return positions + start, values
+        level = self.min_level if level is None else level
+
+        bin_size = 2 ** level
+        first, last = start // bin_size, -(-stop // bin_size)
+        bin_min, bin_max, bin_mean = self.get_level(level)
+        last = min(last, bin_min.shape[1])
+        bin_starts = np.arange(first, last) * bin_size
+        if mean:
+            return bin_starts + (bin_size - 1) / 2, bin_mean[:, first:last]
+
+        values = np.empty((self.n_channels, last - first, 2), dtype=self.dtype)
+        values[:, :, 0] = bin_min[:, first:last]
+        values[:, :, 1] = bin_max[:, first:last]
+        positions = np.repeat(bin_starts, 2).astype(float)
+        positions[1::2] += bin_size - 1
+        return positions, values.reshape(self.n_channels, -1)
+
+    def save(self, path):
+        """
+        Saves the pyramid (including incomplete bins, so appending can resume) to an .npz file.
+        """
+        arrays = {f"level_{i}": self.levels[i][:, :, :self.lengths[i]] for i in range(len(self.levels))}
+        arrays.update({f"pending_{i}": pending for i, pending in enumerate(self.pending)})
+        np.savez(path, n_channels=self.n_channels, sampling_rate=self.sampling_rate, min_level=self.min_level,
+                 n_samples=self.n_samples, n_levels=len(self.levels), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a pyramid saved with `save`.
+        """
+        with np.load(path) as saved:
+            n_levels = int(saved["n_levels"])
+            pyramid = cls(int(saved["n_channels"]), float(saved["sampling_rate"]), int(saved["min_level"]),
+                          saved["pending_0"].dtype)
+            pyramid.n_samples = int(saved["n_samples"])
+            pyramid.levels = [saved[f"level_{i}"] for i in range(n_levels)]
+            pyramid.lengths = [level.shape[2] for level in pyramid.levels]
+            pyramid.pending = [saved[f"pending_{i}"] for i in range(n_levels + 1)]
+        return pyramid
+
+    @classmethod
+    def from_array(cls, data, sampling_rate, min_level=3, chunk_samples=2 ** 18):
+        """
+        Builds the pyramid of a recording (n_channels, n_samples), reading it in chunks so memmaps stay on disk.
+        """
+        pyramid = cls(data.shape[0], sampling_rate, min_level)
+        for start in range(0, data.shape[1], chunk_samples):
+            pyramid.append(np.asarray(data[:, start:start + chunk_samples]))
+        return pyramid
+
+    @classmethod
+    def open(cls, data_path, sampling_rate, min_level=3, rebuild=False):
+        """
+        Opens the pyramid of a saved recording (.npy of shape (n_channels, n_samples)), building and saving it
+        next to the data on first use or when the recording has grown since.
+
+        Returns:
+            tuple: (pyramid, memory-mapped raw data).
+        """
+        data = np.load(data_path, mmap_mode='r')
+        path = pyramid_path(data_path)
+        if not rebuild and os.path.exists(path):
+            pyramid = cls.load(path)
+            if pyramid.n_samples == data.shape[1] and pyramid.min_level == min_level:
+                return pyramid, data
+            print(f"Pyramid '{path}' is out of date, rebuilding...")
+
+        pyramid = cls.from_array(data, sampling_rate, min_level)
+        pyramid.save(path)
+        return pyramid, data
+
+
+if __name__ == "__main__":
+    import time
+
+    sampling_rate = 250
+    data = np.random.randn(16, 4 * 3600 * sampling_rate).astype(np.float32)  # 16 channels, 4 hours
+
+    start = time.perf_counter()
+    pyramid = MinMaxPyramid.from_array(data, sampling_rate)
+    print(f"Built {len(pyramid.levels)} levels in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    positions, values = pyramid.fetch(0, data.shape[1], n_pixels=1500)
+    print(f"Full-session overview: {values.shape[1]} points in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    positions, values = minmax_decimate(data, 1500)
+    print(f"Same overview from the raw samples: {(time.perf_counter() - start) * 1000:.2f} ms")
@@ -0,0 +1,59 @@
+import numpy as np
+from functools import lru_cache
+
+
+def harmonic_list(harmonics):
+    """
+    Normalizes a harmonics argument to a list of harmonic numbers.
+
+    Args:
+        harmonics (int or iterable): Either the number of harmonics (3 -> [1, 2, 3]) or the harmonic numbers
+                                     themselves (e.g. np.arange(1, 4) or [1, 2, 4]).
+
+    Returns:
+        list: Harmonic numbers as ints.
+    """
+    if np.ndim(harmonics) == 0:
+        return list(range(1, int(harmonics) + 1))
+    return [int(h) for h in harmonics]
+
+
+def reference_time(sampling_rate, n_samples):
+    """
+    Returns the sample times (in seconds) the reference signals are generated on.
+    """
+    return np.arange(n_samples) / sampling_rate
+
+
+@lru_cache(maxsize=256)
+def _reference_block(frequency, harmonics, sampling_rate, n_samples, phase):
+    time = reference_time(sampling_rate, n_samples)
+    harmonics = np.asarray(harmonics, dtype=float)
+    angles = 2 * np.pi * frequency * np.outer(time, harmonics) + harmonics * phase
+    block = np.hstack([np.sin(angles), np.cos(angles)])
+    block.setflags(write=False)  # Shared between callers through the cache
+    return block
+
+
+def generate_reference_signals(frequencies, harmonics, sampling_rate, n_samples, phases=None):
+    """
+    Generates sine/cosine reference signals for each target frequency and its harmonics.
+
+    Blocks are cached, so classifiers built with the same frequencies, harmonics and window
+    (e.g. several sessions or a parameter sweep) share one read-only copy.
+
+    Args:
+        frequencies (list): Target frequencies in Hz.
+        harmonics (int or iterable): Number of harmonics or the harmonic numbers (see `harmonic_list`).
+        sampling_rate (float): Sampling rate in Hz.
+        n_samples (int): Number of samples per reference signal.
+        phases (list, optional): Stimulus phase (radians) of each target; harmonic h is shifted by h * phase.
+
+    Returns:
+        list: One array of shape (n_samples, 2 * n_harmonics) per frequency, sine columns first then cosine columns.
+    """
+    harmonics = tuple(harmonic_list(harmonics))
+    if phases is None:
+        phases = [0.0] * len(frequencies)
+    return [_reference_block(float(freq), harmonics, float(sampling_rate), int(n_samples), float(phase))
+            for freq, phase in zip(frequencies, phases)]
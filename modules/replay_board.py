@@ -0,0 +1,112 @@
+import time
+import numpy as np
+
+from modules.channel_map import ChannelMap
+
+
+class ReplayBoard:
+    """
+    Stands in for a BrainFlowBoardSetup by replaying a recording or a synthetic stream.
+
+    `get_board_data` returns the samples "acquired" since the previous call: in real time (paced by the host clock
+    from `setup`), or a fixed chunk per call for faster-than-real-time runs. The source is an array
+    (n_rows, n_samples), a path to an `.npy` recording (memory-mapped) or a generator with a `read(n_samples)`
+    method such as `SyntheticSSVEP`, so pipelines, the classification worker and the session server can be run
+    and tested without hardware.
+    """
+
+    def __init__(self, source, sampling_rate, board_id=None, name=None, realtime=True, loop=False, chunk=None):
+        """
+        Initializes the ReplayBoard.
+
+        Args:
+            source (np.ndarray, str or object): Recording (n_rows, n_samples), path to one, or a stream generator.
+            sampling_rate (float): Sampling rate of the source.
+            board_id (int, optional): BrainFlow board the recording was made with; its descriptor gives the row
+                                      layout (`channel_map`). Without one, every row is an EEG channel.
+            name (str, optional): Name of the board. Defaults to 'Replay'.
+            realtime (bool): Whether to deliver samples at the sampling rate, or `chunk` samples per call.
+            loop (bool): Whether to restart a recording at its end (otherwise `finished` is set).
+            chunk (int, optional): Samples per call when not in real time. Defaults to 0.1 s.
+        """
+        if isinstance(source, str):
+            source = np.load(source, mmap_mode="r")
+        self.source = source
+        self.generator = hasattr(source, "read")
+        self.sampling_rate = sampling_rate
+        self.name = name or "Replay"
+        self.realtime = realtime
+        self.loop = loop
+        self.chunk = chunk or max(int(round(sampling_rate / 10)), 1)
+
+        if board_id is not None:
+            self.channel_map = ChannelMap.from_board(board_id)
+        else:
+            n_rows = source.n_channels if self.generator else source.shape[0]
+            self.channel_map = ChannelMap({"name": self.name, "num_rows": n_rows, "sampling_rate": sampling_rate,
+                                           "eeg_channels": list(range(n_rows))})
+        self.eeg_channels = self.channel_map.channels("eeg")
+
+        self.position = 0
+        self.delivered = 0
+        self.finished = False
+        self.streaming = False
+        self._started = None
+
+    def setup(self):
+        """
+        Starts the replay clock.
+        """
+        self._started = time.perf_counter()
+        self.streaming = True
+
+    def stop(self):
+        """
+        Stops the replay.
+        """
+        self.streaming = False
+
+    def _read(self, n_samples):
+        if self.generator:
+            data = self.source.read(n_samples)
+            return data[0] if isinstance(data, tuple) else data
+        pieces = []
+        while n_samples > 0 and not self.finished:
+            take = min(n_samples, self.source.shape[1] - self.position)
+            pieces.append(np.array(self.source[:, self.position:self.position + take], dtype=np.float64))
+            self.position += take
+            n_samples -= take
+            if self.position >= self.source.shape[1]:
+                if self.loop:
+                    self.position = 0
+                else:
+                    self.finished = True
+        if not pieces:
+            return np.empty((self.source.shape[0], 0))
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces, axis=1)
+
+    def get_board_data(self):
+        """
+        Returns the samples acquired since the previous call, shape (n_rows, n_new_samples).
+        """
+        if not self.streaming:
+            print(f"[{self.name}] Replay is not started.")
+            return None
+        if self.realtime:
+            n_samples = int((time.perf_counter() - self._started) * self.sampling_rate) - self.delivered
+        else:
+            n_samples = self.chunk
+        data = self._read(max(n_samples, 0))
+        self.delivered += data.shape[1]
+        return data
+
+
+if __name__ == "__main__":
+    from modules.synthetic import SyntheticSSVEP
+
+    board = ReplayBoard(SyntheticSSVEP([9.25, 11.25, 13.25, 15.25], n_channels=8), 250, name="Synthetic replay")
+    board.setup()
+    for _ in range(5):
+        time.sleep(0.1)
+        print(f"[{board.name}] {board.get_board_data().shape[1]} new samples")
+    board.stop()
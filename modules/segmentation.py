@@ -2,6 +2,8 @@ import time
 import numpy as np
 from brainflow.board_shim import BoardShim
 
+from modules.packet_loss import find_gaps
+
 class Segmentation:
     def __init__(self, board, segment_duration):
         """
@@ -15,7 +17,12 @@ class Segmentation:
         self.segment_duration = segment_duration
         self.sampling_rate = BoardShim.get_sampling_rate(self.board.board_id)
         self.n_samples = int(self.sampling_rate * self.segment_duration)
-        self.last_time = time.time()
+        self.last_time = time.perf_counter()  # Monotonic: unaffected by wall-clock adjustments
+        try:
+            self.package_channel = BoardShim.get_package_num_channel(self.board.board_id)
+        except Exception:
+            self.package_channel = None  # Board without package numbers
+        self.lost_samples = 0  # Samples dropped within the last returned segment
 
     def get_segment(self):
         """
@@ -23,7 +30,8 @@ class Segmentation:
 
         This method fetches the latest segment of data based on the segment duration. 
         It uses the get_current_board_data function from the BoardShim library to retrieve 
-        the latest samples available on the board.
+        the latest samples available on the board. The package numbers of the segment are checked for
+        dropped packets; `lost_samples` holds the number of samples missing within it (0 for a clean segment).
 
         Returns:
             A numpy array representing the data segment, or None if insufficient data is available.
@@ -31,6 +39,9 @@ class Segmentation:
         data = self.board.get_current_board_data(self.n_samples)
         if data.shape[1] >= self.n_samples:
             segment = data[:, -self.n_samples:]
+            if self.package_channel is not None:
+                _, missing = find_gaps(segment[self.package_channel])
+                self.lost_samples = int(missing.sum())
             return segment
         return None
 
@@ -46,11 +57,11 @@ class Segmentation:
             A numpy array representing the data segment, or None if insufficient data is available.
         """
         # Wait until the segment duration has passed
-        while time.time() - self.last_time < self.segment_duration:
+        while time.perf_counter() - self.last_time < self.segment_duration:
             time.sleep(0.01)  # Sleep briefly to avoid busy waiting
 
         # Update the last time to the current time
-        self.last_time = time.time()
+        self.last_time = time.perf_counter()
 
         # Get the latest segment of data
         return self.get_segment()
@@ -0,0 +1,368 @@
+"""
+Multi-session SSVEP server.
+
+Hosts several independent pipelines (one per participant/headset: board -> filters -> classifier) in one
+process, or spread over a pool of worker processes, instead of one copy of an example script per participant.
+Each session is a classification-worker config (see `classification_worker`); sessions share the process-wide
+reference-signal, reference-basis and filter-design caches, so identical setups are only prepared once per process.
+
+Sessions are served earliest-deadline-first: every session is polled when its next decision's samples are due,
+and the server sleeps until the earliest due time otherwise. A decision that is made more than the session's
+deadline (default: one step) after it was due counts as missed; per-session throughput, latency, lateness and
+missed deadlines are reported on exit.
+
+Usage:
+    python -m modules.session_server sessions.json [--duration SECONDS] [--workers N] [--quiet]
+
+Example config (every session is "defaults" updated with its own entry):
+    {
+        "workers": 1,
+        "output": {"stdout": true, "socket": "udp://127.0.0.1:5005"},
+        "defaults": {
+            "window": 2.0,
+            "step": 0.5,
+            "filter": {"filter_type": "bandpass", "lowcut": 6.0, "highcut": 30.0, "order": 4},
+            "classifier": {"frequencies": [9.25, 11.25, 13.25, 15.25], "harmonics": 3, "method": "CCA"}
+        },
+        "sessions": [
+            {"name": "P1", "board": {"board_id": 0, "serial_port": "/dev/ttyUSB0"}},
+            {"name": "P2", "board": {"synthetic": {"frequencies": [9.25, 11.25, 13.25, 15.25], "n_channels": 8}}}
+        ]
+    }
+"""
+import sys
+import json
+import time
+import queue
+import signal
+import argparse
+import contextlib
+import multiprocessing
+from collections import deque
+import numpy as np
+
+from modules.brainflow_stream import BrainFlowBoardSetup
+from modules.classification_worker import DecisionPublisher, load_config, make_board, build_pipeline, pipeline_report
+
+
+class Session:
+    """
+    One hosted pipeline and its scheduling state. Lateness is kept for the latest `history` decisions only.
+    """
+
+    def __init__(self, name, pipeline, board=None, deadline=None, history=10000):
+        """
+        Initializes the Session.
+
+        Args:
+            name (str): Session name (added to its decisions).
+            pipeline (OnlinePipeline): The session's pipeline.
+            board (optional): The pipeline's board, stopped with the session. Defaults to `pipeline.board`.
+            deadline (float, optional): Seconds after a decision is due by which it must be made. Defaults to one step.
+            history (int): Number of recent decisions whose lateness is kept for the percentiles.
+        """
+        self.name = name
+        self.pipeline = pipeline
+        self.board = board if board is not None else pipeline.board
+        self.sampling_rate = self.board.sampling_rate
+        self.deadline = deadline if deadline is not None else pipeline.step_samples / self.sampling_rate
+        self.next_due = 0.0     # When to poll next (perf_counter)
+        self.pending_due = None  # When the samples of the pending decision were first due
+        self.lateness = deque(maxlen=history)
+        self.max_lateness = 0.0
+        self.missed = 0
+
+    def remaining(self):
+        """
+        Seconds of data still missing for the next decision.
+        """
+        pipeline = self.pipeline
+        return max(pipeline.step_samples - pipeline.samples_since_decision, 1) / self.sampling_rate
+
+    def poll(self, now, poll_interval):
+        """
+        Polls the pipeline and schedules the next poll.
+
+        Returns:
+            list: The decisions made.
+        """
+        if self.pending_due is None:
+            self.pending_due = self.next_due or now
+        samples = self.pipeline.stats.samples
+        decisions = self.pipeline.poll()
+        done = time.perf_counter()
+        for decision in decisions:
+            lateness = max(done - self.pending_due, 0.0)
+            self.lateness.append(lateness)
+            self.max_lateness = max(self.max_lateness, lateness)
+            if lateness > self.deadline:
+                self.missed += 1
+            decision["lateness_ms"] = round(lateness * 1000, 3)
+            decision.setdefault("name", self.name)
+        if decisions or self.pipeline.stats.samples > samples:
+            self.pending_due = None
+            self.next_due = done + self.remaining()  # Sleep until the next decision's samples have arrived
+        else:
+            self.next_due = done + poll_interval     # Due, but the board has not delivered yet
+        return decisions
+
+    def report(self):
+        """
+        Returns:
+            dict: The pipeline report with the deadline statistics added.
+        """
+        report = pipeline_report(self.pipeline)
+        lateness_ms = np.asarray(self.lateness) * 1000
+        report.update({"deadline_ms": round(self.deadline * 1000, 3), "missed_deadlines": self.missed})
+        if lateness_ms.size:
+            report.update({
+                "lateness_p50_ms": round(float(np.percentile(lateness_ms, 50)), 3),
+                "lateness_p95_ms": round(float(np.percentile(lateness_ms, 95)), 3),
+                "lateness_max_ms": round(self.max_lateness * 1000, 3),
+            })
+        return report
+
+
+class SessionServer:
+    """
+    Runs several sessions in one process with earliest-deadline-first polling (see module docstring).
+    """
+
+    def __init__(self, callback=None, poll_interval=0.002, paced=True):
+        """
+        Initializes the SessionServer.
+
+        Args:
+            callback (callable, optional): Called with every decision (dict, including the session 'name').
+            poll_interval (float): Retry interval for a session whose samples are due but not delivered yet.
+            paced (bool): Whether to sleep until decisions are due. False polls all sessions back to back, e.g. for
+                          faster-than-real-time replays.
+        """
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.paced = paced
+        self.sessions = {}
+
+    def add_session(self, name, pipeline, board=None, deadline=None):
+        """
+        Hosts an existing pipeline.
+
+        Returns:
+            Session: The session.
+        """
+        if name in self.sessions:
+            raise ValueError(f"Session '{name}' already exists.")
+        self.sessions[name] = Session(name, pipeline, board, deadline)
+        return self.sessions[name]
+
+    def add_config(self, config, quality_callback=None):
+        """
+        Creates, starts and hosts the board and pipeline of a worker config (with an optional "name" and "deadline").
+
+        Returns:
+            Session: The session.
+        """
+        board_config = dict(config["board"])
+        name = config.get("name") or board_config.get("name")
+        if name is not None:
+            board_config["name"] = name
+        board = make_board(board_config)
+        # Board status messages go to stderr so stdout only carries decisions
+        with contextlib.redirect_stdout(sys.stderr):
+            board.setup()
+        if isinstance(board, BrainFlowBoardSetup) and board.board is None:
+            raise RuntimeError(f"[{board.name}] Board setup failed, see the message above.")
+        pipeline = build_pipeline(config, board, quality_callback=quality_callback)
+        return self.add_session(board.name, pipeline, board, config.get("deadline"))
+
+    def step(self):
+        """
+        Polls every session that is due, earliest deadline first.
+
+        Returns:
+            list: The decisions made.
+        """
+        now = time.perf_counter()
+        due = [session for session in self.sessions.values() if not self.paced or session.next_due <= now]
+        decisions = []
+        for session in sorted(due, key=lambda session: session.next_due):
+            for decision in session.poll(now, self.poll_interval):
+                decisions.append(decision)
+                if self.callback is not None:
+                    self.callback(decision)
+        return decisions
+
+    def run(self, duration=None, max_decisions=None, stop_event=None):
+        """
+        Serves the sessions until `duration` has passed, every session made `max_decisions` decisions, all replays
+        have finished, `stop_event` is set, or it is interrupted (Ctrl+C).
+
+        Returns:
+            dict: Report per session name.
+        """
+        deadline = time.perf_counter() + duration if duration else None
+        try:
+            while deadline is None or time.perf_counter() < deadline:
+                if stop_event is not None and stop_event.is_set():
+                    break
+                self.step()
+                sessions = self.sessions.values()
+                if max_decisions and all(s.pipeline.stats.decisions >= max_decisions for s in sessions):
+                    break
+                if all(getattr(s.board, "finished", False) for s in sessions):
+                    break
+                if self.paced:
+                    wait = min(s.next_due for s in sessions) - time.perf_counter()
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.perf_counter())
+                    if wait > 0:
+                        time.sleep(wait)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        return self.report()
+
+    def stop(self):
+        """
+        Stops every session's board.
+        """
+        with contextlib.redirect_stdout(sys.stderr):
+            for session in self.sessions.values():
+                session.board.stop()
+
+    def report(self):
+        """
+        Returns:
+            dict: Report per session name (pipeline throughput/latency, stage counters, deadline statistics).
+        """
+        return {name: session.report() for name, session in self.sessions.items()}
+
+
+def session_configs(config):
+    """
+    Expands a server config into one worker config per session ("defaults" updated with each session entry).
+    """
+    defaults = config.get("defaults", {})
+    return [dict(defaults, **session) for session in config["sessions"]]
+
+
+def _serve(index, configs, duration, max_decisions, paced, messages, stop_event):
+    # Worker process: hosts its share of the sessions and forwards decisions and reports to the parent.
+    # Ctrl+C is handled by the parent, which sets stop_event so the worker still sends its report.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    server = SessionServer(callback=lambda decision: messages.put(("decision", index, decision)), paced=paced)
+    try:
+        for config in configs:
+            server.add_config(config, quality_callback=None)
+        messages.put(("report", index, server.run(duration, max_decisions, stop_event)))
+    except Exception as e:
+        server.stop()
+        messages.put(("error", index, f"{type(e).__name__}: {e}"))
+
+
+def serve(config, duration=None, workers=None, max_decisions=None, callback=None, paced=True, grace=10.0):
+    """
+    Serves the sessions of a server config, in this process or spread round-robin over `workers` processes.
+
+    Worker processes are watched while their messages are drained: one that exits without a report (e.g. a
+    native crash or an OOM kill) is reported as failed instead of blocking the server. After Ctrl+C the workers
+    are asked to stop and their reports are still collected; workers not done after `grace` seconds are terminated.
+
+    Args:
+        config (dict): Server config (see module docstring).
+        duration (float, optional): Run time in seconds.
+        workers (int, optional): Number of worker processes (overrides config['workers']; 1 runs in this process).
+        max_decisions (int, optional): Stop once every session has made this many decisions.
+        callback (callable, optional): Called with every decision.
+        paced (bool): See `SessionServer`.
+        grace (float): Seconds workers get to finish after Ctrl+C.
+
+    Returns:
+        dict: Report per session name.
+    """
+    configs = session_configs(config)
+    workers = min(workers or config.get("workers", 1), len(configs))
+    if workers <= 1:
+        server = SessionServer(callback=callback, paced=paced)
+        for session_config in configs:
+            server.add_config(session_config)
+        return server.run(duration, max_decisions)
+
+    context = multiprocessing.get_context("spawn")
+    messages = context.Queue()
+    stop_event = context.Event()
+    processes = [context.Process(target=_serve, args=(i, configs[i::workers], duration, max_decisions, paced, messages,
+                                                      stop_event)) for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    reports, errors, done = {}, {}, set()
+    interrupted = None
+
+    def handle(message):
+        kind, index, payload = message
+        if kind == "decision":
+            if callback is not None:
+                callback(payload)
+            return
+        done.add(index)
+        if kind == "report":
+            reports.update(payload)
+        else:
+            errors[index] = payload
+
+    # Drained until every worker has exited, so none blocks on a full queue while being joined
+    while any(process.is_alive() for process in processes):
+        try:
+            handle(messages.get(timeout=0.1))
+        except queue.Empty:
+            if interrupted is not None and time.perf_counter() - interrupted > grace:
+                for process in processes:
+                    if process.is_alive():
+                        process.terminate()
+        except KeyboardInterrupt:
+            if interrupted is None:
+                interrupted = time.perf_counter()
+                stop_event.set()
+    while True:  # Messages still in the pipe from workers that have just exited
+        try:
+            handle(messages.get(timeout=0.1))
+        except queue.Empty:
+            break
+    for index, process in enumerate(processes):
+        process.join()
+        if index not in done:
+            errors[index] = f"exited with code {process.exitcode} without a report"
+
+    if errors:
+        failures = "; ".join(f"worker {index}: {error}" for index, error in sorted(errors.items()))
+        if interrupted is None:
+            raise RuntimeError(f"Session worker failed: {failures}")
+        print(f"Session workers after Ctrl+C: {failures}", file=sys.stderr)
+    return reports
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Multi-session SSVEP classification server.")
+    parser.add_argument("config", help="Path to the server config (JSON).")
+    parser.add_argument("--duration", type=float, default=None, help="Run time in seconds (default: until Ctrl+C).")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: config or 1).")
+    parser.add_argument("--quiet", action="store_true", help="Do not print decisions to stdout.")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    output = config.get("output", {})
+    publisher = DecisionPublisher(stdout=output.get("stdout", True) and not args.quiet, address=output.get("socket"))
+    try:
+        reports = serve(config, duration=args.duration, workers=args.workers, callback=publisher.publish)
+    finally:
+        publisher.close()
+    print(json.dumps({"report": reports}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import time
+from fractions import Fraction
+
+import numpy as np
+from scipy.signal import lfilter
+
+QUALITY_FIELDS = ["mean", "std", "line_noise", "rail_fraction", "flat", "impedance_kohm"]
+
+
+class StreamingSignalQuality:
+    """
+    Streaming per-channel signal-quality monitor.
+
+    Every incoming chunk updates, in O(chunk) and vectorised over channels:
+    - running mean/variance of the whole session (Welford, merged per chunk with Chan's parallel update),
+    - the mean/variance of the current report block,
+    - the line-noise amplitude at 50/60 Hz from a Goertzel resonator (lfilter with carried state, reset per block),
+    - the fraction of samples at the amplifier rails.
+
+    Every `1 / publish_rate` seconds of data a compact quality report is built from the block, passed to the
+    callback and kept in `latest`; channels failing the thresholds are listed in `report['bad_channels']` for
+    automatic channel rejection.
+    """
+
+    def __init__(self, n_channels, sampling_rate, line_frequency=50.0, publish_rate=4.0, callback=None,
+                 rail_threshold=None, flat_threshold=0.5, max_std=100.0, max_line_noise=20.0, max_rail_fraction=0.01,
+                 lead_off_current=6e-9, series_resistance=2200.0):
+        """
+        Initializes the StreamingSignalQuality monitor.
+
+        Args:
+            n_channels (int): Number of channels.
+            sampling_rate (float): Sampling rate in Hz.
+            line_frequency (float): Mains frequency (50 or 60 Hz).
+            publish_rate (float): Reports per second of data.
+            callback (callable, optional): Called with each report (dict).
+            rail_threshold (float, optional): Absolute value (uV) at which a sample counts as railed, e.g. 187500 for
+                                              the Cyton (+/-187.5 mV at gain 24). None disables rail detection.
+            flat_threshold (float): Block standard deviation (uV) below which a channel counts as flat.
+            max_std (float): Block standard deviation (uV) above which a channel is marked bad.
+            max_line_noise (float): Line-noise amplitude (uV) above which a channel is marked bad.
+            max_rail_fraction (float): Fraction of railed samples above which a channel is marked bad.
+            lead_off_current (float): Lead-off drive current (A) for the impedance proxy (OpenBCI Cyton: 6 nA).
+            series_resistance (float): Resistance (ohm) in series with the electrode subtracted from the proxy.
+        """
+        self.n_channels = n_channels
+        self.sampling_rate = sampling_rate
+        self.line_frequency = line_frequency
+        self.callback = callback
+        self.rail_threshold = rail_threshold
+        self.flat_threshold = flat_threshold
+        self.max_std = max_std
+        self.max_line_noise = max_line_noise
+        self.max_rail_fraction = max_rail_fraction
+        self.lead_off_current = lead_off_current
+        self.series_resistance = series_resistance
+
+        # Blocks hold a whole number of mains cycles so the Goertzel bin sits exactly on the line frequency
+        cycle = Fraction(sampling_rate / line_frequency).limit_denominator(100).numerator
+        self.block_samples = max(int(round(sampling_rate / publish_rate / cycle)), 1) * cycle
+        omega = 2 * np.pi * line_frequency / sampling_rate
+        self._coefficient = 2 * np.cos(omega)
+        self._goertzel_a = np.array([1.0, -self._coefficient, 1.0])
+
+        # Session statistics
+        self.count = 0
+        self.mean = np.zeros(n_channels)
+        self.m2 = np.zeros(n_channels)
+
+        self.latest = None
+        self._reset_block()
+
+    def _reset_block(self):
+        self.block_count = 0
+        self.block_mean = np.zeros(self.n_channels)
+        self.block_m2 = np.zeros(self.n_channels)
+        self.block_railed = np.zeros(self.n_channels)
+        self.goertzel_state = np.zeros((self.n_channels, 2))
+        self.goertzel_last = np.zeros((self.n_channels, 2))  # s[n-2], s[n-1]
+
+    @staticmethod
+    def _merge(count, mean, m2, chunk):
+        # Chan et al. parallel variance update of (count, mean, M2) with a whole chunk
+        n = chunk.shape[1]
+        chunk_mean = chunk.mean(axis=1)
+        chunk_m2 = ((chunk - chunk_mean[:, None]) ** 2).sum(axis=1)
+        total = count + n
+        delta = chunk_mean - mean
+        mean = mean + delta * n / total
+        m2 = m2 + chunk_m2 + delta ** 2 * count * n / total
+        return total, mean, m2
+
+    def update(self, chunk):
+        """
+        Updates the statistics with a chunk of shape (n_channels, n_samples).
+
+        Returns:
+            list: Reports completed during this chunk, possibly empty.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        reports = []
+        position = 0
+        while position < chunk.shape[1]:
+            take = min(self.block_samples - self.block_count, chunk.shape[1] - position)
+            self._update_block(chunk[:, position:position + take])
+            position += take
+            if self.block_count == self.block_samples:
+                reports.append(self._publish())
+                self._reset_block()
+        return reports
+
+    def _update_block(self, piece):
+        self.count, self.mean, self.m2 = self._merge(self.count, self.mean, self.m2, piece)
+        self.block_count, self.block_mean, self.block_m2 = self._merge(self.block_count, self.block_mean, self.block_m2, piece)
+
+        # Goertzel resonator s[n] = x[n] + 2cos(w) s[n-1] - s[n-2], state carried between chunks
+        states, self.goertzel_state = lfilter([1.0], self._goertzel_a, piece, axis=1, zi=self.goertzel_state)
+        if piece.shape[1] >= 2:
+            self.goertzel_last = states[:, -2:]
+        else:
+            self.goertzel_last = np.column_stack((self.goertzel_last[:, 1], states[:, -1]))
+
+        if self.rail_threshold is not None:
+            self.block_railed += (np.abs(piece) >= self.rail_threshold).sum(axis=1)
+
+    def _publish(self):
+        n = self.block_count
+        std = np.sqrt(self.block_m2 / max(n - 1, 1))
+
+        previous, last = self.goertzel_last[:, 0], self.goertzel_last[:, 1]
+        power = last ** 2 + previous ** 2 - self._coefficient * last * previous
+        line_noise = 2 * np.sqrt(np.maximum(power, 0.0)) / n  # Amplitude (uV) of the mains component
+
+        rail_fraction = self.block_railed / n
+        flat = std < self.flat_threshold
+        # Lead-off impedance: the drive current's RMS voltage over the electrode, minus the series resistor
+        impedance_kohm = np.maximum(np.sqrt(2) * std * 1e-6 / self.lead_off_current - self.series_resistance, 0.0) / 1000
+
+        bad = flat | (std > self.max_std) | (line_noise > self.max_line_noise) | (rail_fraction > self.max_rail_fraction)
+        report = {
+            "time": time.time(),
+            "sample": self.count,
+            "mean": self.mean.copy(),
+            "std": std,
+            "line_noise": line_noise,
+            "rail_fraction": rail_fraction,
+            "flat": flat,
+            "impedance_kohm": impedance_kohm,
+            "bad_channels": np.flatnonzero(bad).tolist(),
+        }
+        self.latest = report
+        if self.callback is not None:
+            self.callback(report)
+        return report
+
+    def session_std(self):
+        """
+        Returns the per-channel standard deviation over the whole session so far.
+        """
+        return np.sqrt(self.m2 / max(self.count - 1, 1))
+
+    @staticmethod
+    def quality_vector(report):
+        """
+        Packs a report into an array of shape (n_channels, len(QUALITY_FIELDS)), e.g. for sending or logging.
+        """
+        return np.column_stack([np.asarray(report[field], dtype=float) for field in QUALITY_FIELDS])
+
+
+if __name__ == "__main__":
+    sampling_rate = 250
+    n_samples = 10 * sampling_rate
+    t = np.arange(n_samples) / sampling_rate
+    rng = np.random.default_rng(0)
+
+    data = 10 * rng.standard_normal((8, n_samples))
+    data[1] += 40 * np.sin(2 * np.pi * 50 * t)  # Line noise
+    data[2] = 0.0                               # Disconnected (flat)
+    data[3, ::50] = 187500                      # Occasional rail hits
+    data[3, :1000] = 187500
+
+    monitor = StreamingSignalQuality(8, sampling_rate, line_frequency=50, publish_rate=4, rail_threshold=187500 * 0.99)
+    for start in range(0, n_samples, 25):  # 100 ms chunks
+        monitor.update(data[:, start:start + 25])
+
+    print(f"Fields: {QUALITY_FIELDS}")
+    print(np.round(monitor.quality_vector(monitor.latest), 2))
+    print(f"Bad channels: {monitor.latest['bad_channels']}")
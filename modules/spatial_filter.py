@@ -0,0 +1,348 @@
+import numpy as np
+
+
+def car_matrix(n_channels, exclude=()):
+    """
+    Common average reference: every channel minus the mean of all channels.
+
+    Args:
+        n_channels (int): Number of channels.
+        exclude (list, optional): Channels left out (e.g. bad electrodes): they are not part of the average and
+                                  their outputs are zero.
+
+    Returns:
+        np.ndarray: Matrix (n_channels, n_channels).
+    """
+    keep = np.setdiff1d(np.arange(n_channels), exclude)
+    matrix = np.zeros((n_channels, n_channels))
+    matrix[np.ix_(keep, keep)] = np.eye(len(keep)) - 1.0 / max(len(keep), 1)
+    return matrix
+
+
+def montage_positions(channel_names, montage="standard_1020"):
+    """
+    Looks up 3D electrode positions of a standard MNE montage (the one `visualization.plot_topomap` uses).
+
+    Args:
+        channel_names (list): Electrode names, e.g. ['Fp1', 'Fp2', 'C3', ...] (`board.channel_map.eeg_names`).
+        montage (str): Name of the MNE standard montage.
+
+    Returns:
+        np.ndarray: Positions in metres, shape (n_channels, 3).
+    """
+    import mne  # Imported here since mne is only needed for montage lookups (and is slow to import)
+
+    positions = mne.channels.make_standard_montage(montage).get_positions()["ch_pos"]
+    lookup = {name.lower(): position for name, position in positions.items()}
+    missing = [name for name in channel_names if name.lower() not in lookup]
+    if missing:
+        raise ValueError(f"Channels {missing} are not in the '{montage}' montage.")
+    return np.array([lookup[name.lower()] for name in channel_names])
+
+
+def laplacian_matrix(positions, n_neighbors=4, exclude=()):
+    """
+    Surface Laplacian (Hjorth): every channel minus the inverse-distance weighted mean of its nearest neighbours.
+
+    Args:
+        positions (np.ndarray): Electrode positions (n_channels, 2 or 3).
+        n_neighbors (int): Neighbours per channel (fewer if the montage has fewer channels).
+        exclude (list, optional): Channels left out (e.g. bad electrodes): they are nobody's neighbour and their
+                                  outputs are zero.
+
+    Returns:
+        np.ndarray: Matrix (n_channels, n_channels).
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if len(exclude):
+        keep = np.setdiff1d(np.arange(len(positions)), exclude)
+        matrix = np.zeros((len(positions), len(positions)))
+        if len(keep) > 1:
+            matrix[np.ix_(keep, keep)] = laplacian_matrix(positions[keep], n_neighbors)
+        return matrix
+    n_channels = len(positions)
+    n_neighbors = min(n_neighbors, n_channels - 1)
+    distances = np.linalg.norm(positions[:, None] - positions[None], axis=-1)
+    np.fill_diagonal(distances, np.inf)
+    neighbors = np.argsort(distances, axis=1)[:, :n_neighbors]
+    weights = 1.0 / np.take_along_axis(distances, neighbors, axis=1)
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    matrix = np.eye(n_channels)
+    np.put_along_axis(matrix, neighbors, -weights, axis=1)
+    return matrix
+
+
+class SpatialFilter:
+    """
+    Fixed spatial filter: one (n_out, n_in) matrix applied to each chunk with a single matmul.
+
+    Filters compose by matrix product (`car.then(whitening)`), so a chain of spatial stages still costs one matmul.
+    Note that CCA scores are invariant to invertible spatial filters; they matter for per-channel methods
+    (PowerSSVEPClassifier), for templates fitted in the filtered space, and when they reduce the channel count.
+
+    Since every output mixes several electrodes, bad electrodes cannot be dropped from the filtered window; they
+    are left out of the filter itself instead (`exclude`), re-deriving CAR and Laplacian matrices without them.
+    """
+
+    def __init__(self, matrix, derive=None):
+        """
+        Initializes the SpatialFilter.
+
+        Args:
+            matrix (np.ndarray): Filter matrix (n_out, n_in).
+            derive (callable, optional): Returns the matrix without the given input channels (see `exclude`).
+                                         Defaults to zeroing their columns.
+        """
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.base = self.matrix
+        self.derive = derive
+        self.excluded = ()
+
+    @classmethod
+    def car(cls, n_channels):
+        """
+        Common average reference of `n_channels` channels.
+        """
+        return cls(car_matrix(n_channels), derive=lambda exclude: car_matrix(n_channels, exclude))
+
+    @classmethod
+    def laplacian(cls, channels, n_neighbors=4, montage="standard_1020"):
+        """
+        Surface Laplacian from electrode names (looked up in an MNE montage) or positions (n_channels, 2 or 3).
+        """
+        if all(isinstance(channel, str) for channel in channels):
+            channels = montage_positions(channels, montage)
+        return cls(laplacian_matrix(channels, n_neighbors),
+                   derive=lambda exclude: laplacian_matrix(channels, n_neighbors, exclude))
+
+    @property
+    def n_in(self):
+        return self.matrix.shape[1]
+
+    @property
+    def n_out(self):
+        return self.matrix.shape[0]
+
+    def then(self, other):
+        """
+        Returns the filter applying `self` first and `other` second (as one matrix for fixed filters).
+        """
+        if isinstance(other, WhiteningFilter):
+            return other.after(self)
+        return SpatialFilter(other.matrix @ self.matrix, derive=lambda exclude: other.matrix @ self._derive(exclude))
+
+    def _derive(self, exclude):
+        if not len(exclude):
+            return self.base
+        if self.derive is not None:
+            return self.derive(list(exclude))
+        matrix = self.base.copy()
+        matrix[:, list(exclude)] = 0.0
+        return matrix
+
+    def exclude(self, channels):
+        """
+        Leaves input channels (e.g. the electrodes a `StreamingSignalQuality` monitor reports as bad) out of the
+        filter, replacing any previous exclusion; an empty list restores the full filter.
+
+        Args:
+            channels (list): Input channel positions to leave out.
+        """
+        channels = tuple(sorted(int(channel) for channel in channels))
+        if channels != self.excluded:
+            self.excluded = channels
+            self.matrix = self._derive(channels)
+
+    def update(self, chunk):
+        """
+        Fixed filters have no state; present so every spatial filter can be fed the same way.
+        """
+
+    def apply(self, chunk, out=None):
+        """
+        Filters a chunk (n_in, n_samples) into (n_out, n_samples).
+
+        Args:
+            chunk (np.ndarray): Channels x samples.
+            out (np.ndarray, optional): Preallocated output array.
+
+        Returns:
+            np.ndarray: The filtered chunk.
+        """
+        return np.matmul(self.matrix, chunk, out=out)
+
+
+class WhiteningFilter(SpatialFilter):
+    """
+    Adaptive whitening from a running covariance.
+
+    Every chunk updates an exponentially weighted mean and covariance in O(n_channels^2 * chunk) (weighted Chan
+    merge, so electrode offsets do not leak into the covariance), and the whitening matrix is re-derived from it
+    every `refresh` seconds of data - one small eigendecomposition - instead of being refit on each segment.
+    ZCA whitening keeps one output per channel; `n_components` gives PCA whitening onto the strongest components
+    (fewer channels for the classifier). A fixed filter (e.g. CAR) can be put in front with `after`.
+
+    The running mean is subtracted along with the matmul (as an offset fixed at each refresh), so electrode offsets
+    do not turn into steps in the output when the matrix changes.
+    """
+
+    def __init__(self, n_channels, sampling_rate, half_life=30.0, refresh=1.0, n_components=None,
+                 regularization=1e-6):
+        """
+        Initializes the WhiteningFilter.
+
+        Args:
+            n_channels (int): Number of input channels.
+            sampling_rate (float): Sampling rate in Hz.
+            half_life (float): Seconds of data after which a sample's weight in the covariance has halved.
+            refresh (float): Seconds of data between updates of the whitening matrix.
+            n_components (int, optional): Keep only the strongest components (PCA whitening). Defaults to ZCA
+                                          whitening with all channels.
+            regularization (float): Added to the eigenvalues, relative to the largest one.
+        """
+        self.n_channels = n_channels
+        self.sampling_rate = sampling_rate
+        self.decay = 0.5 ** (1.0 / (half_life * sampling_rate))
+        self.refresh_samples = max(int(round(refresh * sampling_rate)), 1)
+        self.n_components = n_components
+        self.regularization = regularization
+        self.pre = None
+
+        self.weight = 0.0
+        self.mean = np.zeros(n_channels)
+        self.covariance = np.zeros((n_channels, n_channels))
+        self.refreshes = 0
+        self._since_refresh = 0
+        self.whitening = np.eye(n_channels)[:n_components]  # Until the first refresh
+        self.offset = np.zeros(len(self.whitening))
+        super().__init__(self.whitening)
+
+    def _compose(self):
+        # Filter matrix and offset from the current whitening matrix, without excluded input channels
+        if self.pre is not None:
+            self.matrix = self.whitening @ self.pre.matrix
+            self.offset = self.whitening @ self.mean
+        else:
+            whitening = self.whitening
+            if self.excluded:
+                whitening = whitening.copy()
+                whitening[:, list(self.excluded)] = 0.0
+            self.matrix = whitening
+            self.offset = whitening @ self.mean
+
+    def after(self, pre):
+        """
+        Puts a fixed filter (e.g. CAR) in front: the covariance is tracked in its output space and the two
+        matrices are applied as one.
+
+        Returns:
+            WhiteningFilter: self.
+        """
+        if pre.n_out != self.n_channels:
+            raise ValueError(f"The filter in front outputs {pre.n_out} channels, the whitening expects {self.n_channels}.")
+        self.pre = pre
+        self._compose()
+        return self
+
+    @property
+    def n_in(self):
+        return self.n_channels if self.pre is None else self.pre.n_in
+
+    def then(self, other):
+        raise ValueError("The whitening filter adapts its matrix, so it has to be the last spatial stage.")
+
+    def exclude(self, channels):
+        """
+        Leaves input channels out: of the filter in front (re-derived without them), or of the whitening's input.
+        Their data is also kept out of the running covariance from now on.
+        """
+        channels = tuple(sorted(int(channel) for channel in channels))
+        if channels != self.excluded:
+            self.excluded = channels
+            if self.pre is not None:
+                self.pre.exclude(channels)
+            self._compose()
+
+    def update(self, chunk):
+        """
+        Adds a chunk (n_in, n_samples) to the running covariance and refreshes the matrix when due.
+        """
+        n_samples = chunk.shape[1]
+        if n_samples == 0:
+            return
+        if self.pre is not None:
+            chunk = self.pre.apply(chunk)
+        elif self.excluded:
+            chunk = chunk.copy()
+            chunk[list(self.excluded)] = 0.0
+        chunk_mean = chunk.mean(axis=1)
+        centred = chunk - chunk_mean[:, None]
+        chunk_scatter = centred @ centred.T
+
+        # Weighted merge of (weight, mean, scatter) with the chunk, after decaying the old weight
+        decayed = self.weight * self.decay ** n_samples
+        total = decayed + n_samples
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * (n_samples / total)
+        scatter = self.covariance * self.weight * self.decay ** n_samples
+        scatter += chunk_scatter + np.outer(delta, delta) * (decayed * n_samples / total)
+        self.covariance = scatter / total
+        self.weight = total
+
+        self._since_refresh += n_samples
+        if self._since_refresh >= self.refresh_samples:
+            self.refresh()
+        elif self.refreshes == 0:
+            self._compose()  # Offsets removed from the start
+
+    def apply(self, chunk, out=None):
+        """
+        Whitens a chunk (n_in, n_samples) into (n_out, n_samples), removing the running mean.
+        """
+        out = np.matmul(self.matrix, chunk, out=out)
+        out -= self.offset[:, None]
+        return out
+
+    def refresh(self):
+        """
+        Re-derives the whitening matrix from the current covariance.
+        """
+        values, vectors = np.linalg.eigh(self.covariance)
+        values = np.maximum(values, 0.0) + self.regularization * max(values[-1], np.finfo(float).tiny)
+        scale = 1.0 / np.sqrt(values)
+        if self.n_components is None:
+            self.whitening = (vectors * scale) @ vectors.T  # ZCA
+        else:
+            self.whitening = (vectors[:, ::-1][:, :self.n_components] * scale[::-1][:self.n_components]).T
+        self._compose()
+        self.refreshes += 1
+        self._since_refresh = 0
+
+
+if __name__ == "__main__":
+    import time
+    from modules.synthetic import SyntheticSSVEP
+
+    sampling_rate = 250
+    data = SyntheticSSVEP([9.25, 11.25, 13.25, 15.25], sampling_rate=sampling_rate, n_channels=8).generate(120)[0]
+    cyton_layout = np.array([[-0.03, 0.08], [0.03, 0.08], [-0.05, 0.0], [0.05, 0.0],  # Fp1 Fp2 C3 C4
+                             [-0.07, -0.04], [0.07, -0.04], [-0.03, -0.08], [0.03, -0.08]])  # P7 P8 O1 O2
+    filters = {
+        "CAR": SpatialFilter.car(8),
+        "Laplacian": SpatialFilter(laplacian_matrix(cyton_layout)),
+        "CAR + ZCA whitening": SpatialFilter.car(8).then(WhiteningFilter(8, sampling_rate)),
+        "PCA whitening (4)": WhiteningFilter(8, sampling_rate, n_components=4),
+    }
+    for name, spatial_filter in filters.items():
+        outputs = []
+        start = time.perf_counter()
+        for position in range(0, data.shape[1], 25):  # 100 ms chunks
+            chunk = data[:, position:position + 25]
+            spatial_filter.update(chunk)
+            outputs.append(spatial_filter.apply(chunk))
+        elapsed = time.perf_counter() - start
+        tail = np.concatenate(outputs, axis=1)[:, -30 * sampling_rate:]
+        correlation = np.corrcoef(tail)[np.triu_indices(len(tail), 1)]
+        print(f"{name:22s} {spatial_filter.n_out} outputs, {elapsed / len(outputs) * 1e6:6.1f} us per chunk, "
+              f"mean |inter-channel correlation| {np.abs(correlation).mean():.3f}")
@@ -1,8 +1,12 @@
 from psychopy import visual, event, core, monitors
 import numpy as np
-from multiprocessing import Process, Queue
+from multiprocessing import Process
 import time
 import warnings
+from modules.calibration import CalibrationCache, measure_display, window_resolution
+from modules.frequency_planner import FREQUENCY_DECIMALS, load_plan
+from modules.stimulus_control import (SharedStimulusState, STATUS_READY, STATUS_RUNNING, STATUS_STOPPED,
+                                      COMMAND_START, COMMAND_STOP, COMMAND_QUIT, NO_TARGET)
 
 warnings.filterwarnings("ignore", message="elementwise comparison failed; returning scalar instead")
 
@@ -11,7 +15,7 @@ class SSVEPStimulus:
     Class to create and run a Steady-State Visual Evoked Potential (SSVEP) stimulus using PsychoPy.
     """
     
-    def __init__(self, box_frequencies, queue=None, box_texts=None, box_text_indices=None, display_index=0, display_mode="freq", monitor_name="testMonitor", refresh_rate=None):
+    def __init__(self, box_frequencies, queue=None, box_texts=None, box_text_indices=None, display_index=0, display_mode="freq", monitor_name="testMonitor", refresh_rate=None, shared_state_name=None, use_calibration=True, recalibrate=False, box_phases=None, snap_to_frames=True):
         """
         Initializes the SSVEPStimulus class with the given parameters.
         
@@ -23,13 +27,28 @@ class SSVEPStimulus:
         - display_index: Index of the display screen to use.
         - display_mode: Mode of display ('freq', 'text', 'both').
         - monitor_name: Name of the monitor configuration to use.
+        - refresh_rate: Optional refresh rate of the display (measured if not provided).
+        - shared_state_name: Optional name of a SharedStimulusState control block used to publish the actual
+          frequencies and to receive start/stop/cue commands from another process.
+        - use_calibration: Whether to reuse (and store) the refresh rate from the display calibration cache.
+        - recalibrate: Whether to re-measure the refresh rate even if a fresh calibration profile exists.
+        - box_phases: Optional list of flicker phases (radians) for the boxes, e.g. from a frequency plan.
+        - snap_to_frames: Whether to round each frequency to the nearest frame-exact frequency (refresh_rate / k).
+          If False the frequencies are shown as given using non-integer frame periods.
         """
         self.box_frequencies = box_frequencies
         self.box_texts = box_texts
         self.box_text_indices = box_text_indices
+        self.box_phases = box_phases
+        self.snap_to_frames = snap_to_frames
         self.display_mode = display_mode
         self.queue = queue
         self.refresh_rate = refresh_rate
+        self.monitor_name = monitor_name
+        self.display_index = display_index
+        self.calibration = CalibrationCache() if use_calibration else None
+        self.recalibrate = recalibrate
+        self.shared_state = SharedStimulusState(shared_state_name) if shared_state_name else None
 
         if box_texts and len(box_texts) != len(box_text_indices):
             raise ValueError("The length of box_texts and box_text_indices must be the same if box_texts is provided.")
@@ -57,28 +76,32 @@ class SSVEPStimulus:
         self.boxes = self._create_boxes()
         self.frame_count = 0
         self.has_started = False
+        self.cued_target = NO_TARGET
+        self.cue_seq = 0
         self.start_button = visual.Rect(win=self.win, width=300, height=100, fillColor='green', pos=(0, 0))
         self.start_text = visual.TextStim(win=self.win, text='Press Space/Enter to Start', color='white', pos=(0, 0))
 
     def _measure_refresh_rate(self, refresh_rate=None):
         """
         Measures the refresh rate of the display.
+        A fresh profile from the display calibration cache is used instead when available,
+        and new measurements are stored there for the next launch.
         
         Returns:
         - The measured refresh rate.
         """
-        refresh_rates = []
-        for _ in range(2):
-            refresh_rate = self.win.getActualFrameRate(nIdentical=80, nWarmUpFrames=200, threshold=1)
-            if refresh_rate is not None:
-                refresh_rates.append(refresh_rate)
-            core.wait(0.1)
+        if self.calibration is not None:
+            resolution = window_resolution(self.win)
+            profile = None if self.recalibrate else self.calibration.get(self.monitor_name, resolution, self.display_index, win=self.win)
+            if profile is not None:
+                print(f"Using calibrated refresh rate for '{self.monitor_name}' (display {self.display_index}).")
+                return profile["refresh_rate"]
 
-        if refresh_rates:
-            return round(np.mean(refresh_rates), 0)
-        else:
-            print("Warning: Could not measure a consistent refresh rate. Using default value of 60 Hz.")
-            return 60  # Default refresh rate
+        measurement = measure_display(self.win, num_measurements=2, n_warmup_frames=200)
+        if self.calibration is not None:
+            self.calibration.save(self.monitor_name, resolution, self.display_index,
+                                  measurement["refresh_rate"], measurement["frame_jitter_ms"])
+        return measurement["refresh_rate"]
 
     def calculate_actual_frequencies(self, desired_frequencies):
         """
@@ -92,11 +115,16 @@ class SSVEPStimulus:
         """
         actual_frequencies = []
         for freq in desired_frequencies:
+            if not self.snap_to_frames:
+                actual_frequencies.append(float(freq))
+                continue
             frames_per_cycle = round(self.refresh_rate / freq)
-            actual_freq = round(self.refresh_rate / frames_per_cycle, 2)
+            actual_freq = round(self.refresh_rate / frames_per_cycle, FREQUENCY_DECIMALS)
             actual_frequencies.append(actual_freq)
         if self.queue:
             self.queue.put(actual_frequencies)
+        if self.shared_state:
+            self.shared_state.publish_frequencies(actual_frequencies, self.refresh_rate)
         return actual_frequencies
 
     def _create_boxes(self):
@@ -130,7 +158,9 @@ class SSVEPStimulus:
             
             box_info = {
                 "box": box,
+                "index": idx,
                 "frequency": self.actual_frequencies[idx],
+                "phase_frames": self._phase_frames(idx),
                 "frame_count": 0,
                 "on": True
             }
@@ -149,17 +179,32 @@ class SSVEPStimulus:
         
         return boxes
 
+    def _phase_frames(self, idx):
+        """
+        Converts the phase of a box into a frame offset within its flicker period.
+        """
+        if not self.box_phases:
+            return 0
+        flicker_period = self.refresh_rate / self.actual_frequencies[idx]
+        return (self.box_phases[idx] % (2 * np.pi)) / (2 * np.pi) * flicker_period
+
     def run(self):
         """
         Runs the SSVEP stimulus, handling the display and flickering of the boxes.
+        If a shared control block is attached, start/stop/quit commands and target cues are read from it once per frame.
         """
         while True:
             keys = event.getKeys()
-            if 'escape' in keys:
+            command = self.shared_state.take_command() if self.shared_state else None
+            if 'escape' in keys or command == COMMAND_QUIT:
                 break
-            elif 'space' in keys or 'return' in keys:
-                self.has_started = True
-            
+            elif 'space' in keys or 'return' in keys or command == COMMAND_START:
+                self._set_started(True)
+            elif command == COMMAND_STOP:
+                self._set_started(False)
+
+            cue_shown = self.shared_state is not None and self._update_cue()
+
             if not self.has_started:
                 self.start_button.draw()
                 self.start_text.draw()
@@ -167,7 +212,7 @@ class SSVEPStimulus:
                 self.frame_count += 1
                 for box in self.boxes:
                     flicker_period = self.refresh_rate / box["frequency"]
-                    if (self.frame_count % flicker_period) < (flicker_period / 2):
+                    if ((self.frame_count + box["phase_frames"]) % flicker_period) < (flicker_period / 2):
                         if not box["on"]:
                             box["on"] = True
                             box["box"].setAutoDraw(True)
@@ -185,19 +230,62 @@ class SSVEPStimulus:
                                 box["box_text"].setAutoDraw(False)
 
             self.win.flip()
-        
+            if self.shared_state:
+                self.shared_state.frame_count = self.frame_count
+                if cue_shown:
+                    self.shared_state.mark_cue_shown(self.frame_count, time.perf_counter())
+
+        self._close_shared_state()
         self.win.close()
         core.quit()
 
+    def _set_started(self, started):
+        """
+        Starts or pauses flickering and reports the new status through the shared control block.
+        """
+        if started and not self.has_started:
+            self.frame_count = 0
+        self.has_started = started
+        if self.shared_state:
+            self.shared_state.status = STATUS_RUNNING if started else STATUS_READY
+
+    def _update_cue(self):
+        """
+        Highlights the box cued through the shared control block.
+
+        Returns:
+        - True if the cue changed this frame (so the following flip is the cue onset).
+        """
+        cue_seq = self.shared_state.cue_seq
+        if cue_seq == self.cue_seq:
+            return False
+        self.cue_seq = cue_seq
+        self.cued_target = self.shared_state.target
+        for box in self.boxes:
+            cued = box["index"] == self.cued_target
+            box["box"].lineColor = 'red' if cued else 'white'
+            box["box"].lineWidth = 8 if cued else 1
+        return True
+
+    def _close_shared_state(self):
+        """
+        Reports that the stimulus has stopped and detaches from the shared control block.
+        """
+        if self.shared_state:
+            self.shared_state.status = STATUS_STOPPED
+            self.shared_state.close()
+            self.shared_state = None
+
     def stop(self):
         """
         Stops the SSVEP stimulus and closes the PsychoPy window.
         """
         self.has_started = False
+        self._close_shared_state()
         self.win.close()
         core.quit()
 
-def start_ssvep_stimulus(box_frequencies, queue=None, box_texts=None, box_text_indices=None, display_index=0, display_mode=None, monitor_name='testMonitor', refresh_rate=None):
+def start_ssvep_stimulus(box_frequencies, queue=None, box_texts=None, box_text_indices=None, display_index=0, display_mode=None, monitor_name='testMonitor', refresh_rate=None, shared_state_name=None, use_calibration=True, recalibrate=False, box_phases=None, snap_to_frames=True):
     """
     Starts the SSVEP stimulus in the current process.
     
@@ -209,16 +297,24 @@ def start_ssvep_stimulus(box_frequencies, queue=None, box_texts=None, box_text_i
     - display_index: Index of the display screen to use.
     - display_mode: Mode of display ('freq', 'text', 'both').
     - monitor_name: Name of the monitor configuration to use.
+    - refresh_rate: Optional refresh rate of the display (measured if not provided).
+    - shared_state_name: Optional name of a SharedStimulusState control block to attach to.
+    - use_calibration: Whether to reuse (and store) the refresh rate from the display calibration cache.
+    - recalibrate: Whether to re-measure the refresh rate even if a fresh calibration profile exists.
+    - box_phases: Optional list of flicker phases (radians) for the boxes.
+    - snap_to_frames: Whether to round each frequency to the nearest frame-exact frequency.
     """
-    stimulus = SSVEPStimulus(box_frequencies, queue, box_texts, box_text_indices, display_index, display_mode, monitor_name, refresh_rate)
+    stimulus = SSVEPStimulus(box_frequencies, queue, box_texts, box_text_indices, display_index, display_mode, monitor_name, refresh_rate, shared_state_name, use_calibration, recalibrate, box_phases, snap_to_frames)
     stimulus.run()
 
 class SSVEPStimulusRunner:
     """
     Class to manage the SSVEP stimulus in a separate process.
+    The two processes communicate through a SharedStimulusState control block in shared memory,
+    so the stimulus can be started, cued and stopped without pickling or waiting on a queue.
     """
     
-    def __init__(self, box_frequencies, box_texts=None, box_text_indices=None, display_index=0, display_mode=None, monitor_name='testMonitor', refresh_rate=None):
+    def __init__(self, box_frequencies, box_texts=None, box_text_indices=None, display_index=0, display_mode=None, monitor_name='testMonitor', refresh_rate=None, use_calibration=True, recalibrate=False, box_phases=None, snap_to_frames=True):
         """
         Initializes the SSVEPStimulusRunner class with the given parameters.
         
@@ -229,45 +325,122 @@ class SSVEPStimulusRunner:
         - display_index: Index of the display screen to use.
         - display_mode: Mode of display ('freq', 'text', 'both').
         - monitor_name: Name of the monitor configuration to use.
+        - refresh_rate: Optional refresh rate of the display (measured if not provided).
+        - use_calibration: Whether to reuse (and store) the refresh rate from the display calibration cache.
+        - recalibrate: Whether to re-measure the refresh rate even if a fresh calibration profile exists.
+        - box_phases: Optional list of flicker phases (radians) for the boxes.
+        - snap_to_frames: Whether to round each frequency to the nearest frame-exact frequency.
         """
         self.box_frequencies = box_frequencies
         self.box_texts = box_texts
         self.box_text_indices = box_text_indices
+        self.box_phases = box_phases
+        self.snap_to_frames = snap_to_frames
         self.display_index = display_index
         self.display_mode = display_mode
         self.monitor_name = monitor_name
         self.refresh_rate = refresh_rate
-        self.queue = Queue()
+        self.use_calibration = use_calibration
+        self.recalibrate = recalibrate
+        self.shared_state = None
         self.process = None
 
+    @classmethod
+    def from_plan(cls, plan, **kwargs):
+        """
+        Creates a runner that shows the frequencies and phases of a frequency plan (see `frequency_planner.plan_frequencies`).
+        The plan's refresh rate is used (instead of measuring one), since its phases and frame-exact frequencies
+        were computed for it - the classifier's `from_plan` expects exactly those frequencies.
+
+        Parameters:
+        - plan: Path to a saved plan, or the plan itself.
+        - kwargs: Additional arguments for the runner (box_texts, display_index, ...). Pass refresh_rate to override
+          the plan's.
+
+        Returns:
+        - The SSVEPStimulusRunner.
+        """
+        plan = load_plan(plan)
+        kwargs.setdefault("refresh_rate", plan["refresh_rate"])
+        return cls(plan["frequencies"], box_phases=plan["phases"], snap_to_frames=plan["frame_exact"], **kwargs)
+
     def start(self):
         """
         Starts the SSVEP stimulus in a separate process.
+        Every start gets a fresh control block, so commands and frequencies left over from a previous run
+        (e.g. after the window was closed with Escape) are not replayed to the new stimulus.
         """
-        self.process = Process(target=start_ssvep_stimulus, args=(self.box_frequencies, self.queue, self.box_texts, self.box_text_indices, self.display_index, self.display_mode, self.monitor_name, self.refresh_rate))
+        if self.is_running():
+            raise RuntimeError("The stimulus is already running. Use: stop() first")
+        if self.shared_state:
+            self.shared_state.close()
+        self.shared_state = SharedStimulusState()
+        self.process = Process(target=start_ssvep_stimulus, args=(self.box_frequencies, None, self.box_texts, self.box_text_indices, self.display_index, self.display_mode, self.monitor_name, self.refresh_rate, self.shared_state.name, self.use_calibration, self.recalibrate, self.box_phases, self.snap_to_frames))
         self.process.start()
 
-    def get_actual_frequencies(self):
+    def get_actual_frequencies(self, timeout=30.0):
         """
-        Retrieves the actual frequencies from the queue.
+        Retrieves the actual frequencies as soon as the stimulus process has published them.
         
+        Parameters:
+        - timeout: Maximum time to wait in seconds (the stimulus may still be measuring the refresh rate).
+
         Returns:
         - List of actual frequencies.
         """
         if self.process and self.process.is_alive():
-            time.sleep(2)  # Wait for some time or until the frequencies are available
-            actual_freqs = self.queue.get()  # Retrieve the frequencies from the queue
-            return actual_freqs
+            return self.shared_state.get_actual_frequencies(timeout=timeout)
         else: 
             raise RuntimeError("The process isn't alive - cannot return actual_frequencies. Use: start() or is_running()")
 
-    def stop(self):
+    def start_stimulus(self):
+        """
+        Starts the flickering (equivalent to pressing space/enter in the stimulus window).
+        """
+        self._send_command(COMMAND_START)
+
+    def stop_stimulus(self):
+        """
+        Stops the flickering and returns the stimulus to its start screen.
+        """
+        self._send_command(COMMAND_STOP)
+
+    def cue(self, target):
+        """
+        Highlights a box in the stimulus window.
+
+        Parameters:
+        - target: Index into box_frequencies of the box to cue, or NO_TARGET (-1) to clear the cue.
+        """
+        if self.shared_state is None:
+            raise RuntimeError("The stimulus has not been started. Use: start()")
+        self.shared_state.cue(target)
+
+    def get_frame_count(self):
+        """
+        Returns the number of frames flipped since the flickering started.
+        """
+        return self.shared_state.frame_count if self.shared_state else 0
+
+    def _send_command(self, command):
+        if self.shared_state is None or not self.is_running():
+            raise RuntimeError("The stimulus process isn't running. Use: start() or is_running()")
+        self.shared_state.send_command(command)
+
+    def stop(self, timeout=5.0):
         """
         Stops the SSVEP stimulus process.
+        Asks the stimulus to close its window first and only terminates the process if it does not exit within `timeout` seconds.
         """
         if self.process and self.process.is_alive():
-            self.process.terminate()
-            self.process.join()
+            self.shared_state.send_command(COMMAND_QUIT)
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        if self.shared_state:
+            self.shared_state.close()
+            self.shared_state = None
 
     def is_running(self):
         """
@@ -312,7 +485,7 @@ if __name__ == "__main__":
     # Start the SSVEP stimulus
     stimulus_process.start()
     
-    # Get the actual frequencies
+    # Get the actual frequencies (returns as soon as the stimulus has published them)
     actual_frequencies = stimulus_process.get_actual_frequencies()
     print("Actual Frequencies:", actual_frequencies)
     
@@ -320,6 +493,9 @@ if __name__ == "__main__":
     if stimulus_process.is_running():
         print("Process is still running.")
     
+    # Start the flicker and cue the first box without touching the keyboard
+    # stimulus_process.start_stimulus()
+    # stimulus_process.cue(0)
     # time.sleep(20)
     
     # Stop the process if needed
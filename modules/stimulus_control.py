@@ -0,0 +1,245 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+MAX_TARGETS = 64  # Upper bound on the number of stimulus boxes the control block can describe
+COMMAND_SLOTS = 16  # Commands that can be pending at once (ring buffer in the control block)
+
+# Status codes written by the stimulus process
+STATUS_INIT = 0      # Process launched, window and refresh rate not ready yet
+STATUS_READY = 1     # Actual frequencies published, showing the start screen
+STATUS_RUNNING = 2   # Boxes are flickering
+STATUS_STOPPED = 3   # Window closed, process exiting
+
+# Commands written by the controlling process (consumed by the stimulus process)
+COMMAND_NONE = 0
+COMMAND_START = 1    # Start flickering (same as pressing space/enter)
+COMMAND_STOP = 2     # Stop flickering and return to the start screen
+COMMAND_QUIT = 3     # Close the window and exit (same as pressing escape)
+
+NO_TARGET = -1
+
+_CONTROL_DTYPE = np.dtype([
+    ('status', np.int32),
+    ('target', np.int32),
+    ('n_targets', np.int32),
+    ('command_seq', np.int64),    # Number of commands sent; command k is in slot k % COMMAND_SLOTS
+    ('commands', np.int32, (COMMAND_SLOTS,)),
+    ('cue_seq', np.int64),        # Incremented every time a new target is cued
+    ('frame_count', np.int64),    # Frames flipped since flickering started
+    ('cue_frame', np.int64),      # frame_count at which the current cue was first drawn
+    ('cue_time', np.float64),     # time.perf_counter() of the flip that first showed the current cue
+    ('refresh_rate', np.float64),
+    ('frequencies', np.float64, (MAX_TARGETS,)),
+], align=True)
+
+
+class SharedStimulusState:
+    """
+    Control block shared between the SSVEP stimulus process and the acquisition/classifier process.
+
+    The block lives in a `multiprocessing.shared_memory` segment, so both processes read and write
+    the same fixed-layout record directly - nothing is pickled and no process has to sleep while
+    waiting for a queue. The controlling process creates the block and passes its `name` to the
+    stimulus process, which attaches to it.
+
+    Fields:
+        status: One of the STATUS_* codes, written by the stimulus process.
+        commands / command_seq: Ring of COMMAND_* codes and the number sent, written by the controller; the
+                                stimulus remembers how many it has taken, so nothing is cleared or lost.
+        target: Index of the currently cued box (NO_TARGET if none).
+        frame_count: Number of frames flipped since flickering started.
+        cue_frame / cue_time: Frame number and perf_counter time at which the current cue was first shown.
+        refresh_rate / frequencies: Refresh rate and actual flicker frequencies used by the stimulus.
+    """
+
+    def __init__(self, name=None):
+        """
+        Creates a new control block, or attaches to an existing one.
+
+        Args:
+            name (str, optional): Name of an existing block to attach to. If None, a new block is created
+                                  (and owned) by this instance.
+        """
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=_CONTROL_DTYPE.itemsize)
+        else:
+            self._shm = attach_shared_memory(name)
+
+        self._block = np.ndarray((), dtype=_CONTROL_DTYPE, buffer=self._shm.buf)
+        self._commands_taken = 0  # Reader side: commands of the ring already returned by take_command
+        if self._owner:
+            self._block[()] = np.zeros((), dtype=_CONTROL_DTYPE)
+            self._block['target'] = NO_TARGET
+
+    @property
+    def name(self):
+        """Name of the shared memory segment (pass this to the other process)."""
+        return self._shm.name
+
+    @property
+    def status(self):
+        return int(self._block['status'])
+
+    @status.setter
+    def status(self, value):
+        self._block['status'] = value
+
+    @property
+    def target(self):
+        return int(self._block['target'])
+
+    @property
+    def cue_seq(self):
+        return int(self._block['cue_seq'])
+
+    @property
+    def frame_count(self):
+        return int(self._block['frame_count'])
+
+    @frame_count.setter
+    def frame_count(self, value):
+        self._block['frame_count'] = value
+
+    @property
+    def cue_frame(self):
+        return int(self._block['cue_frame'])
+
+    @property
+    def cue_time(self):
+        return float(self._block['cue_time'])
+
+    @property
+    def refresh_rate(self):
+        return float(self._block['refresh_rate'])
+
+    def publish_frequencies(self, frequencies, refresh_rate):
+        """
+        Stores the actual flicker frequencies and refresh rate, then marks the stimulus as ready.
+
+        Args:
+            frequencies (list): Actual flicker frequencies, one per box.
+            refresh_rate (float): Refresh rate the frequencies were calculated for.
+
+        Raises:
+            ValueError: If there are more frequencies than the block can hold.
+        """
+        n_targets = len(frequencies)
+        if n_targets > MAX_TARGETS:
+            raise ValueError(f"Cannot publish {n_targets} frequencies, the control block holds at most {MAX_TARGETS}.")
+
+        self._block['frequencies'][:n_targets] = frequencies
+        self._block['n_targets'] = n_targets
+        self._block['refresh_rate'] = refresh_rate
+        # Status is written last so a reader never sees READY with a half-written frequency list
+        self._block['status'] = STATUS_READY
+
+    def get_actual_frequencies(self, timeout=10.0, poll_interval=0.0005):
+        """
+        Returns the actual flicker frequencies as soon as the stimulus process has published them.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds.
+            poll_interval (float): Time between checks of the status flag in seconds.
+
+        Returns:
+            list: Actual flicker frequencies.
+
+        Raises:
+            TimeoutError: If the frequencies are not published within `timeout`.
+        """
+        self.wait_for_status((STATUS_READY, STATUS_RUNNING), timeout, poll_interval)
+        n_targets = int(self._block['n_targets'])
+        return [float(f) for f in self._block['frequencies'][:n_targets]]
+
+    def wait_for_status(self, statuses, timeout=10.0, poll_interval=0.0005):
+        """
+        Blocks until the stimulus reports one of the given statuses.
+
+        Args:
+            statuses (int or tuple): Status code(s) to wait for.
+            timeout (float): Maximum time to wait in seconds.
+            poll_interval (float): Time between checks of the status flag in seconds.
+
+        Returns:
+            int: The status that was reached.
+
+        Raises:
+            TimeoutError: If none of the statuses are reached within `timeout`.
+        """
+        if isinstance(statuses, int):
+            statuses = (statuses,)
+        deadline = time.perf_counter() + timeout
+        while True:
+            status = self.status
+            if status in statuses:
+                return status
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"Stimulus did not reach status {statuses} within {timeout} s (status is {status}).")
+            time.sleep(poll_interval)
+
+    def send_command(self, command):
+        """
+        Posts a command (COMMAND_START, COMMAND_STOP or COMMAND_QUIT) for the stimulus process. Commands are
+        queued, so several sent within one frame (e.g. STOP then QUIT) are all taken in order. Only one process
+        may send commands.
+        """
+        seq = int(self._block['command_seq'])
+        self._block['commands'][seq % COMMAND_SLOTS] = command
+        # The sequence is written last, so the reader never sees it before the command it counts
+        self._block['command_seq'] = seq + 1
+
+    def take_command(self):
+        """
+        Returns the oldest command not taken yet, or COMMAND_NONE (called by the stimulus process once per frame).
+        Nothing is written to the block, so a command sent meanwhile cannot be lost.
+        """
+        seq = int(self._block['command_seq'])
+        if self._commands_taken >= seq:
+            return COMMAND_NONE
+        # More than COMMAND_SLOTS behind: the oldest commands have been overwritten
+        self._commands_taken = max(self._commands_taken, seq - COMMAND_SLOTS)
+        command = int(self._block['commands'][self._commands_taken % COMMAND_SLOTS])
+        self._commands_taken += 1
+        return command
+
+    def cue(self, target):
+        """
+        Cues a box by index (or clears the cue with NO_TARGET).
+
+        Args:
+            target (int): Index into the box frequencies, or NO_TARGET.
+        """
+        self._block['target'] = target
+        self._block['cue_seq'] += 1
+
+    def mark_cue_shown(self, frame_count, flip_time):
+        """
+        Records the frame and flip time at which the current cue was first drawn (stimulus side).
+        """
+        self._block['cue_frame'] = frame_count
+        self._block['cue_time'] = flip_time
+
+    def close(self):
+        """
+        Detaches from the control block; the owning instance also frees the shared memory.
+        """
+        self._block = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def attach_shared_memory(name):
+    """
+    Attaches to an existing shared memory segment without registering it with this process'
+    resource tracker (otherwise the tracker would unlink the block when the stimulus process exits).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
@@ -1,6 +1,7 @@
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.signal import welch
+from modules.psd import compute_psd, compute_psds
+from modules.pyramid import MinMaxPyramid
 
 def plot_eeg_time_series(eeg_data, sampling_rate, channel_names=None):
     """
@@ -28,6 +29,54 @@ def plot_eeg_time_series(eeg_data, sampling_rate, channel_names=None):
     plt.tight_layout()
     plt.show()
 
+def browse_eeg(eeg_data, sampling_rate, channel_names=None, pyramid=None):
+    """
+    Plots a long recording for interactive browsing (zoom/pan) using a min/max pyramid.
+    
+    Only the pyramid level matching the on-screen resolution is drawn, and it is re-fetched whenever the
+    view changes, so the full-session overview renders immediately and zooming in reaches the raw samples.
+    
+    Parameters:
+    - eeg_data: np.array of shape (n_channels, n_samples), or the path to a saved .npy recording (memory-mapped;
+      its pyramid is built on first open and saved next to it)
+    - sampling_rate: int, the sampling rate of the data in Hz
+    - channel_names: list of strings, optional names for each channel
+    - pyramid: MinMaxPyramid, optional, e.g. built while recording (built from eeg_data if not given)
+    """
+    if isinstance(eeg_data, str):
+        pyramid, eeg_data = MinMaxPyramid.open(eeg_data, sampling_rate)
+    elif pyramid is None:
+        pyramid = MinMaxPyramid.from_array(eeg_data, sampling_rate)
+    n_channels, n_samples = eeg_data.shape
+
+    fig, axes = plt.subplots(n_channels, 1, figsize=(15, 2 * n_channels), sharex=True)
+    if n_channels == 1:
+        axes = [axes]
+
+    lines = []
+    top_min, top_max, _ = pyramid.get_level(pyramid.max_level) if pyramid.levels else (eeg_data, eeg_data, None)
+    for i, ax in enumerate(axes):
+        lines.append(ax.plot([], [], lw=0.8, label=f'Channel {i+1}' if not channel_names else channel_names[i])[0])
+        margin = 0.05 * (top_max[i].max() - top_min[i].min())
+        ax.set_ylim(top_min[i].min() - margin, top_max[i].max() + margin)
+        ax.set_ylabel('Amplitude')
+        ax.legend(loc='upper right')
+    axes[0].set_xlim(0, n_samples / sampling_rate)
+
+    def refresh(ax):
+        start, stop = ax.get_xlim()
+        n_pixels = int(ax.get_window_extent().width)
+        positions, values = pyramid.fetch(start * sampling_rate, stop * sampling_rate + 1, n_pixels, raw=eeg_data)
+        for i, line in enumerate(lines):
+            line.set_data(positions / sampling_rate, values[i])
+
+    refresh(axes[0])
+    axes[0].callbacks.connect('xlim_changed', refresh)  # Shared x axis: one callback covers all channels
+
+    plt.xlabel('Time (s)')
+    plt.tight_layout()
+    plt.show()
+
 def plot_psd(eeg_data, sampling_rate, channel_names=None):
     """
     Plots the Power Spectral Density (PSD) for each channel.
@@ -38,12 +87,12 @@ def plot_psd(eeg_data, sampling_rate, channel_names=None):
     - channel_names: list of strings, optional names for each channel
     """
     n_channels = eeg_data.shape[0]
+    freqs, psd = compute_psd(eeg_data, sampling_rate)
     
     fig, ax = plt.subplots(figsize=(15, 8))
     
     for i in range(n_channels):
-        freqs, psd = welch(eeg_data[i], fs=sampling_rate, nperseg=1024)
-        ax.semilogy(freqs, psd, label=f'Channel {i+1}' if not channel_names else channel_names[i])
+        ax.semilogy(freqs, psd[i], label=f'Channel {i+1}' if not channel_names else channel_names[i])
     
     ax.set_title('Power Spectral Density (PSD) Plot')
     ax.set_xlabel('Frequency (Hz)')
@@ -53,7 +102,6 @@ def plot_psd(eeg_data, sampling_rate, channel_names=None):
 
 
 
-import mne
 import numpy as np
 
 def plot_topomap(eeg_data, sampling_rate, channel_names, times=None):
@@ -66,6 +114,8 @@ def plot_topomap(eeg_data, sampling_rate, channel_names, times=None):
     - sampling_rate: int, the sampling rate of the data in Hz
     - times: list of floats, time points (in seconds) to plot topomaps
     """
+    import mne  # Imported here since mne is only needed for topographic maps (and is slow to import)
+
     if times is None:
         times = [0.1, 0.3, 0.5]  # Example time points
 
@@ -120,8 +170,6 @@ def compare_eeg_time_series(data_before, data_after, sampling_rate, channel_name
     plt.show()
 
 
-from scipy.signal import welch
-
 def compare_psd(data_before, data_after, sampling_rate, channel_names=None):
     """
     Compare the Power Spectral Density (PSD) of two EEG datasets.
@@ -133,15 +181,13 @@ def compare_psd(data_before, data_after, sampling_rate, channel_names=None):
     - channel_names: list of strings, optional names for each channel
     """
     n_channels = data_before.shape[0]
+    (freqs_before, psd_before), (freqs_after, psd_after) = compute_psds([data_before, data_after], sampling_rate)
     
     fig, ax = plt.subplots(figsize=(15, 8))
     
     for i in range(n_channels):
-        freqs_before, psd_before = welch(data_before[i], fs=sampling_rate, nperseg=1024)
-        freqs_after, psd_after = welch(data_after[i], fs=sampling_rate, nperseg=1024)
-        
-        ax.semilogy(freqs_before, psd_before, label=f'Before: {channel_names[i]}' if channel_names else f'Before: Channel {i+1}', alpha=0.6)
-        ax.semilogy(freqs_after, psd_after, label=f'After: {channel_names[i]}' if channel_names else f'After: Channel {i+1}', linestyle='--', alpha=0.8)
+        ax.semilogy(freqs_before, psd_before[i], label=f'Before: {channel_names[i]}' if channel_names else f'Before: Channel {i+1}', alpha=0.6)
+        ax.semilogy(freqs_after, psd_after[i], label=f'After: {channel_names[i]}' if channel_names else f'After: Channel {i+1}', linestyle='--', alpha=0.8)
     
     ax.set_title('Comparison of Power Spectral Density (PSD)')
     ax.set_xlabel('Frequency (Hz)')
@@ -149,9 +195,6 @@ def compare_psd(data_before, data_after, sampling_rate, channel_names=None):
     ax.legend(loc='upper right')
     plt.show()
 
-from scipy.signal import welch
-import matplotlib.pyplot as plt
-
 def compare_psd_side_by_side(data_before, data_after, sampling_rate, channel_names=None):
     """
     Compare the Power Spectral Density (PSD) of two EEG datasets side by side (before vs after).
@@ -163,6 +206,7 @@ def compare_psd_side_by_side(data_before, data_after, sampling_rate, channel_nam
     - channel_names: list of strings, optional names for each channel.
     """
     n_channels = data_before.shape[0]
+    (freqs_before, psd_before), (freqs_after, psd_after) = compute_psds([data_before, data_after], sampling_rate)
     
     # Create figure with 2 columns (Before and After) for each channel
     fig, axes = plt.subplots(n_channels, 2, figsize=(15, 3 * n_channels), sharex=True, sharey=True)
@@ -171,19 +215,15 @@ def compare_psd_side_by_side(data_before, data_after, sampling_rate, channel_nam
         axes = [axes]  # Ensure axes are iterable for single channel
     
     for i in range(n_channels):
-        # Compute PSD for "Before" data
-        freqs_before, psd_before = welch(data_before[i], fs=sampling_rate, nperseg=1024)
-        freqs_after, psd_after = welch(data_after[i], fs=sampling_rate, nperseg=1024)
-        
         # Plot Before PSD (left column)
-        axes[i, 0].semilogy(freqs_before, psd_before, label=f'Before: Channel {i+1}' if not channel_names else f'Before: {channel_names[i]}', color='b')
+        axes[i, 0].semilogy(freqs_before, psd_before[i], label=f'Before: Channel {i+1}' if not channel_names else f'Before: {channel_names[i]}', color='b')
         axes[i, 0].set_title(f'Before: {channel_names[i]}' if channel_names else f'Before: Channel {i+1}')
         axes[i, 0].set_ylabel('Power (uV^2/Hz)')
         axes[i, 0].set_xlabel('Frequency (Hz)')
         axes[i, 0].legend(loc='upper right')
 
         # Plot After PSD (right column)
-        axes[i, 1].semilogy(freqs_after, psd_after, label=f'After: Channel {i+1}' if not channel_names else f'After: {channel_names[i]}', color='orange')
+        axes[i, 1].semilogy(freqs_after, psd_after[i], label=f'After: Channel {i+1}' if not channel_names else f'After: {channel_names[i]}', color='orange')
         axes[i, 1].set_title(f'After: {channel_names[i]}' if channel_names else f'After: Channel {i+1}')
         axes[i, 1].set_xlabel('Frequency (Hz)')
         axes[i, 1].legend(loc='upper right')
@@ -191,9 +231,6 @@ def compare_psd_side_by_side(data_before, data_after, sampling_rate, channel_nam
     plt.tight_layout()
     plt.show()
 
-from scipy.signal import welch
-import matplotlib.pyplot as plt
-
 def compare_psd_stacked(data_before, data_after, sampling_rate, channel_names=None, average=False):
     """
     Compare the Power Spectral Density (PSD) of two EEG datasets, showing all channels 
@@ -207,6 +244,7 @@ def compare_psd_stacked(data_before, data_after, sampling_rate, channel_names=No
     - average: bool, whether to plot the average PSD across all channels or individual channels.
     """
     n_channels = data_before.shape[0]
+    (freqs_before, psd_before), (freqs_after, psd_after) = compute_psds([data_before, data_after], sampling_rate)
 
     # Create a figure with 2 columns: one for Before and one for After
     fig, axes = plt.subplots(1, 2, figsize=(15, 6), sharex=True, sharey=True)
@@ -216,12 +254,7 @@ def compare_psd_stacked(data_before, data_after, sampling_rate, channel_names=No
     
     # If average is True, calculate the mean PSD across channels
     if average:
-        # Compute the average PSD for "Before" data
-        psd_before_avg = np.zeros_like(welch(data_before[0], fs=sampling_rate, nperseg=1024)[1])
-        for i in range(n_channels):
-            freqs_before, psd_before = welch(data_before[i], fs=sampling_rate, nperseg=1024)
-            psd_before_avg += psd_before
-        psd_before_avg /= n_channels
+        psd_before_avg = psd_before.mean(axis=0)
 
         # Plot the average PSD for "Before" data on the left panel
         axes[0].semilogy(freqs_before, psd_before_avg, label='Average', color='blue')
@@ -230,12 +263,7 @@ def compare_psd_stacked(data_before, data_after, sampling_rate, channel_names=No
         axes[0].set_xlabel('Frequency (Hz)')
         axes[0].legend(loc='upper right')
 
-        # Compute the average PSD for "After" data
-        psd_after_avg = np.zeros_like(welch(data_after[0], fs=sampling_rate, nperseg=1024)[1])
-        for i in range(n_channels):
-            freqs_after, psd_after = welch(data_after[i], fs=sampling_rate, nperseg=1024)
-            psd_after_avg += psd_after
-        psd_after_avg /= n_channels
+        psd_after_avg = psd_after.mean(axis=0)
 
         # Plot the average PSD for "After" data on the right panel
         axes[1].semilogy(freqs_after, psd_after_avg, label='Average', color='orange')
@@ -246,8 +274,7 @@ def compare_psd_stacked(data_before, data_after, sampling_rate, channel_names=No
     else:
         # Plot all channels in the "Before" dataset on the left panel
         for i in range(n_channels):
-            freqs_before, psd_before = welch(data_before[i], fs=sampling_rate, nperseg=1024)
-            axes[0].semilogy(freqs_before, psd_before, label=channel_names[i], alpha=0.6)
+            axes[0].semilogy(freqs_before, psd_before[i], label=channel_names[i], alpha=0.6)
         
         axes[0].set_title('Before (All Channels)')
         axes[0].set_xlabel('Frequency (Hz)')
@@ -256,8 +283,7 @@ def compare_psd_stacked(data_before, data_after, sampling_rate, channel_names=No
 
         # Plot all channels in the "After" dataset on the right panel
         for i in range(n_channels):
-            freqs_after, psd_after = welch(data_after[i], fs=sampling_rate, nperseg=1024)
-            axes[1].semilogy(freqs_after, psd_after, label=channel_names[i], linestyle='--', alpha=0.8)
+            axes[1].semilogy(freqs_after, psd_after[i], label=channel_names[i], linestyle='--', alpha=0.8)
         
         axes[1].set_title('After (All Channels)')
         axes[1].set_xlabel('Frequency (Hz)')
@@ -8,6 +8,12 @@ setup(
     author_email="Mascini.Max@gmail.com",
     packages=find_packages(),
     install_requires=[],
+    entry_points={
+        'console_scripts': [
+            'bci-classifier-worker=modules.classification_worker:main',
+            'bci-session-server=modules.session_server:main',
+        ],
+    },
     
     # setup_requires=['pytest-runner'],
     # tests_require=['pytest==4.4.1'],
@@ -0,0 +1,79 @@
+"""
+Shared fixtures of the benchmark suite: synthetic SSVEP-like EEG and a mocked board, so every benchmark runs
+without hardware.
+
+Baselines are stored in testing/benchmarks/.baselines (per machine, by pytest-benchmark):
+    python -m pytest testing/benchmarks --benchmark-save=baseline      # record a baseline
+    python -m pytest testing/benchmarks --benchmark-compare            # compare with the latest baseline
+Comparing fails when a benchmark's mean is more than REGRESSION_TOLERANCE slower than the baseline
+(override with --benchmark-compare-fail, e.g. min:10%).
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+SAMPLING_RATE = 250
+N_CHANNELS = 8
+DURATION = 10  # Seconds of synthetic data
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), '.baselines')
+REGRESSION_TOLERANCE = "mean:25%"
+
+
+def pytest_configure(config):
+    # Runs before pytest-benchmark reads its options (its hook is trylast)
+    if not config.pluginmanager.hasplugin("benchmark"):
+        return
+    from pytest_benchmark.utils import parse_compare_fail
+
+    if config.option.benchmark_storage == "file://./.benchmarks":
+        config.option.benchmark_storage = f"file://{BASELINE_DIR}"
+    if config.option.benchmark_compare and not config.option.benchmark_compare_fail:
+        config.option.benchmark_compare_fail = [parse_compare_fail(REGRESSION_TOLERANCE)]
+
+
+def synthetic_eeg(n_channels=N_CHANNELS, n_samples=DURATION * SAMPLING_RATE, frequency=11.25, seed=0):
+    """
+    Returns an SSVEP-like recording (n_channels, n_samples): a 3-harmonic response at `frequency` with random
+    per-channel gain and phase, 1/f-ish background, 50 Hz line noise and white noise.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / SAMPLING_RATE
+    data = np.zeros((n_channels, n_samples))
+    for harmonic in (1, 2, 3):
+        gains = rng.uniform(0.5, 2.0, (n_channels, 1)) / harmonic
+        phases = rng.uniform(0, 2 * np.pi, (n_channels, 1))
+        data += gains * np.sin(2 * np.pi * harmonic * frequency * t + phases)
+    data += 5 * np.cumsum(rng.standard_normal((n_channels, n_samples)), axis=1) / np.sqrt(n_samples)
+    data += 2 * np.sin(2 * np.pi * 50 * t)
+    data += rng.standard_normal((n_channels, n_samples))
+    return data
+
+
+class MockBoard:
+    """
+    Stands in for a BrainFlowBoardSetup: replays a fixed array through `get_current_board_data`, with the
+    synthetic board's id so BoardShim describes it without a device.
+    """
+
+    def __init__(self, data):
+        from brainflow.board_shim import BoardIds
+
+        self.board_id = BoardIds.SYNTHETIC_BOARD.value
+        self.data = data
+
+    def get_current_board_data(self, num_samples):
+        return self.data[:, -num_samples:]
+
+
+@pytest.fixture(scope="session")
+def eeg():
+    return synthetic_eeg()
+
+
+@pytest.fixture(scope="session")
+def mock_board():
+    return MockBoard(synthetic_eeg(n_channels=32))
@@ -0,0 +1,51 @@
+"""
+Benchmark of StreamingArtifactRejection.update on 0.1 s chunks of synthetic EEG with blinks, with thresholds only
+and with the ASR-style repair.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import SAMPLING_RATE
+from modules.artifacts import StreamingArtifactRejection
+from modules.synthetic import SyntheticSSVEP
+
+CHUNK = 25
+FREQUENCIES = [9.25, 11.25, 13.25, 15.25]
+
+
+def recording(blink_amplitude, seed=1):
+    generator = SyntheticSSVEP(FREQUENCIES, sampling_rate=SAMPLING_RATE, n_channels=8, blink_rate=0.3,
+                               blink_amplitude=blink_amplitude, seed=seed)
+    return generator.generate(60)[0]
+
+
+def run(stage, data):
+    stage.reset()
+    outputs = [stage.update(data[:, i:i + CHUNK]) for i in range(0, data.shape[1], CHUNK)]
+    return np.concatenate([eeg for eeg, _ in outputs], axis=1), np.concatenate([mask for _, mask in outputs])
+
+
+@pytest.mark.parametrize("asr", [False, True])
+def test_update(benchmark, asr):
+    data, clean = recording(150.0), recording(0.0)  # Same recording without the blinks
+    stage = StreamingArtifactRejection(8, SAMPLING_RATE, max_amplitude=80, max_gradient=40)
+    if asr:
+        stage.fit_asr(SyntheticSSVEP(FREQUENCIES[:1], n_channels=8, blink_rate=0.0, seed=2).generate(60)[0])
+    repaired, mask = benchmark(run, stage, data)
+
+    blinks = (np.abs(data - clean) > 80).any(axis=0)
+    assert mask[blinks].mean() > 0.9  # Only the onset before the threshold is crossed is missed
+    assert len(stage.intervals) == np.count_nonzero(np.diff(blinks.astype(int), prepend=0) == 1)
+    assert mask.mean() < 0.2
+    if asr:
+        assert np.sqrt(np.mean((repaired - clean) ** 2)) < 0.5 * np.sqrt(np.mean((data - clean) ** 2))
+    else:
+        assert repaired is data or np.array_equal(repaired, data)
+
+
+def test_clean_data_is_not_flagged():
+    stage = StreamingArtifactRejection(8, SAMPLING_RATE, max_amplitude=80, max_gradient=40)
+    _, mask = run(stage, recording(0.0))
+    assert not mask.any()
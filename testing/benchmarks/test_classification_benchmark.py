@@ -0,0 +1,41 @@
+"""
+Benchmarks of SSVEPClassifier.__call__ across target counts and window lengths, and of reference generation.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import SAMPLING_RATE
+from modules.classification import SSVEPClassifier
+from modules.references import generate_reference_signals, _reference_block
+
+TARGET_COUNTS = [4, 12, 40]
+WINDOWS = [0.5, 1.0, 2.0, 4.0]
+
+
+def target_frequencies(n_targets):
+    return list(np.round(np.linspace(8.0, 15.8, n_targets), 2))
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+@pytest.mark.parametrize("n_targets", TARGET_COUNTS)
+def test_classifier_call(benchmark, eeg, n_targets, window):
+    n_samples = int(window * SAMPLING_RATE)
+    classifier = SSVEPClassifier(target_frequencies(n_targets), 3, SAMPLING_RATE, n_samples)
+    segment = eeg[:, :n_samples]
+    frequency, _ = benchmark(classifier, segment)
+    assert frequency in classifier.frequencies
+
+
+@pytest.mark.parametrize("n_targets", TARGET_COUNTS)
+def test_reference_generation(benchmark, n_targets):
+    # Clears the block cache every round so the generation itself is timed
+    frequencies = target_frequencies(n_targets)
+
+    def generate():
+        _reference_block.cache_clear()
+        return generate_reference_signals(frequencies, 3, SAMPLING_RATE, 4 * SAMPLING_RATE)
+
+    references = benchmark(generate)
+    assert len(references) == n_targets
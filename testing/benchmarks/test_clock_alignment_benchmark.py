@@ -0,0 +1,41 @@
+"""
+Benchmark of ClockAligner.update over a simulated hour of a drifting board, and the accuracy of mapping host
+times back to sample indices.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import SAMPLING_RATE
+from modules.clock_alignment import ClockAligner
+
+CHUNK = 12
+DRIFT = 40e-6  # Board oscillator 40 ppm fast
+
+
+def arrivals(seed=0):
+    rng = np.random.default_rng(seed)
+    indices = np.arange(CHUNK - 1, 3600 * SAMPLING_RATE, CHUNK)
+    times = indices / (SAMPLING_RATE * (1 + DRIFT)) + rng.uniform(0, 0.03, len(indices))
+    times[rng.random(len(indices)) < 0.001] += 0.2  # USB stalls
+    return indices.tolist(), times.tolist()
+
+
+def fit(indices, times):
+    aligner = ClockAligner(SAMPLING_RATE, latency=0.015)
+    for index, host_time in zip(indices, times):
+        aligner.update(index, host_time)
+    return aligner
+
+
+def test_update(benchmark):
+    indices, times = arrivals()
+    aligner = benchmark.pedantic(fit, args=(indices, times), rounds=3)
+    assert abs(aligner.drift_ppm - DRIFT * 1e6) < 2
+    assert aligner.rejected > 0
+
+    cue_samples = np.linspace(3500, 3590, 10) * SAMPLING_RATE
+    cue_times = cue_samples / (SAMPLING_RATE * (1 + DRIFT))
+    assert np.abs(aligner.time_to_sample(cue_times) - cue_samples).max() < 0.5  # Sub-sample after an hour
+    assert np.abs(cue_times * SAMPLING_RATE - cue_samples).max() > 30  # The nominal rate is off by many samples
@@ -0,0 +1,85 @@
+"""
+float32 vs float64 processing: accuracy parity on simulated_test_SSVEP.npy and end-to-end pipeline throughput.
+
+The precisions are compared with the same CCA solver (QR-based, the only one that runs in float32); sklearn's
+float64 CCA is benchmarked alongside, and checked to agree with the QR solver, so the solver and dtype effects
+can be told apart.
+"""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from modules.filtering import Filtering
+from modules.classification import SSVEPClassifier
+from modules.pipeline import OnlinePipeline
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'simulated_test_SSVEP.npy')
+FREQUENCIES = [9.25, 11.25, 13.25, 15.25]
+SAMPLING_RATE = 250
+SEGMENT_SAMPLES = 10 * SAMPLING_RATE  # 10 s of each target
+FILTER = {"filter_type": "bandpass", "lowcut": 6.0, "highcut": 40.0, "order": 4}
+SETUPS = [(np.float64, "sklearn"), (np.float64, "qr"), (np.float32, "qr")]
+
+
+@pytest.fixture(scope="module")
+def recording():
+    # Noise makes the task non-trivial, so parity is checked on windows that are actually hard
+    data = np.load(DATA_PATH)[:, :4 * SEGMENT_SAMPLES]
+    return data + 8.0 * np.random.default_rng(0).standard_normal(data.shape)
+
+
+def classify_windows(recording, dtype, solver="qr", window=SAMPLING_RATE, step=SAMPLING_RATE // 2):
+    filtering = Filtering(SAMPLING_RATE, dtype=dtype)
+    classifier = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, window, dtype=dtype, solver=solver)
+    data = recording.astype(dtype)
+    predictions, truths = [], []
+    for start in range(0, data.shape[1] - window + 1, step):
+        if start // SEGMENT_SAMPLES != (start + window - 1) // SEGMENT_SAMPLES:
+            continue
+        predictions.append(classifier(filtering.filter_data(data[:, start:start + window], **FILTER))[0])
+        truths.append(FREQUENCIES[start // SEGMENT_SAMPLES])
+    return np.array(predictions), np.array(truths)
+
+
+def test_filter_parity(recording):
+    filtered64 = Filtering(SAMPLING_RATE).filter_data(recording, **FILTER)
+    filtered32 = Filtering(SAMPLING_RATE, dtype=np.float32).filter_data(recording.astype(np.float32), **FILTER)
+    assert filtered32.dtype == np.float32
+    assert np.max(np.abs(filtered32 - filtered64)) < 1e-4 * np.max(np.abs(filtered64))
+
+
+def test_solver_agreement(recording):
+    # Same precision, different algorithm: both compute the first canonical correlation
+    window = recording[:, :SAMPLING_RATE]
+    sklearn_scores = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, SAMPLING_RATE, solver="sklearn").score(window)
+    qr_scores = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, SAMPLING_RATE, solver="qr").score(window)
+    np.testing.assert_allclose(qr_scores, sklearn_scores, atol=1e-3)
+
+
+def test_accuracy_parity(recording):
+    # Same solver, different precision
+    predictions64, truths = classify_windows(recording, np.float64)
+    predictions32, _ = classify_windows(recording, np.float32)
+    accuracy64 = np.mean(predictions64 == truths)
+    accuracy32 = np.mean(predictions32 == truths)
+    assert abs(accuracy32 - accuracy64) <= 0.02
+    assert np.mean(predictions32 == predictions64) >= 0.95
+
+
+@pytest.mark.parametrize("dtype, solver", SETUPS, ids=[f"{np.dtype(d).name}-{s}" for d, s in SETUPS])
+def test_pipeline_throughput(benchmark, recording, dtype, solver):
+    # The whole recording through ring buffer -> filter -> classifier in 100 ms chunks
+    chunks = [recording[:, start:start + 25] for start in range(0, recording.shape[1], 25)]
+
+    def run():
+        classifier = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, 2 * SAMPLING_RATE, dtype=dtype, solver=solver)
+        pipeline = OnlinePipeline(None, classifier,
+                                  range(recording.shape[0]), 2 * SAMPLING_RATE, SAMPLING_RATE // 2,
+                                  filter_obj=Filtering(SAMPLING_RATE, dtype=dtype), filter_kwargs=FILTER, dtype=dtype)
+        return sum(len(pipeline.process_chunk(chunk)) for chunk in chunks)
+
+    n_decisions = benchmark.pedantic(run, rounds=3, warmup_rounds=1)
+    assert n_decisions > 0
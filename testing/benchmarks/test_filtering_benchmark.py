@@ -0,0 +1,47 @@
+"""
+Benchmarks of Filtering.filter_data (SciPy) and BF_Filtering.filter_data (BrainFlow) for every filter type.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import SAMPLING_RATE
+from modules.filtering import Filtering
+from modules.brainflow_filtering import BF_Filtering
+
+FILTERS = {
+    "bandpass": {"lowcut": 6.0, "highcut": 40.0},
+    "highpass": {"lowcut": 1.0},
+    "lowpass": {"highcut": 40.0},
+    "notch": {"notch_freq": 50.0},
+    "bandstop": {"lowcut": 48.0, "highcut": 52.0},
+}
+
+
+@pytest.mark.parametrize("filter_type", list(FILTERS))
+def test_scipy_filter_data(benchmark, eeg, filter_type):
+    filtering = Filtering(SAMPLING_RATE)
+    filtered = benchmark(filtering.filter_data, eeg, filter_type, **FILTERS[filter_type])
+    assert filtered.shape == eeg.shape
+
+
+@pytest.mark.parametrize("filter_type", list(FILTERS))
+def test_brainflow_filter_data(benchmark, eeg, filter_type):
+    filtering = BF_Filtering(SAMPLING_RATE)
+    filtered = benchmark(filtering.filter_data, eeg, filter_type, **FILTERS[filter_type])
+    assert filtered.shape == eeg.shape
+
+
+@pytest.mark.parametrize("mode", ["out", "inplace"])
+def test_brainflow_filter_data_no_copy(benchmark, eeg, mode):
+    # Board-style array with the EEG rows in the middle, filtered without allocating
+    filtering = BF_Filtering(SAMPLING_RATE)
+    board = np.vstack((eeg[:1], eeg, eeg[:3]))
+    channels = range(1, eeg.shape[0] + 1)
+    if mode == "out":
+        out = np.empty_like(eeg)
+        filtered = benchmark(filtering.filter_data, board, channels=channels, out=out, **FILTERS["bandpass"])
+    else:
+        filtered = benchmark(filtering.filter_data, board, channels=channels, inplace=True, **FILTERS["bandpass"])
+    assert filtered.shape[1] == eeg.shape[1]
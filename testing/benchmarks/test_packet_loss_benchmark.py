@@ -0,0 +1,49 @@
+"""
+Benchmark of PacketLossMonitor.update on 0.1 s Cyton-layout chunks, with and without dropped samples.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import SAMPLING_RATE, synthetic_eeg
+from modules.packet_loss import PacketLossMonitor
+
+PACKAGE_ROW, TIMESTAMP_ROW, MARKER_ROW, NUM_ROWS = 0, 22, 23, 24  # Cyton board descriptor
+CHUNK = 25
+
+
+def board_chunks(drop):
+    n_samples = 4 * SAMPLING_RATE
+    data = np.zeros((NUM_ROWS, n_samples))
+    data[1:9] = synthetic_eeg(n_samples=n_samples)
+    data[PACKAGE_ROW] = np.arange(n_samples) % 256
+    data[TIMESTAMP_ROW] = np.arange(n_samples) / SAMPLING_RATE
+    keep = np.ones(n_samples, dtype=bool)
+    keep[drop] = False
+    received = data[:, keep]
+    return data, [received[:, i:i + CHUNK] for i in range(0, received.shape[1], CHUNK)]
+
+
+def run(chunks):
+    monitor = PacketLossMonitor(PACKAGE_ROW, TIMESTAMP_ROW, SAMPLING_RATE, MARKER_ROW, max_fill=10)
+    return monitor, np.concatenate([monitor.update(chunk) for chunk in chunks], axis=1)
+
+
+@pytest.mark.parametrize("loss", ["none", "short gaps"])
+def test_update(benchmark, loss):
+    drop = [] if loss == "none" else [24, 25, 100, 255, 256, 257, 600, 700, 701]  # Including chunk boundaries and a wrap
+    data, chunks = board_chunks(drop)
+    monitor, repaired = benchmark(run, chunks)
+    assert monitor.summary()["lost"] == len(drop)
+    assert repaired.shape == data.shape
+    np.testing.assert_array_equal(repaired[PACKAGE_ROW], data[PACKAGE_ROW])
+    np.testing.assert_allclose(repaired[TIMESTAMP_ROW], data[TIMESTAMP_ROW])
+
+
+def test_long_gap_is_flagged(benchmark):
+    data, chunks = board_chunks(np.arange(300, 620))  # 320 samples: more than a package-number wrap
+    monitor, repaired = benchmark(run, chunks)
+    assert monitor.summary()["lost"] == 320
+    assert monitor.long_gaps == 1 and repaired.shape[1] == data.shape[1] - 320
+    assert monitor.spans_gap(200, 400) and not monitor.spans_gap(400, 600)
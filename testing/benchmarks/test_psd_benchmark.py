@@ -0,0 +1,56 @@
+"""
+Benchmarks of the PSD helpers behind the visualization plots (psd.compute_psd / compute_psds) and of the
+signal-quality measures in visualization.py.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("matplotlib")
+
+from conftest import SAMPLING_RATE
+from modules.psd import compute_psd, compute_psds, clear_psd_cache
+from modules.visualization import compute_snr, compute_variance
+
+
+def test_compute_psd(benchmark, eeg):
+    def uncached():
+        clear_psd_cache()
+        return compute_psd(eeg, SAMPLING_RATE)
+
+    freqs, psd = benchmark(uncached)
+    assert psd.shape[0] == eeg.shape[0]
+
+
+def test_compute_psd_cached(benchmark, eeg):
+    compute_psd(eeg, SAMPLING_RATE)
+    freqs, psd = benchmark(compute_psd, eeg, SAMPLING_RATE)
+    assert psd.shape[0] == eeg.shape[0]
+
+
+def test_in_place_change_misses_the_cache(eeg):
+    data = eeg.copy()
+    _, before = compute_psd(data, SAMPLING_RATE)
+    data *= 2.0  # e.g. BF_Filtering.filter_data(data, inplace=True)
+    _, after = compute_psd(data, SAMPLING_RATE)
+    np.testing.assert_allclose(after, 4 * before)
+
+
+def test_compute_psds_pair(benchmark, eeg):
+    # Before/after pair as in the compare_psd plots
+    after = eeg - eeg.mean(axis=1, keepdims=True)
+
+    def uncached():
+        clear_psd_cache()
+        return compute_psds([eeg, after], SAMPLING_RATE)
+
+    results = benchmark(uncached)
+    assert len(results) == 2
+
+
+def test_compute_snr(benchmark, eeg):
+    assert benchmark(compute_snr, eeg).shape == (eeg.shape[0],)
+
+
+def test_compute_variance(benchmark, eeg):
+    assert benchmark(compute_variance, eeg).shape == (eeg.shape[0],)
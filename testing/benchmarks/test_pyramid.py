@@ -0,0 +1,53 @@
+"""
+MinMaxPyramid against brute-force decimation: every level built incrementally from odd-sized chunks must hold
+exactly the min/max (and the mean) of its bins, and fetching a view must match `decimation.minmax_decimate`.
+"""
+import numpy as np
+import pytest
+
+from modules.decimation import minmax_decimate
+from modules.pyramid import MinMaxPyramid
+
+SAMPLING_RATE = 250
+N_CHANNELS = 4
+N_SAMPLES = 2 ** 16
+
+
+@pytest.fixture(scope="module")
+def recording():
+    rng = np.random.default_rng(0)
+    data = np.cumsum(rng.standard_normal((N_CHANNELS, N_SAMPLES)), axis=1)
+    data[1, 12345] = 1e4  # A spike must survive every level
+    return data.astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def pyramid(recording):
+    pyramid = MinMaxPyramid(N_CHANNELS, SAMPLING_RATE)
+    rng = np.random.default_rng(1)
+    position = 0
+    while position < N_SAMPLES:
+        size = int(rng.integers(1, 3000))
+        pyramid.append(recording[:, position:position + size])
+        position += size
+    return pyramid
+
+
+def test_levels_match_brute_force(recording, pyramid):
+    assert pyramid.n_samples == N_SAMPLES
+    for level in range(pyramid.min_level, pyramid.max_level + 1):
+        blocks = recording.reshape(N_CHANNELS, -1, 2 ** level)
+        bin_min, bin_max, bin_mean = pyramid.get_level(level)
+        np.testing.assert_array_equal(bin_min, blocks.min(axis=2))
+        np.testing.assert_array_equal(bin_max, blocks.max(axis=2))
+        np.testing.assert_allclose(bin_mean, blocks.mean(axis=2), rtol=1e-4, atol=1e-3)
+        assert bin_max[1].max() == 1e4
+
+
+@pytest.mark.parametrize("level", [3, 6, 10])
+def test_fetch_matches_minmax_decimate(recording, pyramid, level):
+    n_pixels = N_SAMPLES // 2 ** level
+    positions, values = pyramid.fetch(0, N_SAMPLES, n_pixels)
+    expected_positions, expected_values = minmax_decimate(recording, n_pixels)
+    np.testing.assert_array_equal(positions, expected_positions)
+    np.testing.assert_array_equal(values, expected_values)
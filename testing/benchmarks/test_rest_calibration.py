@@ -0,0 +1,61 @@
+"""
+Rest calibration of the abstain ("no control") state: after `calibrate_rest`, unseen rest windows pass the
+threshold at about the requested false-positive rate, and SSVEP windows are still classified - for
+SSVEPClassifier directly and through OnlinePipeline.calibrate_rest.
+"""
+import numpy as np
+import pytest
+
+from modules.synthetic import SyntheticSSVEP
+from modules.classification import SSVEPClassifier
+from modules.pipeline import OnlinePipeline
+
+FREQUENCIES = [9.25, 11.25, 13.25, 15.25]
+SAMPLING_RATE = 250
+WINDOW = 2 * SAMPLING_RATE
+FALSE_POSITIVE_RATE = 0.1
+REST_SECONDS = 60
+
+
+def rest_recording(seed):
+    # Background, line noise and white noise only: the SSVEP is scaled to nothing
+    return SyntheticSSVEP(FREQUENCIES, SAMPLING_RATE, snr_db=-200.0, blink_rate=0.0, seed=seed).generate(REST_SECONDS)[0]
+
+
+def windows(recording, step=WINDOW // 2):
+    return np.stack([recording[:, start:start + WINDOW] for start in range(0, recording.shape[1] - WINDOW + 1, step)])
+
+
+@pytest.fixture(scope="module")
+def ssvep_windows():
+    generator = SyntheticSSVEP(FREQUENCIES, SAMPLING_RATE, snr_db=-10.0, trial_duration=WINDOW / SAMPLING_RATE,
+                               rest_duration=0.5, blink_rate=0.0, seed=3)
+    data, _, events = generator.generate(len(FREQUENCIES) * 5 * (WINDOW / SAMPLING_RATE + 0.5))
+    return [(data[:, onset:onset + WINDOW], frequency) for onset, frequency in events]
+
+
+def test_classifier_abstains_on_rest_at_the_requested_rate(ssvep_windows):
+    classifier = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, WINDOW)
+    classifier.calibrate_rest(rest_recording(seed=1), FALSE_POSITIVE_RATE)
+
+    rest_results = [classifier.classify(window) for window in windows(rest_recording(seed=2))]
+    false_positive_rate = np.mean([not result["abstain"] for result in rest_results])
+    assert 0.02 <= false_positive_rate <= 2.5 * FALSE_POSITIVE_RATE
+    assert all(result["reason"] == "rest" and result["frequency"] is None for result in rest_results if result["abstain"])
+
+    ssvep_results = [(classifier.classify(window), frequency) for window, frequency in ssvep_windows]
+    assert np.mean([not result["abstain"] for result, _ in ssvep_results]) >= 0.9
+    assert np.mean([result["frequency"] == frequency for result, frequency in ssvep_results]) >= 0.9
+    assert all(result["confidence"] > 1 - FALSE_POSITIVE_RATE for result, _ in ssvep_results if not result["abstain"])
+
+
+def test_pipeline_calibrate_rest():
+    pipeline = OnlinePipeline(None, SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, WINDOW), range(8), WINDOW,
+                              SAMPLING_RATE // 2)
+    pipeline.calibrate_rest(rest_recording(seed=1), FALSE_POSITIVE_RATE)
+
+    rest = rest_recording(seed=2)
+    decisions = [decision for position in range(0, rest.shape[1], SAMPLING_RATE // 2)
+                 for decision in pipeline.process_chunk(rest[:, position:position + SAMPLING_RATE // 2])]
+    false_positive_rate = np.mean([not decision["abstain"] for decision in decisions])
+    assert 0.02 <= false_positive_rate <= 2.5 * FALSE_POSITIVE_RATE
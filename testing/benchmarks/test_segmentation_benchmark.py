@@ -0,0 +1,15 @@
+"""
+Benchmark of Segmentation.get_segment reading from a mocked board.
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from modules.segmentation import Segmentation
+
+
+@pytest.mark.parametrize("segment_duration", [1.0, 4.0])
+def test_get_segment(benchmark, mock_board, segment_duration):
+    segmentation = Segmentation(mock_board, segment_duration)
+    segment = benchmark(segmentation.get_segment)
+    assert segment.shape[1] == segmentation.n_samples
@@ -0,0 +1,83 @@
+"""
+Benchmark of the SessionServer hosting several synthetic sessions: throughput of faster-than-real-time replays,
+sharing of the reference caches between sessions, and deadlines when paced in real time.
+"""
+import os
+import signal
+import threading
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import SAMPLING_RATE
+from modules.session_server import SessionServer, serve, session_configs
+
+FREQUENCIES = [9.25, 11.25, 13.25, 15.25]
+
+
+def server_config(n_sessions, realtime):
+    return {
+        "defaults": {
+            "window": 2.0,
+            "step": 0.5,
+            "dtype": "float32",
+            "filter": {"filter_type": "bandpass", "lowcut": 6.0, "highcut": 40.0, "order": 4},
+            "classifier": {"frequencies": FREQUENCIES, "harmonics": 3, "method": "CCA"},
+        },
+        "sessions": [{"name": f"P{i}", "board": {"realtime": realtime, "synthetic": {
+            "frequencies": FREQUENCIES, "sampling_rate": SAMPLING_RATE, "n_channels": 8, "snr_db": -5,
+            "sequence": [i % len(FREQUENCIES)], "seed": i}}} for i in range(n_sessions)]
+    }
+
+
+def make_server(config, paced, callback=None):
+    server = SessionServer(callback=callback, paced=paced)
+    for session_config in session_configs(config):
+        server.add_config(session_config)
+    return server
+
+
+@pytest.mark.parametrize("n_sessions", [1, 4])
+def test_replay_throughput(benchmark, n_sessions):
+    config = server_config(n_sessions, realtime=False)
+    decisions = {}
+
+    def run():
+        decisions.clear()
+        server = make_server(config, paced=False,
+                             callback=lambda decision: decisions.setdefault(decision["name"], []).append(decision))
+        return server, server.run(max_decisions=10)
+
+    server, report = benchmark.pedantic(run, rounds=3)
+    classifiers = [session.pipeline.classifier for session in server.sessions.values()]
+    window = server.sessions["P0"].pipeline.window_samples
+    assert all(c._reference_bases(window) is classifiers[0]._reference_bases(window) for c in classifiers)
+    for i in range(n_sessions):
+        name = f"P{i}"
+        assert report[name]["decisions"] >= 10
+        assert report[name]["missed_deadlines"] == 0
+        correct = [d["frequency"] == FREQUENCIES[i % len(FREQUENCIES)] for d in decisions[name] if "frequency" in d]
+        assert sum(correct) >= 0.8 * len(correct)
+
+
+def test_realtime_deadlines():
+    server = make_server(server_config(4, realtime=True), paced=True)
+    report = server.run(duration=3.5)
+    for session_report in report.values():
+        assert session_report["decisions"] >= 2
+        assert session_report["missed_deadlines"] == 0
+
+
+def test_dead_worker_does_not_hang_the_server():
+    decisions = []
+
+    def kill_a_worker(decision):
+        decisions.append(decision)
+        if len(decisions) == 1:  # Both workers are up: one dies without sending its report
+            worker = next(p for p in multiprocessing.active_children() if p.name.startswith("SpawnProcess"))
+            threading.Thread(target=os.kill, args=(worker.pid, signal.SIGKILL)).start()
+
+    with pytest.raises(RuntimeError, match="without a report"):
+        serve(server_config(2, realtime=True), duration=6, workers=2, callback=kill_a_worker)
@@ -0,0 +1,73 @@
+"""
+StreamingSignalQuality must not depend on how the stream is chunked: the Welford/Chan statistics and the
+Goertzel line-noise estimate of every report are compared across chunkings and with brute-force values per block.
+"""
+import numpy as np
+import pytest
+
+from modules.signal_quality import StreamingSignalQuality
+
+SAMPLING_RATE = 250
+N_CHANNELS = 4
+N_SAMPLES = 10 * SAMPLING_RATE
+LINE_AMPLITUDE = 40.0
+RAIL = 187500.0
+
+
+@pytest.fixture(scope="module")
+def recording():
+    rng = np.random.default_rng(0)
+    t = np.arange(N_SAMPLES) / SAMPLING_RATE
+    data = 10 * rng.standard_normal((N_CHANNELS, N_SAMPLES)) + 5.0
+    data[1] += LINE_AMPLITUDE * np.sin(2 * np.pi * 50 * t + 0.3)
+    data[2] = 0.0
+    data[3, ::40] = RAIL
+    return data
+
+
+def run(recording, chunk_sizes):
+    monitor = StreamingSignalQuality(N_CHANNELS, SAMPLING_RATE, rail_threshold=RAIL * 0.99)
+    reports, position = [], 0
+    for size in chunk_sizes:
+        reports += monitor.update(recording[:, position:position + size])
+        position += size
+    assert position >= N_SAMPLES
+    return monitor, reports
+
+
+def chunkings():
+    rng = np.random.default_rng(1)
+    random_sizes = rng.integers(1, 200, N_SAMPLES)
+    return {
+        "whole": [N_SAMPLES],
+        "single-samples": [1] * N_SAMPLES,
+        "random": random_sizes[:np.searchsorted(np.cumsum(random_sizes), N_SAMPLES) + 1],
+    }
+
+
+def test_reports_match_brute_force(recording):
+    monitor, reports = run(recording, [N_SAMPLES])
+    block = monitor.block_samples
+    assert len(reports) == N_SAMPLES // block
+    for index, report in enumerate(reports):
+        data = recording[:, index * block:(index + 1) * block]
+        np.testing.assert_allclose(report["std"], data.std(axis=1, ddof=1), rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(report["mean"], recording[:, :(index + 1) * block].mean(axis=1), rtol=1e-9)
+        dft = np.abs(data @ np.exp(-2j * np.pi * 50 * np.arange(block) / SAMPLING_RATE))  # The 50 Hz DFT bin
+        np.testing.assert_allclose(report["line_noise"], 2 * dft / block, rtol=1e-6, atol=1e-6)
+        assert report["line_noise"][1] == pytest.approx(LINE_AMPLITUDE, rel=0.25)
+        assert report["bad_channels"] == [1, 2, 3]
+    np.testing.assert_allclose(monitor.session_std(), recording.std(axis=1, ddof=1), rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("name", ["single-samples", "random"])
+def test_reports_do_not_depend_on_chunking(recording, name):
+    reference_monitor, reference = run(recording, chunkings()["whole"])
+    monitor, reports = run(recording, chunkings()[name])
+    assert len(reports) == len(reference)
+    for report, expected in zip(reports, reference):
+        assert report["sample"] == expected["sample"]
+        assert report["bad_channels"] == expected["bad_channels"]
+        for field in ("mean", "std", "line_noise", "rail_fraction"):
+            np.testing.assert_allclose(report[field], expected[field], rtol=1e-7, atol=1e-6)
+    np.testing.assert_allclose(monitor.session_std(), reference_monitor.session_std(), rtol=1e-9)
@@ -0,0 +1,99 @@
+"""
+Benchmark of the spatial filters (CAR, Laplacian, running whitening) on 0.1 s chunks, and checks that the
+incrementally updated covariance matches a batch fit.
+"""
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from conftest import SAMPLING_RATE
+from modules.spatial_filter import SpatialFilter, WhiteningFilter, car_matrix, laplacian_matrix
+
+CHUNK = 25
+CYTON_LAYOUT = [[-0.03, 0.08], [0.03, 0.08], [-0.05, 0.0], [0.05, 0.0],
+                [-0.07, -0.04], [0.07, -0.04], [-0.03, -0.08], [0.03, -0.08]]
+
+
+def mixed_noise(n_samples=60 * SAMPLING_RATE, seed=0):
+    # Correlated channels with electrode offsets
+    rng = np.random.default_rng(seed)
+    mixing = rng.standard_normal((8, 8)) + 2 * np.eye(8)
+    return mixing @ rng.standard_normal((8, n_samples)) + rng.uniform(-500, 500, (8, 1))
+
+
+def run(spatial_filter, data):
+    outputs = []
+    for position in range(0, data.shape[1], CHUNK):
+        chunk = data[:, position:position + CHUNK]
+        spatial_filter.update(chunk)
+        outputs.append(spatial_filter.apply(chunk))
+    return np.concatenate(outputs, axis=1)
+
+
+@pytest.mark.parametrize("name", ["car", "laplacian", "whitening", "car+whitening"])
+def test_filter(benchmark, name):
+    data = mixed_noise()
+    make = {
+        "car": lambda: SpatialFilter.car(8),
+        "laplacian": lambda: SpatialFilter(laplacian_matrix(CYTON_LAYOUT)),
+        "whitening": lambda: WhiteningFilter(8, SAMPLING_RATE, half_life=10),
+        "car+whitening": lambda: SpatialFilter.car(8).then(WhiteningFilter(8, SAMPLING_RATE, half_life=10)),
+    }[name]
+    output = benchmark(lambda: run(make(), data))
+    assert output.shape == data.shape
+
+    tail = output[:, -20 * SAMPLING_RATE:]
+    if name == "car":
+        np.testing.assert_allclose(tail.mean(axis=0), 0, atol=1e-9)
+    elif name == "laplacian":
+        np.testing.assert_allclose(laplacian_matrix(CYTON_LAYOUT).sum(axis=1), 0, atol=1e-12)
+    elif name == "whitening":
+        np.testing.assert_allclose(np.cov(tail), np.eye(8), atol=0.15)
+
+
+def test_running_covariance_matches_batch():
+    data = mixed_noise(20 * SAMPLING_RATE)
+    whitening = WhiteningFilter(8, SAMPLING_RATE, half_life=1e9, refresh=1e9)
+    for position in range(0, data.shape[1], CHUNK):
+        whitening.update(data[:, position:position + CHUNK])
+    np.testing.assert_allclose(whitening.covariance, np.cov(data, bias=True), rtol=1e-6, atol=1e-6)
+    assert whitening.refreshes == 0
+
+    whitening.refresh()
+    np.testing.assert_allclose(np.cov(whitening.apply(data), bias=True), np.eye(8), atol=1e-2)
+
+
+def test_pca_whitening_reduces_channels():
+    whitening = WhiteningFilter(8, SAMPLING_RATE, n_components=3)
+    output = run(whitening, mixed_noise(10 * SAMPLING_RATE))
+    assert output.shape[0] == whitening.n_out == 3 and whitening.refreshes == 10
+
+
+@pytest.mark.parametrize("name", ["car", "laplacian", "pca-whitening"])
+def test_pipeline_leaves_bad_electrodes_out(name):
+    from modules.classification import SSVEPClassifier
+    from modules.pipeline import OnlinePipeline
+    from modules.signal_quality import StreamingSignalQuality
+    from modules.synthetic import SyntheticSSVEP
+
+    frequencies = [9.25, 11.25, 13.25, 15.25]
+    data = SyntheticSSVEP(frequencies, sampling_rate=SAMPLING_RATE, n_channels=8, sequence=[1], seed=0).generate(20)[0]
+    data[6] += np.random.default_rng(1).normal(0, 500, data.shape[1])  # Electrode 6 comes loose
+    spatial_filter = {
+        "car": lambda: SpatialFilter.car(8),
+        "laplacian": lambda: SpatialFilter.laplacian(CYTON_LAYOUT),
+        "pca-whitening": lambda: WhiteningFilter(8, SAMPLING_RATE, n_components=4),
+    }[name]()
+    pipeline = OnlinePipeline(None, SSVEPClassifier(frequencies, 3, SAMPLING_RATE, 2 * SAMPLING_RATE), range(8),
+                              2 * SAMPLING_RATE, SAMPLING_RATE // 2, quality_monitor=StreamingSignalQuality(8, SAMPLING_RATE),
+                              spatial_filter=spatial_filter)
+    decisions = [d for position in range(0, data.shape[1], CHUNK)
+                 for d in pipeline.process_chunk(data[:, position:position + CHUNK])]
+
+    assert spatial_filter.excluded == (6,)
+    np.testing.assert_allclose(spatial_filter.matrix[:, 6], 0)
+    if name == "car":
+        np.testing.assert_allclose(np.delete(spatial_filter.matrix, 6, axis=0)[:, np.arange(8) != 6], car_matrix(7))
+    assert len(decisions) == 37
+    assert sum(d["frequency"] == frequencies[1] for d in decisions[-10:]) >= 8
@@ -0,0 +1,67 @@
+"""
+Correctness checks of the template-based classifiers (TRCA/eTRCA, ITCCA/eCCA) on SyntheticSSVEP trials: accuracy
+against the ground truth labels, the template cache after a refit and a save/load round trip.
+"""
+import numpy as np
+import pytest
+
+from modules.synthetic import SyntheticSSVEP
+from modules.classification import SSVEPClassifier, TRCAClassifier
+
+FREQUENCIES = [9.25, 11.25, 13.25, 15.25]
+SAMPLING_RATE = 250
+TRIAL_SECONDS = 2.0
+TRIALS_PER_TARGET = 10
+
+
+@pytest.fixture(scope="module")
+def trials():
+    # Onset-aligned epochs of every trial; even trials calibrate, odd trials are classified
+    generator = SyntheticSSVEP(FREQUENCIES, SAMPLING_RATE, snr_db=-10.0, trial_duration=TRIAL_SECONDS,
+                               rest_duration=0.5, blink_rate=0.0, seed=1)
+    data, _, events = generator.generate(len(FREQUENCIES) * TRIALS_PER_TARGET * (TRIAL_SECONDS + 0.5))
+    n_samples = int(TRIAL_SECONDS * SAMPLING_RATE)
+    epochs = np.stack([data[:, onset:onset + n_samples] for onset, _ in events])
+    labels = np.array([frequency for _, frequency in events])
+    train = np.arange(len(labels)) % 2 == 0
+    return epochs[train], labels[train], epochs[~train], labels[~train]
+
+
+def accuracy(classifier, epochs, labels):
+    return np.mean([classifier(epoch)[0] == label for epoch, label in zip(epochs, labels)])
+
+
+@pytest.mark.parametrize("ensemble", [False, True], ids=["TRCA", "eTRCA"])
+def test_trca_beats_chance(trials, ensemble):
+    train_epochs, train_labels, test_epochs, test_labels = trials
+    classifier = TRCAClassifier(FREQUENCIES, SAMPLING_RATE, ensemble=ensemble).fit(train_epochs, train_labels)
+    assert accuracy(classifier, test_epochs, test_labels) >= 0.8
+
+
+def test_trca_save_load_round_trip(trials, tmp_path):
+    train_epochs, train_labels, test_epochs, _ = trials
+    classifier = TRCAClassifier(FREQUENCIES, SAMPLING_RATE, subbands=[(6, 40), (14, 40)]).fit(train_epochs, train_labels)
+    path = str(tmp_path / "trca.npz")
+    classifier.save(path)
+    loaded = TRCAClassifier.load(path)
+    for epoch in test_epochs[:4]:
+        np.testing.assert_allclose(loaded.score(epoch), classifier.score(epoch))
+
+
+def test_ecca_beats_chance(trials):
+    train_epochs, train_labels, test_epochs, test_labels = trials
+    classifier = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, train_epochs.shape[-1], method="eCCA")
+    classifier.fit(train_epochs, train_labels)
+    assert accuracy(classifier, test_epochs, test_labels) >= 0.8
+
+
+@pytest.mark.parametrize("method", ["ITCCA", "eCCA"])
+def test_refit_invalidates_the_template_cache(trials, method):
+    # Scoring caches the template projections; a refit on other trials must not reuse them
+    train_epochs, train_labels, test_epochs, test_labels = trials
+    n_samples = train_epochs.shape[-1]
+    classifier = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, n_samples, method=method)
+    classifier.fit(train_epochs, train_labels).score(test_epochs[0])
+    classifier.fit(test_epochs, test_labels)
+    fresh = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, n_samples, method=method).fit(test_epochs, test_labels)
+    np.testing.assert_allclose(classifier.score(train_epochs[0]), fresh.score(train_epochs[0]))
@@ -0,0 +1,76 @@
+"""
+Compares the memory traffic of BF_Filtering's copy modes with the previous `np.apply_along_axis` path.
+
+A BrainFlow-style board array (n_rows, n_samples) is filtered on its EEG rows in four ways:
+- legacy: `np.apply_along_axis` over the rows selected by fancy indexing (the previous `filter_data`),
+- copy: `filter_data(board, channels=eeg)` - one new array of the EEG rows,
+- out: `filter_data(board, channels=eeg, out=buffer)` into a preallocated array,
+- inplace: `filter_data(board, channels=eeg, inplace=True)` - the board array itself.
+For each the script reports the peak bytes allocated during the call (tracemalloc) relative to the size of
+the EEG rows, and the time per call.
+
+Usage:
+    python testing/filtering_memory_benchmark.py [--rows 24] [--channels 16] [--seconds 60]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.brainflow_filtering import BF_Filtering
+
+SAMPLING_RATE = 250
+FILTER = {"filter_type": "bandpass", "lowcut": 6.0, "highcut": 40.0}
+
+
+def legacy_filter_data(filtering, data, channels):
+    # The previous filter_data: a fancy-indexed copy of the rows, then apply_along_axis into a new output
+    rows = data[channels]
+    return np.apply_along_axis(filtering.bandpass_filter, 1, rows, FILTER["lowcut"], FILTER["highcut"], 4)
+
+
+def measure(function, repeats):
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return peak, (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory traffic of BF_Filtering copy modes.")
+    parser.add_argument("--rows", type=int, default=24, help="Rows of the board array (Cyton: 24).")
+    parser.add_argument("--channels", type=int, default=16, help="EEG rows among them.")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Seconds of data.")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    n_samples = int(args.seconds * SAMPLING_RATE)
+    board = np.random.default_rng(0).standard_normal((args.rows, n_samples))
+    channels = list(range(1, args.channels + 1))
+    filtering = BF_Filtering(SAMPLING_RATE)
+    buffer = np.empty((len(channels), n_samples))
+    eeg_bytes = buffer.nbytes
+    print(f"Board array {board.shape}, {len(channels)} EEG rows ({eeg_bytes / 1e6:.1f} MB)\n")
+
+    modes = {
+        "legacy (apply_along_axis)": lambda: legacy_filter_data(filtering, board, channels),
+        "copy (default)": lambda: filtering.filter_data(board, channels=channels, **FILTER),
+        "out= (preallocated)": lambda: filtering.filter_data(board, channels=channels, out=buffer, **FILTER),
+        "inplace=True": lambda: filtering.filter_data(board, channels=channels, inplace=True, **FILTER),
+    }
+    for name, function in modes.items():
+        peak, elapsed = measure(function, args.repeats)
+        print(f"{name:28s} peak allocation {peak / 1e6:8.2f} MB ({peak / eeg_bytes:4.2f}x the EEG rows)"
+              f"   {elapsed * 1000:7.2f} ms/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Measures the import cost of the toolkit's entry points.
+
+Each statement is run in a fresh interpreter so nothing is cached between measurements. For every
+entry point the script reports the wall-clock import time, the peak resident memory of the process
+and which heavy GUI/plotting libraries ended up in sys.modules.
+
+Usage:
+    python testing/import_time_benchmark.py            # all entry points, 5 repeats each
+    python testing/import_time_benchmark.py -n 10      # more repeats
+    python testing/import_time_benchmark.py --importtime "from modules import SSVEPClassifier"
+                                                       # top modules from `python -X importtime`
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+ENTRY_POINTS = [
+    "import modules",
+    "from modules import Filtering",
+    "from modules import BF_Filtering",
+    "from modules import BrainFlowBoardSetup",
+    "from modules import SSVEPClassifier",
+    "from modules import plan_frequencies",
+    "from modules.classification_worker import main",
+    "from modules import SSVEPStimulusRunner",
+    "from modules import plot_psd",
+    "from modules import *",
+]
+
+HEAVY_MODULES = ["psychopy", "pyglet", "mne", "matplotlib", "sklearn", "scipy.signal", "brainflow"]
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+try:
+    exec({statement!r})
+    error = None
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+except ImportError:
+    rss_kb = None
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "rss_kb": rss_kb, "loaded": loaded, "error": error}}))
+"""
+
+
+def measure(statement, repeats=5):
+    """
+    Runs `statement` in `repeats` fresh interpreters.
+
+    Returns:
+        dict: Median import time (s), peak RSS (MB), heavy modules loaded and the error (if the import failed).
+    """
+    runs = []
+    for _ in range(repeats):
+        probe = _PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+        output = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, capture_output=True, text=True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    rss = [r["rss_kb"] for r in runs if r["rss_kb"] is not None]
+    return {
+        "seconds": statistics.median(r["seconds"] for r in runs),
+        "rss_mb": statistics.median(rss) / 1024 if rss else None,
+        "loaded": runs[-1]["loaded"],
+        "error": runs[-1]["error"],
+    }
+
+
+def top_imports(statement, n=15):
+    """
+    Returns the `n` slowest modules (cumulative microseconds) reported by `python -X importtime`.
+    """
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], cwd=REPO_ROOT, capture_output=True, text=True)
+    rows = []
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue  # Header line
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the BCItoolkit entry points.")
+    parser.add_argument("-n", "--repeats", type=int, default=5, help="Fresh interpreters per entry point.")
+    parser.add_argument("--importtime", metavar="STATEMENT", help="Show the slowest imports of one statement instead.")
+    args = parser.parse_args()
+
+    if args.importtime:
+        for cumulative_us, name in top_imports(args.importtime):
+            print(f"{cumulative_us / 1000:9.1f} ms  {name}")
+        return
+
+    baseline = measure("pass", args.repeats)
+    print(f"Interpreter baseline: {baseline['seconds'] * 1000:.1f} ms, {baseline['rss_mb']:.0f} MB\n")
+    print(f"{'entry point':45s} {'time (ms)':>10s} {'RSS (MB)':>9s}  heavy modules loaded")
+    for statement in ENTRY_POINTS:
+        result = measure(statement, args.repeats)
+        if result["error"]:
+            print(f"{statement:45s} {'-':>10s} {'-':>9s}  unavailable ({result['error']})")
+            continue
+        rss = f"{result['rss_mb']:.0f}" if result["rss_mb"] is not None else "-"
+        print(f"{statement:45s} {result['seconds'] * 1000:10.1f} {rss:>9s}  {', '.join(result['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Compares PowerSSVEPClassifier (sliding DFT power/SNR) with the CCA SSVEPClassifier on simulated_test_SSVEP.npy.
+
+The recording holds 10 s of each target (9.25, 11.25, 13.25, 15.25 Hz) followed by silence. Every window that
+lies entirely within one target's 10 s is classified; the script reports accuracy and the time per decision.
+For the power detector both the window call (same interface as SSVEPClassifier) and the streaming path
+(`update` per 100 ms chunk, `decide` per step) are timed. Both are also run with electrode DC offsets added
+(like raw, unfiltered board data), which must not change the accuracy.
+
+Usage:
+    python testing/power_classifier_benchmark.py [--window 2.0] [--step 0.25] [--offsets 100 1000]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules.classification import SSVEPClassifier, PowerSSVEPClassifier
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), 'simulated_test_SSVEP.npy')
+FREQUENCIES = [9.25, 11.25, 13.25, 15.25]
+SAMPLING_RATE = 250
+SEGMENT_DURATION = 10  # Seconds per target in the recording
+
+
+def labelled_windows(data, window_samples, step_samples):
+    """
+    Yields (end sample, true frequency) for every window inside a single target segment.
+    """
+    segment_samples = SEGMENT_DURATION * SAMPLING_RATE
+    for end in range(window_samples, len(FREQUENCIES) * segment_samples + 1, step_samples):
+        start = end - window_samples
+        if start // segment_samples == (end - 1) // segment_samples:
+            yield end, FREQUENCIES[start // segment_samples]
+
+
+def run_window_classifier(classifier, data, windows):
+    correct, times = 0, []
+    for end, truth in windows:
+        segment = data[:, end - classifier.n_samples:end]
+        start = time.perf_counter()
+        frequency, _ = classifier(segment)
+        times.append(time.perf_counter() - start)
+        correct += frequency == truth
+    return correct / len(windows), np.mean(times)
+
+
+def run_streaming(classifier, data, windows, chunk_samples=25):
+    # Feeds the recording chunk by chunk and decides at every window end
+    ends = {end: truth for end, truth in windows}
+    correct, update_times, decide_times = 0, [], []
+    classifier.reset()
+    for position in range(0, max(ends), chunk_samples):
+        chunk = data[:, position:position + chunk_samples]
+        start = time.perf_counter()
+        classifier.update(chunk)
+        update_times.append((time.perf_counter() - start) / chunk.shape[1])
+
+        end = position + chunk.shape[1]
+        if end in ends:
+            start = time.perf_counter()
+            frequency, _ = classifier.decide()
+            decide_times.append(time.perf_counter() - start)
+            correct += frequency == ends[end]
+    return correct / len(ends), np.mean(update_times), np.mean(decide_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Power/SNR detector vs CCA on simulated SSVEP data.")
+    parser.add_argument("--window", type=float, default=2.0, help="Window length in seconds.")
+    parser.add_argument("--step", type=float, default=0.25, help="Step between decisions in seconds (multiple of 0.1 s).")
+    parser.add_argument("--offsets", type=float, nargs="*", default=[100, 1000], help="DC offsets (uV) to test.")
+    args = parser.parse_args()
+
+    data = np.load(DATA_PATH)
+    window_samples = int(round(args.window * SAMPLING_RATE))
+    step_samples = int(round(args.step * SAMPLING_RATE))
+    windows = list(labelled_windows(data, window_samples, step_samples))
+    print(f"{len(windows)} windows of {args.window} s, {data.shape[0]} channels\n")
+
+    cca = SSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, window_samples)
+    power = PowerSSVEPClassifier(FREQUENCIES, 3, SAMPLING_RATE, window_samples)
+
+    accuracy, decision_time = run_window_classifier(cca, data, windows)
+    print(f"{'CCA (window)':28s} accuracy {accuracy:6.1%}   {decision_time * 1e6:10.1f} us/decision")
+    accuracy, decision_time = run_window_classifier(power, data, windows)
+    print(f"{'Power SNR (window)':28s} accuracy {accuracy:6.1%}   {decision_time * 1e6:10.1f} us/decision")
+
+    streaming_windows = [(end, truth) for end, truth in windows if end % 25 == 0]
+    accuracy, update_time, decide_time = run_streaming(power, data, streaming_windows)
+    print(f"{'Power SNR (streaming)':28s} accuracy {accuracy:6.1%}   {decide_time * 1e6:10.1f} us/decision"
+          f"   {update_time * 1e6:.2f} us/sample update")
+
+    for offset in args.offsets:
+        # Different offset per electrode, as on a raw Cyton stream
+        shifted = data + offset * np.linspace(0.5, 1.5, data.shape[0])[:, None]
+        window_accuracy, _ = run_window_classifier(power, shifted, windows)
+        streaming_accuracy, _, _ = run_streaming(power, shifted, streaming_windows)
+        print(f"{f'Power SNR, +{offset:g} uV DC':28s} accuracy {window_accuracy:6.1%} (window), "
+              f"{streaming_accuracy:6.1%} (streaming)")
+        if min(window_accuracy, streaming_accuracy) < accuracy:
+            sys.exit(f"DC offset of {offset:g} uV lowered the accuracy.")
+
+
+if __name__ == "__main__":
+    main()